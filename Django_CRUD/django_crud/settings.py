@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'movies.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'movies.middleware.LoadSheddingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,7 +57,8 @@ ROOT_URLCONF = 'django_crud.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Motor de plantillas de Django que además mide el tiempo de renderizado (ver movies.instrumentation)
+        'BACKEND': 'movies.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,13 +78,146 @@ WSGI_APPLICATION = 'django_crud.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Las conexiones se abren y cierran en cada petición (CONN_MAX_AGE = 0): con ASGI cada petición síncrona
+# se ejecuta en un hilo distinto y las conexiones persistentes de esos hilos no se cierran nunca
+# (ticket #33497 de Django). Con un servidor WSGI pueden reutilizarse entre peticiones con
+# DB_CONN_MAX_AGE (por ejemplo 600); CONN_HEALTH_CHECKS las comprueba antes de reutilizarlas.
+# `timeout` es el tiempo que SQLite espera por un bloqueo antes de fallar con "database is locked"
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
+# PRAGMAs que se aplican a cada conexión SQLite nueva (ver movies.db.configure_sqlite).
+# WAL permite leer mientras otro proceso escribe; busy_timeout en milisegundos, mmap_size en bytes
+# y cache_size negativo en KiB.
+
+MOVIES_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 20000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# El alias 'movies' guarda los fragmentos del catálogo; su backend se elige con MOVIES_CACHE_BACKEND ('locmem' o 'file')
+
+MOVIES_CACHE_BACKEND = os.environ.get('MOVIES_CACHE_BACKEND', 'locmem')
+
+MOVIES_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'movies',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'movies',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# El alias 'sessions' guarda las sesiones y los usuarios autenticados. Con varios procesos debe ser
+# compartido ('file'), para que cerrar sesión o editar un usuario en uno de ellos se vea en los demás
+
+MOVIES_SESSION_CACHE_BACKEND = os.environ.get('MOVIES_SESSION_CACHE_BACKEND', 'locmem')
+
+MOVIES_SESSION_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# El alias 'throttle' guarda los cubos de tokens de movies/throttling.py; con 'file' los límites por IP
+# y por usuario se comparten entre los procesos
+
+MOVIES_THROTTLE_CACHE_BACKEND = os.environ.get('MOVIES_THROTTLE_CACHE_BACKEND', 'locmem')
+
+MOVIES_THROTTLE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'movies': MOVIES_CACHE_BACKENDS[MOVIES_CACHE_BACKEND],
+    'sessions': MOVIES_SESSION_CACHE_BACKENDS[MOVIES_SESSION_CACHE_BACKEND],
+    'throttle': MOVIES_THROTTLE_CACHE_BACKENDS[MOVIES_THROTTLE_CACHE_BACKEND],
+}
+
+# Segundos que se conservan los fragmentos del catálogo (se invalidan antes al cambiar la versión del catálogo)
+MOVIES_CACHE_TIMEOUT = 600
+
+# Las páginas de detalle y los listados envían ETag (y Last-Modified en el detalle) y responden 304 si
+# el navegador ya tiene la versión actual (ver movies/conditional.py)
+MOVIES_CONDITIONAL_GET = True
+
+# Bytes a partir de los que las páginas en caché se sirven comprimidas (gzip, o Brotli si está instalado);
+# cada variante comprimida se guarda junto a la página (ver movies/compression.py)
+MOVIES_COMPRESS_MIN_LENGTH = 200
+
+
+# Sessions and authentication
+# Sesiones en caché con escritura en la base de datos (cached_db) y usuarios resueltos desde la misma caché
+# (ver movies.auth.CachedModelBackend): una sesión ya cargada no consulta la base de datos
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+SESSION_CACHE_ALIAS = 'sessions'
+
+AUTHENTICATION_BACKENDS = ['movies.auth.CachedModelBackend']
+
+# Segundos que se conserva en caché cada usuario autenticado (se invalida antes si cambia o cierra sesión)
+MOVIES_USER_CACHE_TIMEOUT = 300
+
+
+# Throttling and load shedding
+# Límites por IP y por usuario de las rutas caras (ver movies/throttling.py): cada regla admite una ráfaga
+# de `n` peticiones de los métodos indicados y se recupera a `n` por periodo ('s', 'min', 'hour', 'day')
+
+MOVIES_THROTTLE_RATES = {
+    'signin': {'rate': '10/min', 'methods': ['POST']},
+    'signup': {'rate': '5/min', 'methods': ['POST']},
+    'search_results': {'rate': '60/min', 'methods': ['GET']},
+}
+
+# Peticiones simultáneas por proceso a partir de las que se responde 503: cualquier ruta y las rutas limitadas
+MOVIES_MAX_CONCURRENT_REQUESTS = 64
+
+MOVIES_MAX_CONCURRENT_THROTTLED = 16
+
+# Segundos de la cabecera Retry-After de las respuestas 503
+MOVIES_SHED_RETRY_AFTER = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -124,3 +261,86 @@ LOGIN_URL = '/signin'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Movies catalog pagination
+# Tamaño de página por defecto y máximo permitido en `?page_size=` para la paginación por cursor
+
+MOVIES_PAGE_SIZE = 20
+
+MOVIES_MAX_PAGE_SIZE = 100
+
+# Request instrumentation
+# Métricas de cada petición (consultas SQL y renderizado) en la cabecera Server-Timing y en el logger
+# 'movies.timing'; con más de MOVIES_DUPLICATE_QUERY_THRESHOLD consultas repetidas la línea es un WARNING
+
+MOVIES_REQUEST_METRICS = True
+
+MOVIES_SERVER_TIMING = True
+
+MOVIES_DUPLICATE_QUERY_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'movies.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('MOVIES_TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Rating aggregates write-behind
+# Con 'thread' o 'worker' los agregados de calificaciones se recalculan por lotes cada
+# MOVIES_RATING_FLUSH_INTERVAL segundos en lugar de en cada petición (ver movies/writebehind.py)
+
+MOVIES_RATING_WRITE_BEHIND = os.environ.get('MOVIES_RATING_WRITE_BEHIND') or None
+
+MOVIES_RATING_FLUSH_INTERVAL = float(os.environ.get('MOVIES_RATING_FLUSH_INTERVAL', 2))
+
+# Leaderboards
+# Rankings precalculados (ver movies/leaderboards.py): la media bayesiana acerca a la media del catálogo
+# las películas con menos de MOVIES_LEADERBOARD_MIN_VOTES votos; se muestran MOVIES_LEADERBOARD_SIZE por ranking
+
+MOVIES_LEADERBOARD_MIN_VOTES = 10
+
+MOVIES_LEADERBOARD_SIZE = 10
+
+# Typeahead
+# Sugerencias de títulos del buscador (ver movies/typeahead.py): como mucho MOVIES_TYPEAHEAD_LIMIT por
+# consulta, desde un índice en memoria de hasta MOVIES_TYPEAHEAD_MAX_MOVIES películas por proceso
+
+MOVIES_TYPEAHEAD_LIMIT = 8
+
+MOVIES_TYPEAHEAD_MAX_MOVIES = 100000
+
+# Fuzzy search
+# Si la búsqueda de texto completo no encuentra nada, se buscan títulos y directores parecidos por
+# trigramas (ver movies/fuzzy.py); solo se muestran los que superan MOVIES_FUZZY_THRESHOLD (entre 0 y 1)
+
+MOVIES_FUZZY_THRESHOLD = 0.3
+
+# Poster thumbnails
+# Las listas muestran miniaturas locales de los carteles (ver movies/thumbnails.py): cada cartel se descarga
+# una vez, se reduce a MOVIES_THUMBNAIL_SIZE y se guarda en MOVIES_THUMBNAIL_DIR, que no pasa de
+# MOVIES_THUMBNAIL_CACHE_BYTES (se eliminan primero las menos usadas)
+
+MOVIES_THUMBNAILS = True
+
+MOVIES_THUMBNAIL_DIR = BASE_DIR / 'cache' / 'thumbnails'
+
+MOVIES_THUMBNAIL_SIZE = (200, 300)
+
+MOVIES_THUMBNAIL_FORMAT = 'WEBP'
+
+MOVIES_THUMBNAIL_TIMEOUT = 5
+
+MOVIES_THUMBNAIL_MAX_BYTES = 5 * 1024 * 1024
+
+MOVIES_THUMBNAIL_CACHE_BYTES = 200 * 1024 * 1024
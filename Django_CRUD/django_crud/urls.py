@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from movies import views
+from movies import api, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,13 +29,22 @@ urlpatterns = [
     path('admin_create_movie/', views.create_movie, name='create_movie'),
     path('admin_movie/<int:movie_id>/', views.admin_movie_detail, name='admin_movie_detail'),
     path('admin_movie/<int:movie_id>/delete/', views.delete_movie, name='delete_movie'),
+    path('admin_movies/bulk/', views.bulk_movie_action, name='bulk_movie_action'),
     path('user_available_movies/', views.user_available_movies, name='user_available_movies'),
     path('user_available_movie_detail/<int:movie_id>/', views.user_movie_detail, name='user_movie_detail'),
     path('user_available_movie/<int:movie_id>/add/', views.add_to_my_list, name='user_movie_add'),
+    path('charts/', views.movie_charts, name='movie_charts'),
     path('user_movies/', views.user_movies, name='user_movies'),
     path('user_movie_detail/<int:movie_id>/', views.user_movie_rating, name='user_movie_rating'),
     path('user_movie/<int:movie_id>/delete/', views.user_movie_delete, name='user_movie_delete'),
     path('user_movie/<int:movie_id>/rate/', views.user_movie_rate, name='user_movie_rate'),
     path('search/', views.search_results, name='search_results'),
     path('search_my_movies/', views.search_from_my_movies, name='search_from_my_movies'),
+    path('thumbnails/<int:movie_id>/<str:key>/', views.movie_thumbnail, name='movie_thumbnail'),
+    path('export/<str:kind>/', views.export_data, name='export_data'),
+    path('api/movies/', api.movie_list, name='api_movie_list'),
+    path('api/movies/typeahead/', api.movie_typeahead, name='api_movie_typeahead'),
+    path('api/movies/batch/', api.movie_batch, name='api_movie_batch'),
+    path('api/movies/<int:movie_id>/', api.movie_detail, name='api_movie_detail'),
+    path('api/library/', api.library, name='api_library'),
 ]
@@ -0,0 +1,208 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET
+
+from .library import user_library
+from .models import MAX_INTEGER, Movie
+from .pagination import paginate_movies
+from . import typeahead
+
+
+# API JSON de solo lectura para clientes como la aplicación móvil.
+# `?fields=` limita las columnas devueltas (y las leídas con `.only()`), y las respuestas
+# llevan un ETag para que el cliente pueda revalidarlas con If-None-Match y recibir un 304.
+
+API_FIELDS = (
+    'id', 'title', 'description', 'director', 'release_year', 'duration', 'age_rating', 'genre',
+    'rating', 'rating_count', 'image_url', 'trailer_url', 'updated_at',
+)
+
+MAX_BATCH_IDS = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """
+    Decorador para las vistas de la API: solo GET, exige sesión iniciada y convierte los errores en JSON.
+    """
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse({'error': str(exc)}, status=exc.status)
+        except Http404:
+            return JsonResponse({'error': 'Not found.'}, status=404)
+    return wrapper
+
+
+def requested_fields(request):
+    """
+    Obtiene los campos pedidos en `?fields=` (todos por defecto).
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida.
+
+    Returns:
+    - list: Los nombres de los campos, siempre con `id` en primer lugar.
+
+    Raises:
+    - ApiError: Si se pide un campo desconocido.
+    """
+    value = request.GET.get('fields')
+    if not value:
+        return list(API_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(API_FIELDS))
+    if unknown:
+        raise ApiError('Unknown fields: %s.' % ', '.join(unknown))
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
+
+
+def serialize(movie, fields):
+    return {field: getattr(movie, field) for field in fields}
+
+
+def json_response(request, data):
+    """
+    Devuelve los datos en JSON con un ETag calculado sobre el contenido, o un 304 si el cliente ya los tiene.
+    """
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api_view
+def movie_list(request):
+    """
+    Lista paginada por cursor de las películas ordenadas por título.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `fields`, `after`, `before` y `page_size`.
+
+    Returns:
+    - HttpResponse: JSON con `results`, `next` y `previous`.
+    """
+    fields = requested_fields(request)
+    # La paginación necesita el título aunque el cliente no lo pida
+    movies = Movie.objects.only(*set(fields) | {'title'})
+    page = paginate_movies(movies, request)
+    return json_response(request, {
+        'results': [serialize(movie, fields) for movie in page],
+        'next': page.next_url,
+        'previous': page.previous_url,
+    })
+
+
+@api_view
+def movie_detail(request, movie_id):
+    """
+    Detalle de una película.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `fields`.
+    - movie_id: int, el ID de la película.
+
+    Returns:
+    - HttpResponse: JSON con los campos pedidos de la película.
+    """
+    fields = requested_fields(request)
+    if movie_id > MAX_INTEGER:
+        raise Http404
+    try:
+        movie = Movie.objects.only(*fields).get(pk=movie_id)
+    except Movie.DoesNotExist:
+        raise Http404
+    return json_response(request, serialize(movie, fields))
+
+
+@api_view
+def movie_batch(request):
+    """
+    Detalle de varias películas resueltas en una sola consulta (`?ids=1,2,3`).
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `ids` y `fields`.
+
+    Returns:
+    - HttpResponse: JSON con `results` en el orden pedido y `missing` con los IDs que no existen.
+    """
+    fields = requested_fields(request)
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.GET.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        raise ApiError('ids must be a comma-separated list of integers.')
+    if not ids:
+        raise ApiError('ids is required.')
+    if len(ids) > MAX_BATCH_IDS:
+        raise ApiError('At most %d ids per request.' % MAX_BATCH_IDS)
+    if any(not 0 < pk <= MAX_INTEGER for pk in ids):
+        raise ApiError('ids must be positive integers up to %d.' % MAX_INTEGER)
+
+    movies = Movie.objects.only(*fields).in_bulk(ids)
+    return json_response(request, {
+        'results': [serialize(movies[pk], fields) for pk in ids if pk in movies],
+        'missing': [pk for pk in ids if pk not in movies],
+    })
+
+
+@api_view
+def library(request):
+    """
+    Lista de películas del usuario con su calificación personal.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `fields`.
+
+    Returns:
+    - HttpResponse: JSON con `results`; cada película incluye `user_rating`.
+    """
+    fields = requested_fields(request)
+    movies = user_library(request.user).only(*set(fields) | {'title'})
+    return json_response(request, {
+        'results': [dict(serialize(movie, fields), user_rating=movie.user_rating) for movie in movies],
+    })
+
+
+@api_view
+def movie_typeahead(request):
+    """
+    Sugerencias de títulos para el buscador mientras se escribe, desde el índice en memoria del proceso.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `q` (el texto escrito) y `limit`.
+
+    Returns:
+    - HttpResponse: JSON con `results`; cada sugerencia incluye `id`, `title`, `release_year` y `url`.
+    """
+    try:
+        limit = int(request.GET.get('limit', typeahead.get_limit()))
+    except ValueError:
+        raise ApiError('Invalid limit.')
+    detail = 'admin_movie_detail' if request.user.is_superuser else 'user_movie_detail'
+    return json_response(request, {
+        'results': [
+            {'id': pk, 'title': title, 'release_year': year, 'url': reverse(detail, args=[pk])}
+            for pk, title, year in typeahead.suggest(request.GET.get('q', ''), limit=max(1, limit))
+        ],
+    })
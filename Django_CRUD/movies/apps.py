@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movies'
+
+    def ready(self):
+        # Registramos los receptores de señales aunque no se carguen las vistas (p. ej. en comandos de manage.py)
+        from . import signals  # noqa: F401
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+# Resolución de `request.user` desde caché.
+# ModelBackend.get_user consulta auth_user en cada petición autenticada; aquí el usuario se guarda en
+# la misma caché que las sesiones y se invalida al guardarlo, borrarlo o cerrar su sesión (ver signals.py).
+
+def get_cache():
+    return caches[getattr(settings, 'SESSION_CACHE_ALIAS', 'default')]
+
+
+def user_cache_key(user_id):
+    return 'auth:user:%s' % user_id
+
+
+def invalidate_user(user_id):
+    """
+    Elimina de la caché el usuario indicado; la siguiente petición lo vuelve a leer de la base de datos.
+    """
+    get_cache().delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend que resuelve el usuario de la sesión desde la caché.
+    """
+
+    def get_user(self, user_id):
+        cache = get_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, getattr(settings, 'MOVIES_USER_CACHE_TIMEOUT', 300))
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,256 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+
+
+# Herramientas para medir el servidor con carga concurrente real (HTTP).
+# Se usan para comparar el mismo proyecto servido por WSGI (gunicorn) y por ASGI (uvicorn):
+# los servidores comparten la base de datos, así que basta una sesión creada aquí para ambos.
+
+def create_session(user):
+    """
+    Crea una sesión autenticada para el usuario sin pasar por el formulario de inicio de sesión.
+
+    Parameters:
+    - user: User, el usuario con el que se harán las peticiones.
+
+    Returns:
+    - SessionStore: La sesión guardada; su `session_key` se envía como cookie.
+    """
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session
+
+
+def session_cookie(session):
+    return '%s=%s' % (settings.SESSION_COOKIE_NAME, session.session_key)
+
+
+def fetch(url, cookie=None, timeout=10):
+    """
+    Hace una petición GET y devuelve (código de estado, segundos transcurridos).
+    """
+    request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(results, elapsed):
+    """
+    Resume los resultados de una ronda de carga.
+
+    Parameters:
+    - results: list, pares (código de estado, segundos) de cada petición.
+    - elapsed: float, la duración total de la ronda en segundos.
+
+    Returns:
+    - dict: Número de peticiones, errores, peticiones por segundo y latencias (ms).
+    """
+    latencies = [seconds * 1000 for status, seconds in results if status == 200]
+    return {
+        'requests': len(results),
+        'errors': sum(1 for status, _ in results if status != 200),
+        'throughput': len(results) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def run_load(urls, cookie=None, concurrency=50, total=1000, timeout=10):
+    """
+    Lanza `total` peticiones repartidas entre las URLs con `concurrency` clientes simultáneos.
+
+    Parameters:
+    - urls: list, las URLs a pedir en turno rotatorio.
+    - cookie: str, la cabecera Cookie que se envía en cada petición.
+    - concurrency: int, el número de conexiones abiertas a la vez.
+    - total: int, el número total de peticiones.
+    - timeout: float, el tiempo máximo por petición en segundos.
+
+    Returns:
+    - dict: El resumen calculado por `summarize`.
+    """
+    targets = [urls[index % len(urls)] for index in range(total)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: fetch(url, cookie, timeout), targets))
+    return summarize(results, time.perf_counter() - started)
+
+
+# Latencia por URL con el cliente de pruebas: recorre todas las rutas con nombre de la URLconf,
+# mide cada una varias veces y guarda percentiles y número de consultas en JSON para comparar ejecuciones.
+
+# Rutas que no se piden: cerrar sesión invalidaría la sesión del resto de la medición y las
+# miniaturas descargarían los carteles de sus servidores de origen
+SKIPPED_ROUTES = {'logout', 'movie_thumbnail'}
+
+# Rutas que se piden como superusuario; el resto, como un usuario normal con películas en su lista
+ADMIN_ROUTES = {'admin_home', 'admin_movies', 'create_movie', 'admin_movie_detail', 'delete_movie', 'export_data'}
+
+
+def discover_routes(urlconf=None):
+    """
+    Devuelve las rutas con nombre de la URLconf (sin las de aplicaciones con espacio de nombres, como admin).
+
+    Returns:
+    - list: Pares (nombre, patrón) en el orden de la URLconf.
+    """
+    from django.urls import URLPattern, get_resolver
+
+    return [
+        (pattern.name, pattern.pattern) for pattern in get_resolver(urlconf).url_patterns
+        if isinstance(pattern, URLPattern) and pattern.name and pattern.name not in SKIPPED_ROUTES
+    ]
+
+
+def route_url(name, pattern, sample):
+    """
+    Construye la URL de una ruta con los valores de ejemplo para sus parámetros.
+
+    Parameters:
+    - name: str, el nombre de la ruta.
+    - pattern: RoutePattern, el patrón de la ruta.
+    - sample: dict, valores de ejemplo: `movie_id`, `kind`, `query` e `ids`.
+    """
+    from django.urls import reverse
+    from django.utils.http import urlencode
+
+    kwargs = {}
+    for argument, converter in getattr(pattern, 'converters', {}).items():
+        kwargs[argument] = sample['movie_id'] if type(converter).__name__ == 'IntConverter' else sample.get(argument, 'movies')
+    url = reverse(name, kwargs=kwargs)
+    params = {}
+    if 'search' in name:
+        params['search_query'] = sample['query']
+    if name == 'api_movie_batch':
+        params['ids'] = ','.join(map(str, sample['ids']))
+    return '%s?%s' % (url, urlencode(params)) if params else url
+
+
+def measure_url(client, url, repeat, warm=False):
+    """
+    Mide una URL con el cliente de pruebas.
+
+    Parameters:
+    - client: Client, el cliente con la sesión iniciada.
+    - url: str, la URL a pedir.
+    - repeat: int, el número de peticiones medidas (hay además una de calentamiento).
+    - warm: bool, si es False se vacía la caché del catálogo antes de cada petición.
+
+    Returns:
+    - dict: Código de estado, percentiles de latencia (ms) y número máximo de consultas.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from .cache import get_cache
+
+    latencies = []
+    queries = 0
+    status = None
+    for attempt in range(repeat + 1):
+        if not warm:
+            get_cache().clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if attempt:
+            latencies.append(elapsed * 1000)
+            queries = max(queries, len(context.captured_queries))
+        status = response.status_code
+    return {
+        'url': url,
+        'status': status,
+        'queries': queries,
+        'mean_ms': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def measure_routes(user, admin, sample, repeat=20, warm=False, names=None):
+    """
+    Mide todas las rutas de la URLconf.
+
+    Parameters:
+    - user: User, el usuario normal con el que se piden las rutas de usuario.
+    - admin: User, el superusuario con el que se piden las rutas de administración.
+    - sample: dict, los valores de ejemplo para construir las URLs (ver `route_url`).
+    - repeat: int, las peticiones medidas por ruta.
+    - warm: bool, si se conserva la caché del catálogo entre peticiones.
+    - names: iterable de str, limita la medición a estas rutas.
+
+    Returns:
+    - dict: Los resultados de `measure_url` por nombre de ruta.
+    """
+    from django.test import Client
+
+    clients = {'user': Client(), 'admin': Client()}
+    clients['user'].force_login(user)
+    clients['admin'].force_login(admin)
+    results = {}
+    for name, pattern in discover_routes():
+        if names and name not in names:
+            continue
+        client = clients['admin' if name in ADMIN_ROUTES else 'user']
+        results[name] = measure_url(client, route_url(name, pattern, sample), repeat, warm)
+    return results
+
+
+def compare_runs(baseline, current, threshold=1.25):
+    """
+    Compara dos ejecuciones guardadas en JSON.
+
+    Una ruta empeora si su p95 crece más que `threshold` veces o si hace más consultas.
+
+    Returns:
+    - list: Una fila por tamaño y ruta presentes en ambas ejecuciones, con `regression` a True si empeoró.
+    """
+    rows = []
+    for size, routes in current.get('results', {}).items():
+        for name, result in routes.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1.0
+            rows.append({
+                'size': size,
+                'route': name,
+                'baseline_p95_ms': before['p95_ms'],
+                'current_p95_ms': result['p95_ms'],
+                'ratio': round(ratio, 3),
+                'baseline_queries': before['queries'],
+                'current_queries': result['queries'],
+                'regression': ratio > threshold or result['queries'] > before['queries'],
+            })
+    return rows
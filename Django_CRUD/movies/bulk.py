@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Genre, Movie, normalize_genre
+from .signals import bulk_deleting, movies_bulk_changed, movies_bulk_deleted
+
+
+# Acciones masivas del administrador sobre muchas películas a la vez.
+# Cada acción se ejecuta en una sola transacción con sentencias por conjuntos (UPDATE/DELETE ... WHERE
+# id IN (...)) en lotes de BATCH_SIZE IDs, en lugar de guardar o borrar película a película.
+# Al borrar, los receptores post_delete por fila no hacen nada (`bulk_deleting`), así que Django borra
+# las filas dependientes tabla a tabla sin cargarlas (salvo las que aún tienen receptores). Los índices,
+# rankings y cachés se actualizan tras confirmar, con `movies_bulk_deleted` y `movies_bulk_changed`.
+
+DELETE = 'delete'
+SET_GENRE = 'genre'
+SET_AGE_RATING = 'age_rating'
+ACTIONS = (DELETE, SET_GENRE, SET_AGE_RATING)
+
+# IDs por sentencia (SQLite limita el número de variables de una consulta)
+BATCH_SIZE = 500
+
+
+def _batches(movie_ids):
+    movie_ids = sorted(set(movie_ids))
+    for start in range(0, len(movie_ids), BATCH_SIZE):
+        yield movie_ids[start:start + BATCH_SIZE]
+
+
+def delete_movies(movie_ids):
+    """
+    Borra las películas dadas y sus filas dependientes.
+
+    Parameters:
+    - movie_ids: iterable de int, los IDs de las películas a borrar.
+
+    Returns:
+    - int: El número de películas borradas.
+    """
+    deleted = 0
+    movie_ids = list(movie_ids)
+    with transaction.atomic(), bulk_deleting():
+        for batch in _batches(movie_ids):
+            _, counts = Movie.objects.filter(pk__in=batch).delete()
+            deleted += counts.get(Movie._meta.label, 0)
+        if deleted:
+            transaction.on_commit(lambda: movies_bulk_deleted.send(sender=Movie, movie_ids=movie_ids))
+    return deleted
+
+
+def _update(movie_ids, **values):
+    updated = 0
+    movie_ids = list(movie_ids)
+    # `update()` no rellena los campos auto_now; la fecha invalida las páginas de detalle (ETag)
+    values['updated_at'] = timezone.now()
+    with transaction.atomic():
+        for batch in _batches(movie_ids):
+            updated += Movie.objects.filter(pk__in=batch).update(**values)
+        if updated:
+            transaction.on_commit(lambda: movies_bulk_changed.send(sender=Movie, movie_ids=movie_ids))
+    return updated
+
+
+def set_genre(movie_ids, genre):
+    """
+    Cambia el género de las películas dadas.
+
+    Returns:
+    - int: El número de películas modificadas.
+    """
+    name, _ = normalize_genre(genre)
+    return _update(movie_ids, genre=name, genre_ref=Genre.for_name(name))
+
+
+def set_age_rating(movie_ids, age_rating):
+    """
+    Cambia la clasificación por edades de las películas dadas.
+
+    Returns:
+    - int: El número de películas modificadas.
+    """
+    return _update(movie_ids, age_rating=' '.join(age_rating.split()))
+
+
+def apply(action, movie_ids, value=''):
+    """
+    Ejecuta una de las acciones de ACTIONS sobre las películas dadas.
+
+    Returns:
+    - int: El número de películas borradas o modificadas.
+    """
+    if action == DELETE:
+        return delete_movies(movie_ids)
+    if action == SET_GENRE:
+        return set_genre(movie_ids, value)
+    if action == SET_AGE_RATING:
+        return set_age_rating(movie_ids, value)
+    raise ValueError('Unknown action: %s' % action)
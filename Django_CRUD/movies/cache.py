@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+
+from . import compression
+
+
+# Caché versionada de fragmentos del catálogo.
+# Todas las claves incluyen la versión del catálogo, que se incrementa cada vez que se guarda
+# o elimina una película; así los fragmentos antiguos dejan de usarse sin tener que borrarlos.
+
+CACHE_ALIAS = 'movies'
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Devuelve la caché configurada para el catálogo (`CACHES['movies']`).
+    """
+    return caches[CACHE_ALIAS]
+
+
+def get_timeout():
+    return getattr(settings, 'MOVIES_CACHE_TIMEOUT', 600)
+
+
+def catalog_version():
+    """
+    Devuelve la versión actual del catálogo.
+
+    Returns:
+    - int: La versión con la que se construyen las claves de la caché.
+    """
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Partimos de una marca de tiempo para no reutilizar versiones anteriores si la clave se perdió
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalida todos los fragmentos del catálogo incrementando su versión.
+
+    Returns:
+    - int: La nueva versión.
+    """
+    cache = get_cache()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def make_key(*parts, version=None):
+    """
+    Construye una clave de caché a partir de sus partes y de la versión del catálogo.
+    """
+    if version is None:
+        version = catalog_version()
+    return ':'.join(['catalog', str(version)] + [str(part) for part in parts])
+
+
+def _record(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def get_or_render_many(keys, render):
+    """
+    Devuelve los fragmentos guardados en la caché y genera (y guarda) los que falten,
+    con una sola lectura y una sola escritura en la caché.
+
+    Parameters:
+    - keys: dict, asocia cada clave de caché con el objeto a renderizar.
+    - render: callable, recibe un objeto y devuelve su fragmento.
+
+    Returns:
+    - list: Los fragmentos en el mismo orden que `keys`.
+    """
+    cache = get_cache()
+    found = cache.get_many(list(keys))
+    missing = {key: render(item) for key, item in keys.items() if key not in found}
+    if missing:
+        cache.set_many(missing, get_timeout())
+    with _stats_lock:
+        _stats['hits'] += len(keys) - len(missing)
+        _stats['misses'] += len(missing)
+    return [found[key] if key in found else missing[key] for key in keys]
+
+
+def stats():
+    """
+    Devuelve los contadores de aciertos y fallos de la caché en este proceso.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = _stats['misses'] = 0
+
+
+def _page_key(request):
+    """
+    Devuelve la clave de caché de la página, o None si la solicitud no debe usar la caché.
+    """
+    if request.method != 'GET' or len(messages.get_messages(request)):
+        return None
+    role = 'admin' if request.user.is_superuser else 'user'
+    return make_key('page', role, request.get_full_path())
+
+
+def _cached_response(request, key, content):
+    _record(True)
+    response = compression.page_response(request, key, content)
+    response['X-Catalog-Cache'] = 'hit'
+    return response
+
+
+def cache_catalog_page(view):
+    """
+    Decorador que guarda en caché la página completa de un listado del catálogo.
+
+    Solo se usa la caché en peticiones GET sin mensajes pendientes; la clave incluye la ruta
+    completa (cursores, búsqueda) y si el usuario es administrador, ya que cada rol usa su plantilla.
+    Las variantes comprimidas de cada página se guardan junto a ella (ver movies/compression.py).
+    Admite tanto vistas síncronas como `async def`.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            # Los mensajes pueden vivir en la sesión, así que la clave se calcula en un hilo
+            key = await sync_to_async(_page_key)(request)
+            if key is None:
+                return await view(request, *args, **kwargs)
+
+            cache = get_cache()
+            content = await cache.aget(key)
+            if content is not None:
+                return _cached_response(request, key, content)
+
+            _record(False)
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                await cache.aset(key, response.content, get_timeout())
+                compression.compress_response(request, key, response)
+            response['X-Catalog-Cache'] = 'miss'
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = _page_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        cache = get_cache()
+        content = cache.get(key)
+        if content is not None:
+            return _cached_response(request, key, content)
+
+        _record(False)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, response.content, get_timeout())
+            compression.compress_response(request, key, response)
+        response['X-Catalog-Cache'] = 'miss'
+        return response
+    return wrapper
@@ -0,0 +1,124 @@
+import gzip
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from . import cache
+
+
+# Variantes comprimidas de las páginas guardadas en la caché del catálogo.
+# Cada página se comprime una sola vez por codificación y la variante se guarda junto a la página
+# (misma clave con el sufijo de la codificación), así que las siguientes peticiones la sirven sin
+# volver a comprimir. Se usa Brotli si el paquete `brotli` está instalado y el cliente lo acepta, y si
+# no gzip, respetando los pesos `q` de Accept-Encoding; las páginas más cortas que
+# MOVIES_COMPRESS_MIN_LENGTH se envían sin comprimir.
+# Las páginas de detalle no se comprimen: llevan el token CSRF de cada usuario, así que su variante no
+# se podría compartir en la caché, y las visitas repetidas ya se responden con 304 (movies/conditional.py).
+
+def _load_brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def get_min_length():
+    return getattr(settings, 'MOVIES_COMPRESS_MIN_LENGTH', 200)
+
+
+def available_encodings():
+    """
+    Devuelve las codificaciones disponibles en orden de preferencia.
+    """
+    return ('br', 'gzip') if _load_brotli() is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """
+    Convierte una cabecera `Accept-Encoding` en un diccionario {codificación: q}.
+
+    Las codificaciones sin `q` tienen peso 1; un `q` no válido cuenta como 0 (no aceptada).
+    """
+    accepted = {}
+    for item in header.split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(request):
+    """
+    Devuelve la codificación disponible con mayor peso en `Accept-Encoding`, o None si el cliente no
+    acepta ninguna (q=0). A igualdad de peso se usa el orden de `available_encodings`.
+    """
+    accepted = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return _load_brotli().compress(content)
+    # mtime fijo: la misma página produce siempre los mismos bytes
+    return gzip.compress(content, mtime=0)
+
+
+def get_variant(key, content, encoding):
+    """
+    Devuelve la variante comprimida de una página de la caché, comprimiéndola y guardándola si aún no existe.
+
+    Parameters:
+    - key: str, la clave de la página en la caché del catálogo.
+    - content: bytes, la página sin comprimir.
+    - encoding: str, 'br' o 'gzip'.
+    """
+    store = cache.get_cache()
+    variant_key = '%s:%s' % (key, encoding)
+    variant = store.get(variant_key)
+    if variant is None:
+        variant = compress(content, encoding)
+        store.set(variant_key, variant, cache.get_timeout())
+    return variant
+
+
+def page_response(request, key, content):
+    """
+    Construye la respuesta de una página de la caché, comprimida si el cliente lo admite.
+    """
+    encoding = choose_encoding(request)
+    if encoding is None or len(content) < get_min_length():
+        response = HttpResponse(content)
+    else:
+        response = HttpResponse(get_variant(key, content, encoding))
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def compress_response(request, key, response):
+    """
+    Sustituye el contenido de una página recién generada por su variante comprimida, si el cliente la admite.
+    """
+    encoding = choose_encoding(request)
+    if encoding is not None and len(response.content) >= get_min_length():
+        response.content = get_variant(key, response.content, encoding)
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
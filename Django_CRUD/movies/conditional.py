@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import cache
+from .models import Movie
+
+
+# Peticiones condicionales (ETag / Last-Modified) para las páginas de detalle y los listados.
+# Antes de ejecutar la vista se calculan sus validadores con una consulta mínima: la fecha de
+# modificación de la película (por clave primaria) o la versión del catálogo (desde la caché, sin
+# consultas). Si el navegador ya tiene esa versión se responde 304 sin renderizar nada.
+# Las páginas incluyen el usuario y su token CSRF, así que el ETag también depende de ellos (se calcula
+# de nuevo tras la vista, que puede haber creado el secreto CSRF) y las respuestas se marcan como privadas.
+
+def is_enabled():
+    return getattr(settings, 'MOVIES_CONDITIONAL_GET', True)
+
+
+def _cacheable(request):
+    # Los mensajes pendientes se muestran una sola vez, así que esas páginas no se validan
+    return is_enabled() and request.method in ('GET', 'HEAD') and not len(messages.get_messages(request))
+
+
+def make_etag(request, version):
+    """
+    Construye un ETag débil a partir de la versión de la página, el usuario de la sesión y su secreto CSRF.
+    """
+    user = request.user
+    parts = (version, user.pk, user.is_superuser, request.META.get('CSRF_COOKIE', ''))
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return 'W/"%s"' % digest
+
+
+def movie_validators(request, movie_id, **kwargs):
+    """
+    Validadores de la página de detalle de una película: su versión y su fecha de modificación.
+
+    Returns:
+    - tuple | None: (versión, last_modified), o None si la petición no se valida o la película no existe.
+    """
+    if not _cacheable(request):
+        return None
+    updated_at = Movie.objects.filter(pk=movie_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return 'movie:%s:%s' % (movie_id, updated_at.isoformat()), updated_at
+
+
+def catalog_validators(request, *args, **kwargs):
+    """
+    Validadores de un listado del catálogo: la versión del catálogo y la URL completa.
+
+    Los borrados no cambian ninguna fecha de modificación, así que los listados no envían Last-Modified.
+    """
+    if not _cacheable(request):
+        return None
+    return 'catalog:%s:%s' % (cache.catalog_version(), request.get_full_path()), None
+
+
+def _not_modified(request, validators):
+    # 304 si el navegador ya tiene esta versión de la página; si no, None
+    version, last_modified = validators
+    # Last-Modified tiene precisión de segundos
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    return get_conditional_response(request, etag=make_etag(request, version), last_modified=timestamp)
+
+
+def _add_validators(request, response, validators):
+    version, last_modified = validators
+    if response.status_code in (200, 304):
+        response['ETag'] = make_etag(request, version)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Cada usuario tiene su versión de la página y el navegador debe revalidarla en cada visita
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(get_validators):
+    """
+    Decorador que responde 304 si el navegador ya tiene la versión actual de la página.
+
+    Parameters:
+    - get_validators: callable, recibe los argumentos de la vista y devuelve (versión, last_modified) o None.
+
+    Admite tanto vistas síncronas como `async def`; en las asíncronas los validadores se calculan en un hilo.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                validators = await sync_to_async(get_validators)(request, *args, **kwargs)
+                if validators is None:
+                    return await view(request, *args, **kwargs)
+                response = _not_modified(request, validators)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _add_validators(request, response, validators)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            validators = get_validators(request, *args, **kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+            response = _not_modified(request, validators)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _add_validators(request, response, validators)
+        return wrapper
+    return decorator
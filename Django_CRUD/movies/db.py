@@ -0,0 +1,42 @@
+from django.conf import settings
+
+
+# Ajustes de las conexiones SQLite.
+# Django abre SQLite con el modo de diario por defecto (DELETE), en el que los lectores bloquean a los
+# escritores. Cada conexión nueva recibe aquí los PRAGMAs de `MOVIES_SQLITE_PRAGMAS`.
+
+def get_pragmas():
+    return getattr(settings, 'MOVIES_SQLITE_PRAGMAS', {})
+
+
+def configure_sqlite(connection):
+    """
+    Aplica los PRAGMAs configurados a una conexión SQLite recién abierta.
+
+    Parameters:
+    - connection: DatabaseWrapper, la conexión de Django; se ignora si no es SQLite.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas()
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+def current_pragmas(connection, names=None):
+    """
+    Lee el valor efectivo de los PRAGMAs de una conexión SQLite.
+
+    Returns:
+    - dict: El valor de cada PRAGMA consultado.
+    """
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names or get_pragmas():
+            cursor.execute('PRAGMA %s' % name)
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
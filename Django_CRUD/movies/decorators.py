@@ -0,0 +1,38 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.contrib.auth.views import redirect_to_login
+
+
+# Decoradores para las vistas asíncronas.
+# `login_required` de Django 4.2 no admite vistas `async def`, y `request.user` se resuelve de forma
+# perezosa con una consulta a la sesión, que no se puede ejecutar directamente desde el bucle de eventos.
+
+async def aget_user(request):
+    """
+    Resuelve `request.user` en un hilo y lo deja cargado en la solicitud.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida.
+
+    Returns:
+    - User | AnonymousUser: El usuario de la sesión.
+    """
+    user = await sync_to_async(get_user)(request)
+    # A partir de aquí las plantillas y las vistas pueden usar request.user sin tocar la base de datos
+    request.user = user
+    return user
+
+
+def async_login_required(view):
+    """
+    Equivalente asíncrono de `login_required`: redirige al inicio de sesión si el usuario no está autenticado.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,145 @@
+import csv
+import json
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Movie, UserMovieRating
+
+
+# Exportación en streaming del catálogo y de las calificaciones.
+# Las filas se leen con `QuerySet.iterator(chunk_size=...)` y se convierten en trozos de texto
+# a medida que se envían, por lo que la memoria usada no depende del número de filas.
+
+EXPORTS = {
+    'movies': (Movie, [
+        'id', 'title', 'description', 'director', 'release_year', 'duration', 'age_rating', 'genre',
+        'image_url', 'trailer_url', 'rating', 'rating_count', 'updated_at',
+    ]),
+    'ratings': (UserMovieRating, ['id', 'user_id', 'movie_id', 'rating', 'updated_at']),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    # Objeto tipo archivo para que csv.writer devuelva la línea en lugar de escribirla
+    def write(self, value):
+        return value
+
+
+def parse_since(value):
+    """
+    Convierte el parámetro `since` (fecha o fecha y hora ISO 8601) en una fecha y hora con zona horaria.
+
+    Parameters:
+    - value: str, el valor recibido.
+
+    Returns:
+    - datetime | None: La fecha y hora, o None si no se indicó.
+
+    Raises:
+    - ValueError: Si el valor no es una fecha válida.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError('Invalid date: %s' % value)
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def export_rows(kind, since=None, chunk_size=2000):
+    """
+    Recorre las filas a exportar como tuplas, leyendo la base de datos por bloques.
+
+    Parameters:
+    - kind: str, 'movies' o 'ratings'.
+    - since: datetime, si se indica solo se exportan las filas modificadas desde entonces.
+    - chunk_size: int, las filas que se leen de la base de datos en cada bloque.
+
+    Returns:
+    - tuple: (los nombres de las columnas, un iterador de filas).
+    """
+    model, fields = EXPORTS[kind]
+    rows = model.objects.order_by('id')
+    if since is not None:
+        rows = rows.filter(updated_at__gte=since)
+    return fields, rows.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_serialize(value) for value in row])
+
+
+def jsonl_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, map(_serialize, row))), ensure_ascii=False) + '\n'
+
+
+def encode_chunks(lines, compress=False, chunk_bytes=64 * 1024):
+    """
+    Agrupa las líneas en bloques de bytes, comprimidos con gzip si se pide.
+
+    Parameters:
+    - lines: iterable de str, las líneas a enviar.
+    - compress: bool, si se comprime la salida con gzip.
+    - chunk_bytes: int, el tamaño aproximado de cada bloque.
+
+    Returns:
+    - generator: Los bloques de bytes.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+def export_stream(kind, fmt='csv', since=None, compress=False, chunk_size=2000):
+    """
+    Genera la exportación completa como bloques de bytes.
+
+    Parameters:
+    - kind: str, 'movies' o 'ratings'.
+    - fmt: str, 'csv' o 'jsonl'.
+    - since: datetime, filtro opcional por fecha de modificación.
+    - compress: bool, si se comprime con gzip.
+    - chunk_size: int, las filas que se leen de la base de datos en cada bloque.
+
+    Returns:
+    - generator: Los bloques de bytes de la exportación.
+    """
+    fields, rows = export_rows(kind, since=since, chunk_size=chunk_size)
+    lines = csv_lines(fields, rows) if fmt == 'csv' else jsonl_lines(fields, rows)
+    return encode_chunks(lines, compress=compress)
@@ -0,0 +1,175 @@
+from django.db.models import Count, Max, Min
+
+from .cache import get_cache, get_timeout, make_key
+from .models import MAX_INTEGER, Genre, Movie
+
+
+# Filtros por facetas del catálogo: géneros y clasificaciones por edad (casillas) y rangos de año y duración.
+# Los recuentos de cada faceta salen de una única consulta agrupada sobre el conjunto filtrado y se
+# guardan en la caché por firma de filtro, dentro de la versión del catálogo.
+
+RANGE_FILTERS = {
+    'year': 'release_year',
+    'duration': 'duration',
+}
+
+
+def _int_or_none(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    # Los valores fuera del rango de un entero de SQLite se ignoran como si no se hubieran indicado
+    return value if -MAX_INTEGER <= value <= MAX_INTEGER else None
+
+
+def empty_filters():
+    filters = {'genre': [], 'age': []}
+    for name in RANGE_FILTERS:
+        filters['%s_min' % name] = filters['%s_max' % name] = None
+    return filters
+
+
+def parse_filters(params):
+    """
+    Obtiene los filtros de la URL (`genre`, `age`, `year_min`, `year_max`, `duration_min`, `duration_max`).
+
+    Parameters:
+    - params: QueryDict, los parámetros GET de la solicitud.
+
+    Returns:
+    - dict: Los filtros normalizados (listas ordenadas y enteros); los valores no válidos se ignoran.
+    """
+    filters = empty_filters()
+    filters['genre'] = sorted({pk for pk in map(_int_or_none, params.getlist('genre')) if pk is not None})
+    filters['age'] = sorted({value.strip() for value in params.getlist('age') if value.strip()})
+    for name in RANGE_FILTERS:
+        filters['%s_min' % name] = _int_or_none(params.get('%s_min' % name))
+        filters['%s_max' % name] = _int_or_none(params.get('%s_max' % name))
+    return filters
+
+
+def is_filtered(filters):
+    return any(value not in (None, []) for value in filters.values())
+
+
+def signature(filters):
+    """
+    Devuelve una representación estable de los filtros para usarla en las claves de caché.
+    """
+    return ';'.join(
+        '%s=%s' % (name, ','.join(map(str, value)) if isinstance(value, list) else value)
+        for name, value in sorted(filters.items()) if value not in (None, [])
+    )
+
+
+def apply_filters(queryset, filters):
+    """
+    Aplica los filtros a un QuerySet de películas.
+
+    Dentro de una faceta las opciones se combinan con OR y entre facetas con AND.
+    """
+    if filters['genre']:
+        queryset = queryset.filter(genre_ref__in=filters['genre'])
+    if filters['age']:
+        queryset = queryset.filter(age_rating__in=filters['age'])
+    for name, field in RANGE_FILTERS.items():
+        if filters['%s_min' % name] is not None:
+            queryset = queryset.filter(**{'%s__gte' % field: filters['%s_min' % name]})
+        if filters['%s_max' % name] is not None:
+            queryset = queryset.filter(**{'%s__lte' % field: filters['%s_max' % name]})
+    return queryset
+
+
+def count_facets(filters):
+    """
+    Calcula los recuentos de las facetas del conjunto filtrado con una sola consulta agrupada.
+
+    Returns:
+    - dict: `total`, `genres` ({id: (nombre, recuento)}), `age_ratings` ({valor: recuento}) y los
+      límites `year` y `duration` como [mínimo, máximo].
+    """
+    rows = (
+        apply_filters(Movie.objects.all(), filters)
+        .order_by()
+        .values('genre_ref', 'genre_ref__name', 'age_rating')
+        .annotate(
+            count=Count('id'),
+            year_min=Min('release_year'), year_max=Max('release_year'),
+            duration_min=Min('duration'), duration_max=Max('duration'),
+        )
+    )
+    facets = {'total': 0, 'genres': {}, 'age_ratings': {}, 'year': [None, None], 'duration': [None, None]}
+    for row in rows:
+        facets['total'] += row['count']
+        if row['genre_ref'] is not None:
+            name, count = facets['genres'].get(row['genre_ref'], (row['genre_ref__name'], 0))
+            facets['genres'][row['genre_ref']] = (name, count + row['count'])
+        if row['age_rating']:
+            facets['age_ratings'][row['age_rating']] = facets['age_ratings'].get(row['age_rating'], 0) + row['count']
+        for name in RANGE_FILTERS:
+            low, high = facets[name]
+            if row['%s_min' % name] is not None:
+                facets[name][0] = row['%s_min' % name] if low is None else min(low, row['%s_min' % name])
+            if row['%s_max' % name] is not None:
+                facets[name][1] = row['%s_max' % name] if high is None else max(high, row['%s_max' % name])
+    return facets
+
+
+def cached_facets(filters):
+    """
+    Devuelve los recuentos de `count_facets`, guardados en la caché por firma de filtro.
+    """
+    cache = get_cache()
+    key = make_key('facets', signature(filters))
+    facets = cache.get(key)
+    if facets is None:
+        facets = count_facets(filters)
+        cache.set(key, facets, get_timeout())
+    return facets
+
+
+def build_facets(filters):
+    """
+    Prepara las facetas para la plantilla.
+
+    Las opciones salen del catálogo completo (para poder ampliar la selección) y los recuentos
+    del conjunto filtrado actual; ambos vienen de la caché si ya se calcularon.
+
+    Returns:
+    - dict: `genres` y `age_ratings` (listas de opciones con `value`, `label`, `count` y `selected`),
+      `total`, los límites de los rangos y los filtros aplicados.
+    """
+    catalog = cached_facets(empty_filters())
+    current = cached_facets(filters) if is_filtered(filters) else catalog
+    genres = [
+        {'value': pk, 'label': name, 'count': current['genres'].get(pk, (name, 0))[1], 'selected': pk in filters['genre']}
+        for pk, (name, _) in catalog['genres'].items()
+    ]
+    age_ratings = [
+        {'value': value, 'label': value, 'count': current['age_ratings'].get(value, 0), 'selected': value in filters['age']}
+        for value in catalog['age_ratings']
+    ]
+    return {
+        'genres': sorted(genres, key=lambda option: option['label'].casefold()),
+        'age_ratings': sorted(age_ratings, key=lambda option: option['label'].casefold()),
+        'total': current['total'],
+        'year': catalog['year'],
+        'duration': catalog['duration'],
+        'filters': filters,
+        'active': is_filtered(filters),
+    }
+
+
+def assign_genres(movie_ids):
+    """
+    Actualiza `genre_ref` de las películas dadas (para operaciones masivas, que no pasan por `Movie.save`).
+
+    Parameters:
+    - movie_ids: iterable de int, los IDs de las películas creadas o modificadas.
+    """
+    by_text = {}
+    for pk, text in Movie.objects.filter(pk__in=list(movie_ids)).values_list('id', 'genre'):
+        by_text.setdefault(text, []).append(pk)
+    for text, ids in by_text.items():
+        Movie.objects.filter(pk__in=ids).update(genre_ref=Genre.for_name(text))
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Movie, UserMovieRating
+from .models import MAX_INTEGER, Movie, UserMovieRating
+from . import bulk, ratings
 
 class MovieForm(forms.ModelForm):
     class Meta:
@@ -19,6 +20,42 @@ class MovieForm(forms.ModelForm):
 
 
 class UserMovieRatingForm(forms.ModelForm):
+    # Solo estrellas enteras de 1 a 5: los agregados de la película no admiten otros valores
+    rating = forms.TypedChoiceField(choices=[(star, star) for star in ratings.STARS], coerce=int)
+
     class Meta:
         model = UserMovieRating
-        fields = ['rating']
\ No newline at end of file
+        fields = ['rating']
+
+
+class BulkMovieActionForm(forms.Form):
+    """
+    Acción masiva del administrador sobre las películas seleccionadas en el listado (ver movies/bulk.py).
+    """
+    action = forms.ChoiceField(
+        choices=[(bulk.DELETE, 'Delete'), (bulk.SET_GENRE, 'Change genre'), (bulk.SET_AGE_RATING, 'Change age rating')],
+        widget=forms.Select(attrs={'class': 'form-select bg-secondary bg-gradient'}),
+    )
+    value = forms.CharField(
+        max_length=100, required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control bg-secondary bg-gradient', 'placeholder': 'New genre or age rating'}),
+    )
+    ids = forms.Field(required=False, widget=forms.MultipleHiddenInput)
+
+    def clean_ids(self):
+        try:
+            ids = [int(value) for value in self.cleaned_data['ids'] or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Invalid selection.')
+        # IDs fuera del rango de un entero de SQLite harían fallar la consulta
+        if any(not 0 < pk <= MAX_INTEGER for pk in ids):
+            raise forms.ValidationError('Invalid selection.')
+        if not ids:
+            raise forms.ValidationError('Select at least one movie.')
+        return ids
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') in (bulk.SET_GENRE, bulk.SET_AGE_RATING) and not cleaned_data.get('value', '').strip():
+            self.add_error('value', 'Please provide a value.')
+        return cleaned_data
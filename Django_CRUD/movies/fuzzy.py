@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import search
+from .models import Movie, MovieTrigram
+from .typeahead import normalize
+
+
+# Búsqueda tolerante a errores de escritura sobre títulos y directores.
+# Cada campo se descompone en trigramas (como pg_trgm: cada palabra con dos espacios delante y uno
+# detrás) que se guardan en el índice invertido MovieTrigram. Una búsqueda solo lee las filas de los
+# trigramas de la consulta, cuenta los compartidos por película y campo y calcula la similitud
+# compartidos / (trigramas de la consulta + trigramas del campo - compartidos); las películas por
+# encima de MOVIES_FUZZY_THRESHOLD se ordenan por similitud. No hace falta recorrer todo el catálogo.
+
+FIELDS = {
+    MovieTrigram.TITLE: 'title',
+    MovieTrigram.DIRECTOR: 'director',
+}
+
+# Peso de cada campo en la similitud final: a igualdad de parecido gana el título
+FIELD_WEIGHTS = {
+    MovieTrigram.TITLE: 1.0,
+    MovieTrigram.DIRECTOR: 0.9,
+}
+
+
+def get_threshold():
+    return getattr(settings, 'MOVIES_FUZZY_THRESHOLD', 0.3)
+
+
+def trigrams(text):
+    """
+    Devuelve el conjunto de trigramas de un texto normalizado (sin acentos ni mayúsculas).
+    """
+    grams = set()
+    for word in search._TOKEN_RE.findall(normalize(text)):
+        padded = '  %s ' % word
+        grams.update(padded[start:start + 3] for start in range(len(padded) - 2))
+    return grams
+
+
+def similarity(first, second):
+    """
+    Similitud entre dos textos según sus trigramas, entre 0 y 1.
+    """
+    first, second = trigrams(first), trigrams(second)
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+def _rows(movies):
+    for movie in movies:
+        for field, name in FIELDS.items():
+            grams = trigrams(getattr(movie, name))
+            for gram in grams:
+                yield MovieTrigram(trigram=gram, movie_id=movie.pk, field=field, total=len(grams))
+
+
+def index_movies(movies, batch_size=2000):
+    """
+    Reemplaza las filas del índice de trigramas de las películas dadas.
+
+    Parameters:
+    - movies: iterable de Movie, con `id`, `title` y `director`.
+    - batch_size: int, las filas por lote de `bulk_create`.
+    """
+    movies = list(movies)
+    if not movies:
+        return
+    with transaction.atomic():
+        MovieTrigram.objects.filter(movie_id__in=[movie.pk for movie in movies]).delete()
+        MovieTrigram.objects.bulk_create(_rows(movies), batch_size=batch_size)
+
+
+def rebuild_index(batch_size=2000):
+    """
+    Reconstruye por completo el índice de trigramas a partir de la tabla de películas.
+
+    Returns:
+    - int: El número de películas indexadas.
+    """
+    indexed = 0
+    with transaction.atomic():
+        MovieTrigram.objects.all().delete()
+        batch = []
+        for movie in Movie.objects.only('id', *FIELDS.values()).order_by('id').iterator(chunk_size=batch_size):
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                MovieTrigram.objects.bulk_create(_rows(batch), batch_size=batch_size)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            MovieTrigram.objects.bulk_create(_rows(batch), batch_size=batch_size)
+            indexed += len(batch)
+    return indexed
+
+
+def search_movie_ids(query, limit=None, offset=0, threshold=None):
+    """
+    Devuelve los IDs de las películas cuyo título o director se parece a la búsqueda, de más a menos parecida.
+
+    Parameters:
+    - query: str, el término de búsqueda (puede tener errores de escritura).
+    - limit: int, el número máximo de resultados (sin límite si es None).
+    - offset: int, el número de resultados a omitir.
+    - threshold: float, la similitud mínima (por defecto MOVIES_FUZZY_THRESHOLD).
+
+    Returns:
+    - list: Los IDs de las películas.
+    """
+    grams = sorted(trigrams(query))
+    if not grams:
+        return []
+    if threshold is None:
+        threshold = get_threshold()
+
+    # Solo se leen las filas de los trigramas de la consulta (índice movie_trigram_idx); el umbral se
+    # aplica a la similitud ya multiplicada por el peso del campo
+    sql = (
+        'SELECT movie_id, COUNT(*) * 1.0 / (%s + MAX(total) - COUNT(*)) * (CASE field {weights} ELSE 0 END) AS score '
+        'FROM {table} WHERE trigram IN ({grams}) GROUP BY movie_id, field '
+        'HAVING score >= %s'
+    ).format(
+        weights=' '.join(['WHEN %s THEN %s'] * len(FIELD_WEIGHTS)),
+        table=MovieTrigram._meta.db_table,
+        grams=', '.join(['%s'] * len(grams)),
+    )
+    weights = [value for item in FIELD_WEIGHTS.items() for value in item]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [len(grams), *weights, *grams, threshold])
+        rows = cursor.fetchall()
+
+    scores = {}
+    for movie_id, score in rows:
+        scores[movie_id] = max(scores.get(movie_id, 0.0), score)
+    ranked = sorted(scores, key=lambda movie_id: (-scores[movie_id], movie_id))
+    return ranked[offset:offset + limit] if limit is not None else ranked[offset:]
+
+
+def search_with_fallback(query, limit=None, offset=0):
+    """
+    Busca en el índice de texto completo y, si la búsqueda no encuentra nada, por similitud de trigramas.
+
+    Returns:
+    - tuple: (lista de IDs, True si los resultados son aproximados).
+    """
+    ids = search.search_movie_ids(query, limit=limit, offset=offset)
+    if ids or (offset and search.search_movie_ids(query, limit=1)):
+        return ids, False
+    return search_movie_ids(query, limit=limit, offset=offset), True
@@ -0,0 +1,160 @@
+import contextvars
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# Métricas por petición: número y tiempo de las consultas SQL, consultas repetidas (huellas) y
+# tiempo de renderizado de plantillas. La petición en curso se guarda en una variable de contexto,
+# que también ven los hilos de `sync_to_async`, así que funciona igual con vistas síncronas y asíncronas.
+
+_current = contextvars.ContextVar('movies_request_metrics', default=None)
+
+_IN_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Reduce una sentencia SQL a su forma genérica: literales como `?` y listas IN de cualquier longitud como `(...)`.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """
+    Devuelve la huella de una sentencia: igual para la misma consulta con distintos parámetros.
+    """
+    return hashlib.sha1(normalize_sql(sql).encode('utf-8')).hexdigest()[:12]
+
+
+class RequestMetrics:
+    """
+    Consultas y tiempo de renderizado acumulados durante una petición.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.render_time = 0.0
+        self._render_depth = 0
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, duration):
+        with self._lock:
+            self.queries.append((sql, duration))
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def query_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def duplicates(self, threshold=1):
+        """
+        Devuelve las consultas ejecutadas más de `threshold` veces, de más a menos repetida.
+
+        Returns:
+        - list: Diccionarios con `fingerprint`, `count` y `sql` (la forma normalizada).
+        """
+        counts = Counter()
+        examples = {}
+        for sql, _ in self.queries:
+            key = fingerprint(sql)
+            counts[key] += 1
+            examples.setdefault(key, sql)
+        return [
+            {'fingerprint': key, 'count': count, 'sql': normalize_sql(examples[key])}
+            for key, count in counts.most_common() if count > threshold
+        ]
+
+
+def start_request():
+    """
+    Empieza a registrar las métricas de una petición en el contexto actual.
+
+    Returns:
+    - tuple: (RequestMetrics, token para `finish_request`).
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_metrics():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Envoltorio de ejecución (`connection.execute_wrappers`) que mide cada consulta de la petición en curso.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    """
+    Añade `record_query` a una conexión recién abierta (una sola vez).
+    """
+    if getattr(settings, 'MOVIES_REQUEST_METRICS', True) and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentedTemplate(Template):
+    """
+    Plantilla que suma su tiempo de renderizado a la petición en curso.
+
+    Solo se mide el renderizado más externo, para no contar dos veces las plantillas incluidas.
+    """
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics._render_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._render_depth -= 1
+            if not metrics._render_depth:
+                metrics.render_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Motor de plantillas de Django que devuelve `InstrumentedTemplate`.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
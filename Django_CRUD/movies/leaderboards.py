@@ -0,0 +1,182 @@
+import copy
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .cache import get_cache, get_timeout
+from .models import LeaderboardEntry, LeaderboardPrior, Movie
+
+
+# Rankings precalculados del catálogo: mejor valoradas y más valoradas, globales y por género.
+# "Mejor valoradas" ordena por la media bayesiana (rating_sum + m * C) / (rating_count + m), donde C
+# es la media del catálogo y m el número mínimo de votos (MOVIES_LEADERBOARD_MIN_VOTES): una película
+# con un solo voto de 5 estrellas queda cerca de la media hasta que acumula votos.
+# Las filas de una película se reescriben cada vez que cambian sus agregados o su género, y
+# `manage.py rebuild_leaderboards` las reconstruye todas y actualiza C periódicamente.
+
+CHARTS = (LeaderboardEntry.TOP_RATED, LeaderboardEntry.MOST_RATED)
+
+PRIOR_CACHE_KEY = 'leaderboards:prior'
+
+# Media que se usa como prior mientras el catálogo no tiene ninguna calificación
+DEFAULT_MEAN = 3.0
+
+
+def get_min_votes():
+    return getattr(settings, 'MOVIES_LEADERBOARD_MIN_VOTES', 10)
+
+
+def get_size():
+    return getattr(settings, 'MOVIES_LEADERBOARD_SIZE', 10)
+
+
+def catalog_mean():
+    """
+    Calcula la calificación media de todo el catálogo a partir de los agregados de `Movie`.
+
+    Returns:
+    - float | None: La media, o None si no hay calificaciones.
+    """
+    totals = Movie.objects.aggregate(rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+    if not totals['rating_count']:
+        return None
+    return totals['rating_sum'] / totals['rating_count']
+
+
+def get_prior():
+    """
+    Devuelve la media del catálogo fijada en la última reconstrucción (la calcula si aún no existe).
+
+    El valor se guarda en la caché del catálogo; `rebuild` lo reemplaza.
+    """
+    cache = get_cache()
+    mean = cache.get(PRIOR_CACHE_KEY)
+    if mean is None:
+        prior = LeaderboardPrior.objects.first()
+        if prior is None:
+            prior = LeaderboardPrior.objects.create(mean=catalog_mean() or DEFAULT_MEAN)
+        mean = prior.mean
+        cache.set(PRIOR_CACHE_KEY, mean, get_timeout())
+    return mean
+
+
+def weighted_rating(rating_sum, rating_count, mean, min_votes):
+    """
+    Media bayesiana: la media de la película acercada a `mean` cuanto menos votos tiene.
+    """
+    return (rating_sum + min_votes * mean) / (rating_count + min_votes)
+
+
+def _entries(rows, mean, min_votes):
+    for row in rows:
+        if not row['rating_count']:
+            continue
+        scores = {
+            LeaderboardEntry.TOP_RATED: weighted_rating(row['rating_sum'], row['rating_count'], mean, min_votes),
+            LeaderboardEntry.MOST_RATED: float(row['rating_count']),
+        }
+        for genre_id in {None, row['genre_ref']}:
+            for chart, score in scores.items():
+                yield LeaderboardEntry(chart=chart, genre_id=genre_id, movie_id=row['id'], score=score)
+
+
+def _movie_rows(movies):
+    return movies.values('id', 'genre_ref', 'rating_sum', 'rating_count')
+
+
+def update_movies(movie_ids):
+    """
+    Reescribe las filas de los rankings de las películas dadas tras cambiar sus calificaciones o su género.
+
+    Parameters:
+    - movie_ids: iterable de int, los IDs de las películas modificadas.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+    mean = get_prior()
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(movie_id__in=movie_ids).delete()
+        rows = _movie_rows(Movie.objects.filter(pk__in=movie_ids))
+        LeaderboardEntry.objects.bulk_create(_entries(rows, mean, get_min_votes()))
+
+
+def rebuild(batch_size=2000):
+    """
+    Reconstruye todos los rankings con la media actual del catálogo como prior.
+
+    Parameters:
+    - batch_size: int, las filas por lote de `bulk_create`.
+
+    Returns:
+    - tuple: (número de películas clasificadas, media del catálogo usada).
+    """
+    mean = catalog_mean() or DEFAULT_MEAN
+    min_votes = get_min_votes()
+    ranked = 0
+    with transaction.atomic():
+        LeaderboardPrior.objects.all().delete()
+        LeaderboardPrior.objects.create(mean=mean)
+        LeaderboardEntry.objects.all().delete()
+        rows = _movie_rows(Movie.objects.filter(rating_count__gt=0).order_by('id')).iterator(chunk_size=batch_size)
+        batch = []
+        for row in rows:
+            ranked += 1
+            batch.extend(_entries([row], mean, min_votes))
+            if len(batch) >= batch_size:
+                LeaderboardEntry.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            LeaderboardEntry.objects.bulk_create(batch)
+    get_cache().set(PRIOR_CACHE_KEY, mean, get_timeout())
+    return ranked, mean
+
+
+def charts(genre=None, limit=None, names=CHARTS):
+    """
+    Devuelve las primeras películas de varios rankings de un ámbito (el catálogo completo o un género).
+
+    Todos los rankings se leen en una sola consulta (UNION ALL) y cada parte recorre el índice
+    `leaderboard_rank_idx` solo hasta `limit`; las películas se cargan después en una segunda consulta.
+
+    Parameters:
+    - genre: Genre | int | None, el género (None para el catálogo completo).
+    - limit: int, el número de películas por ranking (por defecto MOVIES_LEADERBOARD_SIZE).
+    - names: iterable de str, los rankings a leer.
+
+    Returns:
+    - dict: Para cada ranking, la lista de películas (solo las columnas de las tarjetas) con su
+      puntuación en `chart_score`.
+    """
+    limit = limit or get_size()
+    parts, params = [], []
+    for chart in names:
+        query = (
+            LeaderboardEntry.objects.filter(chart=chart, genre=genre)
+            .order_by('-score', 'movie_id')
+            .values_list('chart', 'movie_id', 'score')[:limit]
+        ).query
+        sql, query_params = query.sql_with_params()
+        parts.append('SELECT * FROM (%s)' % sql)
+        params.extend(query_params)
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(parts), params)
+        rows = sorted(cursor.fetchall(), key=lambda row: (-row[2], row[1]))
+
+    movies = Movie.objects.only(*Movie.CARD_FIELDS).in_bulk({movie_id for _, movie_id, _ in rows})
+    result = {chart: [] for chart in names}
+    for chart, movie_id, score in rows:
+        if movie_id in movies:
+            # Una película puede aparecer en varios rankings, cada uno con su puntuación
+            movie = copy.copy(movies[movie_id])
+            movie.chart_score = score
+            result[chart].append(movie)
+    return result
+
+
+def top(chart, genre=None, limit=None):
+    """
+    Devuelve las primeras películas de un ranking, como `charts`.
+    """
+    return charts(genre=genre, limit=limit, names=[chart])[chart]
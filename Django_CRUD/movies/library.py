@@ -0,0 +1,66 @@
+from asgiref.sync import sync_to_async
+from django.db.models import F
+
+from .models import Movie
+from . import search
+
+
+# Consultas de la lista personal de películas de un usuario.
+# Cada película se obtiene junto con la calificación del propio usuario (`user_rating`)
+# en una única consulta con JOIN, ordenada y filtrada en la base de datos.
+
+def user_library(user):
+    """
+    Devuelve las películas de la lista del usuario ordenadas por título.
+
+    Parameters:
+    - user: User, el usuario dueño de la lista.
+
+    Returns:
+    - QuerySet: Las películas anotadas con `user_rating`, la calificación del usuario (o None).
+    """
+    return (
+        Movie.objects.filter(usermovierating__user=user)
+        .annotate(user_rating=F('usermovierating__rating'))
+        .order_by('title', 'id')
+    )
+
+
+def library_cards(user):
+    """
+    Devuelve la lista del usuario como `user_library`, pero solo con las columnas de las tarjetas.
+    """
+    return user_library(user).only(*Movie.CARD_FIELDS)
+
+
+def search_user_library(user, query):
+    """
+    Busca dentro de la lista del usuario usando el índice de texto completo.
+
+    Parameters:
+    - user: User, el usuario dueño de la lista.
+    - query: str, el término de búsqueda.
+
+    Returns:
+    - list | QuerySet: Las películas encontradas en orden de relevancia, anotadas con `user_rating` y
+      con las columnas de las tarjetas. Si la búsqueda no tiene términos, se devuelve la lista completa
+      ordenada por título.
+    """
+    if not search.build_match_expression(query):
+        return library_cards(user)
+
+    ids = search.search_movie_ids(query, user=user)
+    found = library_cards(user).filter(pk__in=ids).in_bulk()
+    return [found[pk] for pk in ids if pk in found]
+
+
+async def asearch_user_library(user, query):
+    """
+    Versión asíncrona de `search_user_library`; siempre devuelve una lista.
+    """
+    if not search.build_match_expression(query):
+        return [movie async for movie in library_cards(user).aiterator()]
+
+    ids = await sync_to_async(search.search_movie_ids)(query, user=user)
+    found = await library_cards(user).filter(pk__in=ids).ain_bulk()
+    return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento de varios servidores del proyecto (por ejemplo WSGI frente a ASGI) '
+        'con muchas conexiones concurrentes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+', metavar='NAME=URL',
+            help='Servidores a comparar, p. ej. wsgi=http://127.0.0.1:8000; el primero es la referencia.',
+        )
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Ruta a pedir (se puede repetir). Por defecto el catálogo y la búsqueda.')
+        parser.add_argument('--username', required=True, help='Usuario con el que se autentican las peticiones.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Conexiones simultáneas.')
+        parser.add_argument('--requests', type=int, default=1000, help='Peticiones por servidor.')
+        parser.add_argument('--warmup', type=int, default=20, help='Peticiones de calentamiento no medidas.')
+        parser.add_argument('--timeout', type=float, default=10, help='Tiempo máximo por petición en segundos.')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['targets']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError('Targets must look like NAME=URL, got %r.' % target)
+            targets.append((name, url.rstrip('/')))
+
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('User %r does not exist.' % options['username'])
+
+        paths = options['paths'] or ['/user_available_movies/', '/search/?search_query=the', '/user_movies/']
+        session = benchmark.create_session(user)
+        cookie = benchmark.session_cookie(session)
+        try:
+            results = []
+            for name, base_url in targets:
+                urls = [base_url + path for path in paths]
+                if options['warmup']:
+                    benchmark.run_load(urls, cookie, options['concurrency'], options['warmup'], options['timeout'])
+                summary = benchmark.run_load(
+                    urls, cookie, options['concurrency'], options['requests'], options['timeout'],
+                )
+                results.append((name, summary))
+        finally:
+            session.delete()
+
+        baseline = results[0][1]['throughput']
+        self.stdout.write('%-10s %8s %7s %9s %8s %8s %8s %8s' % (
+            'target', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'vs base',
+        ))
+        for name, summary in results:
+            self.stdout.write('%-10s %8d %7d %9.1f %8.1f %8.1f %8.1f %7.2fx' % (
+                name, summary['requests'], summary['errors'], summary['throughput'],
+                summary['p50_ms'], summary['p95_ms'], summary['p99_ms'],
+                summary['throughput'] / baseline if baseline else 0.0,
+            ))
@@ -0,0 +1,117 @@
+import json
+import platform
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from movies import benchmark, synthetic
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia (p50/p95/p99) y las consultas de cada ruta con el cliente de pruebas, '
+        'sobre catálogos sintéticos de varios tamaños en una base de datos de pruebas temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000', help='Tamaños del catálogo (películas), separados por comas.')
+        parser.add_argument('--users', type=int, default=50, help='Usuarios sintéticos.')
+        parser.add_argument('--ratings-per-user', type=int, default=20, help='Calificaciones medias por usuario.')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla de los datos sintéticos.')
+        parser.add_argument('--repeat', type=int, default=20, help='Peticiones medidas por ruta.')
+        parser.add_argument('--warm', action='store_true', help='Conserva la caché del catálogo entre peticiones.')
+        parser.add_argument('--route', action='append', dest='routes', help='Mide solo esta ruta (se puede repetir).')
+        parser.add_argument('--output', '-o', help='Archivo JSON donde guardar los resultados.')
+        parser.add_argument('--baseline', help='Ejecución anterior (JSON) con la que comparar.')
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Cociente de p95 a partir del cual una ruta se considera más lenta.')
+        parser.add_argument('--diff', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                            help='Solo compara dos ejecuciones guardadas, sin medir.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Termina con error si alguna ruta empeora.')
+
+    def handle(self, *args, **options):
+        if options['diff']:
+            baseline, current = (self.load(path) for path in options['diff'])
+            return self.report(benchmark.compare_runs(baseline, current, options['threshold']), options)
+
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers.')
+        baseline = self.load(options['baseline']) if options['baseline'] else None
+
+        run = {
+            'created': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(), 'django': django.get_version(), 'vendor': connection.vendor,
+            },
+            'options': {key: options[key] for key in ('users', 'ratings_per_user', 'seed', 'repeat', 'warm')},
+            'results': {},
+        }
+
+        # Nunca se toca la base de datos configurada: todo ocurre en una base de datos de pruebas temporal
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            admin = User.objects.create_superuser('benchmark_admin', password=None)
+            for size in sizes:
+                self.stdout.write('Seeding %d movies...' % size)
+                synthetic.seed(size, options['users'], ratings_per_user=options['ratings_per_user'], seed=options['seed'])
+                user, sample = self.sample()
+                run['results'][str(size)] = benchmark.measure_routes(
+                    user, admin, sample, repeat=options['repeat'], warm=options['warm'], names=options['routes'],
+                )
+                self.print_results(size, run['results'][str(size)])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(run, output, indent=2)
+            self.stdout.write(self.style.SUCCESS('Results written to %s.' % options['output']))
+        if baseline is not None:
+            self.report(benchmark.compare_runs(baseline, run, options['threshold']), options)
+
+    def sample(self):
+        """
+        Elige el usuario con más calificaciones y una de sus películas como valores de ejemplo.
+        """
+        user = (
+            User.objects.filter(username__startswith=synthetic.USERNAME_PREFIX)
+            .annotate(rated=Count('usermovierating')).order_by('-rated', 'id').first()
+        )
+        movie_ids = list(Movie.objects.filter(usermovierating__user=user).order_by('id').values_list('id', flat=True)[:10])
+        return user, {'movie_id': movie_ids[0], 'ids': movie_ids, 'kind': 'movies', 'query': 'night'}
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as source:
+                return json.load(source)
+        except (OSError, ValueError) as exc:
+            raise CommandError('Cannot read %s: %s' % (path, exc))
+
+    def print_results(self, size, results):
+        self.stdout.write('%-24s %6s %7s %9s %9s %9s' % ('route (%d movies)' % size, 'status', 'queries', 'p50 ms', 'p95 ms', 'p99 ms'))
+        for name, result in results.items():
+            self.stdout.write('%-24s %6s %7d %9.2f %9.2f %9.2f' % (
+                name, result['status'], result['queries'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+            ))
+
+    def report(self, rows, options):
+        self.stdout.write('%-8s %-24s %11s %11s %7s %9s' % ('size', 'route', 'base p95', 'p95', 'ratio', 'queries'))
+        for row in rows:
+            line = '%-8s %-24s %11.2f %11.2f %6.2fx %4d->%-4d' % (
+                row['size'], row['route'], row['baseline_p95_ms'], row['current_p95_ms'], row['ratio'],
+                row['baseline_queries'], row['current_queries'],
+            )
+            self.stdout.write(self.style.ERROR(line + ' REGRESSION') if row['regression'] else line)
+        regressions = [row for row in rows if row['regression']]
+        if regressions and options['fail_on_regression']:
+            raise CommandError('%d route(s) regressed.' % len(regressions))
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import exports
+
+
+class Command(BaseCommand):
+    help = 'Exporta el catálogo o las calificaciones en CSV o JSONL, leyendo la base de datos por bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS), help='Conjunto de datos a exportar.')
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida con gzip.')
+        parser.add_argument('--since', help='Solo filas modificadas desde esta fecha (ISO 8601).')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Filas leídas por bloque.')
+        parser.add_argument('--output', '-o', help='Archivo de salida (por defecto la salida estándar).')
+
+    def handle(self, *args, **options):
+        try:
+            since = exports.parse_since(options['since'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        chunks = exports.export_stream(
+            options['kind'], options['format'], since=since, compress=options['gzip'], chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
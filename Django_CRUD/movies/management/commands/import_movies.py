@@ -0,0 +1,151 @@
+import csv
+import gzip
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from movies.forms import MovieForm
+from movies.models import Movie
+from movies.signals import movies_bulk_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa películas desde un archivo CSV o JSONL (opcionalmente comprimido con gzip), '
+        'validando cada fila como MovieForm e insertando por lotes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo a importar (.csv, .jsonl, con .gz opcional).')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Formato del archivo (por defecto según la extensión).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote y transacción.')
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Actualiza las películas existentes con el mismo título y año en lugar de duplicarlas.',
+        )
+        parser.add_argument('--rejects', help='Archivo JSONL para las filas rechazadas (por defecto <path>.rejects.jsonl).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or self._guess_format(path)
+        batch_size = max(1, options['batch_size'])
+        rejects_path = options['rejects'] or '%s.rejects.jsonl' % path
+
+        self.fields = list(MovieForm._meta.fields)
+        self.upsert = options['upsert']
+        self.created = self.updated = self.rejected = 0
+        started = time.monotonic()
+        processed = 0
+
+        with self._open(path) as source, open(rejects_path, 'w', encoding='utf-8') as rejects:
+            batch = []
+            for line_number, row in self._rows(source, fmt):
+                processed += 1
+                movie = self._validate(line_number, row, rejects)
+                if movie is not None:
+                    batch.append(movie)
+                if len(batch) >= batch_size:
+                    self._save_batch(batch)
+                    batch = []
+                    self._report(processed, started)
+            if batch:
+                self._save_batch(batch)
+            self._report(processed, started)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d rows: %d created, %d updated, %d rejected (see %s).'
+            % (processed, self.created, self.updated, self.rejected, rejects_path)
+        ))
+
+    def _guess_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith('.jsonl') or name.endswith('.ndjson'):
+            return 'jsonl'
+        raise CommandError('Cannot guess the format of %s; use --format.' % path)
+
+    def _open(self, path):
+        try:
+            if path.endswith('.gz'):
+                return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', newline='')
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(exc)
+
+    def _rows(self, source, fmt):
+        # Generador: el archivo se lee fila a fila, sin cargarlo entero en memoria
+        if fmt == 'csv':
+            for line_number, row in enumerate(csv.DictReader(source), start=2):
+                yield line_number, row
+            return
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = line.rstrip('\n')
+            yield line_number, row
+
+    def _validate(self, line_number, row, rejects):
+        if not isinstance(row, dict):
+            self._reject(rejects, line_number, row, {'__all__': [{'message': 'Expected a JSON object.', 'code': 'invalid'}]})
+            return None
+        form = MovieForm(data={field: row.get(field) for field in self.fields})
+        if not form.is_valid():
+            self._reject(rejects, line_number, row, form.errors.get_json_data())
+            return None
+        return form.save(commit=False)
+
+    def _reject(self, rejects, line_number, row, errors):
+        self.rejected += 1
+        rejects.write(json.dumps({'line': line_number, 'row': row, 'errors': errors}, ensure_ascii=False) + '\n')
+
+    def _save_batch(self, movies):
+        # bulk_create y bulk_update no llaman a Movie.save: el extracto de las listas se calcula aquí
+        for movie in movies:
+            movie.update_excerpt()
+        with transaction.atomic():
+            to_create = movies
+            to_update = []
+            if self.upsert:
+                to_create, to_update = self._match_existing(movies)
+            created = Movie.objects.bulk_create(to_create)
+            if to_update:
+                now = timezone.now()
+                for movie in to_update:
+                    movie.updated_at = now
+                fields = [field for field in self.fields if field not in ('title', 'release_year')]
+                fields += ['excerpt', 'excerpt_truncated', 'updated_at']
+                Movie.objects.bulk_update(to_update, fields)
+            movie_ids = [movie.pk for movie in created] + [movie.pk for movie in to_update]
+            # bulk_create y bulk_update no disparan post_save: sincronizamos índices y cachés del lote
+            transaction.on_commit(lambda: movies_bulk_changed.send(sender=Movie, movie_ids=movie_ids))
+        self.created += len(created)
+        self.updated += len(to_update)
+
+    def _match_existing(self, movies):
+        # Clave natural (title, release_year); dentro del lote gana la última fila
+        by_key = {}
+        for movie in movies:
+            by_key[(movie.title, movie.release_year)] = movie
+        existing = Movie.objects.filter(title__in={title for title, _ in by_key}).only('id', 'title', 'release_year')
+        existing_ids = {(movie.title, movie.release_year): movie.pk for movie in existing}
+
+        to_create, to_update = [], []
+        for key, movie in by_key.items():
+            if key in existing_ids:
+                movie.pk = existing_ids[key]
+                to_update.append(movie)
+            else:
+                to_create.append(movie)
+        return to_create, to_update
+
+    def _report(self, processed, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write('%d rows processed (%.0f rows/s)' % (processed, processed / elapsed))
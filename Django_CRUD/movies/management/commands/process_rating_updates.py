@@ -0,0 +1,44 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from movies import writebehind
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula por lotes los agregados de las películas marcadas en modo write-behind '
+        '(MOVIES_RATING_WRITE_BEHIND = "worker"). Al recibir SIGINT o SIGTERM vacía lo pendiente y termina.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Segundos entre vaciados (por defecto MOVIES_RATING_FLUSH_INTERVAL).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Películas por lote.')
+        parser.add_argument('--once', action='store_true', help='Vacía una vez y termina.')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] if options['interval'] is not None else writebehind.get_interval()
+        batch_size = max(1, options['batch_size'])
+
+        if options['once']:
+            self.flush(batch_size)
+            return
+
+        stopped = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopped.set())
+
+        self.stdout.write('Processing rating updates every %gs (Ctrl+C to stop)...' % interval)
+        while not stopped.wait(interval):
+            self.flush(batch_size)
+            close_old_connections()
+        # Vaciado final para no dejar marcas pendientes al detener el proceso
+        self.flush(batch_size)
+        self.stdout.write('Stopped.')
+
+    def flush(self, batch_size):
+        updated = writebehind.flush(batch_size=batch_size)
+        if updated:
+            self.stdout.write('Updated aggregates of %d movie(s).' % updated)
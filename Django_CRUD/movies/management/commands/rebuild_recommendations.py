@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los vecinos ítem-ítem (similitud coseno) que alimentan las recomendaciones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('movie_ids', nargs='*', type=int, help='Solo refresca estas películas (todas por defecto).')
+        parser.add_argument('-k', '--neighbors', type=int, default=recommendations.DEFAULT_NEIGHBORS,
+                            help='Número de vecinos por película.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            saved = recommendations.rebuild_neighbors(k=options['neighbors'], movie_ids=options['movie_ids'] or None)
+        except RuntimeError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(
+            'Saved %d neighbour pairs in %.1fs.' % (saved, time.monotonic() - started)
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import fuzzy, search
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los índices de búsqueda de las películas: texto completo (FTS5) y trigramas.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('The full-text index requires the SQLite backend.')
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Indexed %d movies.' % count))
+        count = fuzzy.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Indexed trigrams of %d movies.' % count))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from movies import leaderboards, ratings
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la suma, el número de votos, el histograma y el promedio de calificaciones de las películas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('movie_ids', nargs='*', type=int, help='IDs de las películas a reparar (todas por defecto).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Películas por lote.')
+
+    def handle(self, *args, **options):
+        updated = ratings.recompute_movie_ratings(options['movie_ids'] or None, batch_size=options['batch_size'])
+        # Los rankings se calculan a partir de los agregados reparados
+        if options['movie_ids']:
+            leaderboards.update_movies(options['movie_ids'])
+        else:
+            leaderboards.rebuild()
+        self.stdout.write(self.style.SUCCESS('Updated rating aggregates of %d movies.' % updated))
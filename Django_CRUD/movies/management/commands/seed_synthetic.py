@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un catálogo sintético reproducible (películas, usuarios y calificaciones con popularidad Zipf) '
+        'para pruebas de rendimiento. Reemplaza los datos sintéticos anteriores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=1000, help='Número de películas.')
+        parser.add_argument('--users', type=int, default=100, help='Número de usuarios.')
+        parser.add_argument('--ratings-per-user', type=int, default=20, help='Calificaciones medias por usuario.')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Exponente de la distribución de popularidad.')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla del generador aleatorio.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por lote de inserción.')
+        parser.add_argument('--clear', action='store_true', help='Solo elimina los datos sintéticos.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            synthetic.clear()
+            self.stdout.write(self.style.SUCCESS('Synthetic data removed.'))
+            return
+
+        started = time.monotonic()
+        counts = synthetic.seed(
+            options['movies'], options['users'], ratings_per_user=options['ratings_per_user'],
+            exponent=options['zipf'], seed=options['seed'], batch_size=max(1, options['batch_size']),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Created %(movies)d movies, %(users)d users and %(ratings)d ratings' % counts
+            + ' in %.1fs.' % (time.monotonic() - started)
+        ))
@@ -0,0 +1,192 @@
+import copy
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from movies import db, ratings
+from movies.models import Genre, Movie, UserMovieRating
+
+
+# Alias de la base de datos temporal; la conexión 'default' del proceso no se modifica
+ALIAS = 'stress'
+
+# Configuración equivalente a la de Django sin ajustes: diario DELETE, sin conexiones persistentes.
+# El tiempo de espera por un bloqueo se fija con --baseline-timeout: Django espera hasta 5 s, lo que
+# oculta los bloqueos como latencia; con una espera corta se ven como errores
+BASELINE = {
+    'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'CONN_MAX_AGE': 0,
+    'CONN_HEALTH_CHECKS': False,
+}
+
+
+def _in_thread(function, *args):
+    """
+    Ejecuta `function` en un hilo propio (con su propia conexión) y devuelve su resultado.
+    """
+    result = {}
+
+    def run():
+        try:
+            result['value'] = function(*args)
+        except BaseException as exc:
+            result['error'] = exc
+        finally:
+            connections[ALIAS].close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result.get('value')
+
+
+def _prepare(writers, movies):
+    # Solo las tablas que usa la carga; las migraciones con datos trabajan sobre la base de datos por defecto
+    with connections[ALIAS].schema_editor() as editor:
+        for model in (User, Genre, Movie, UserMovieRating):
+            editor.create_model(model)
+    User.objects.using(ALIAS).bulk_create([User(username='stress-%d' % index) for index in range(writers)])
+    Movie.objects.using(ALIAS).bulk_create([
+        Movie(
+            title='Stress %d' % index, description='', director='', release_year=2000, duration=100,
+            age_rating='PG', genre='Drama', image_url='', trailer_url='',
+        )
+        for index in range(movies)
+    ])
+    return (
+        list(User.objects.using(ALIAS).values_list('id', flat=True)),
+        list(Movie.objects.using(ALIAS).values_list('id', flat=True)),
+        db.current_pragmas(connections[ALIAS], ['journal_mode', 'synchronous']),
+    )
+
+
+def _rate(user_id, movie_id, stars):
+    """
+    Ejecuta las mismas sentencias que `user_movie_rate` y sus señales: lee la película, crea o actualiza
+    la calificación y aplica la diferencia a los agregados. Las señales no se envían, así que nada se
+    escribe fuera de la base de datos temporal.
+
+    Las dos escrituras van en una transacción para que un bloqueo no deje los agregados a medias; las
+    lecturas van antes, así que la transacción empieza escribiendo y espera el bloqueo con `timeout`.
+    """
+    movie = Movie.objects.using(ALIAS).only('id').get(pk=movie_id)
+    rating = UserMovieRating.objects.using(ALIAS).filter(user_id=user_id, movie_id=movie.pk)
+    old = list(rating.values_list('rating', flat=True))
+    updates = ratings.rating_change_updates(ratings.to_star(old[0]) if old else None, stars)
+    with transaction.atomic(using=ALIAS):
+        if old:
+            rating.update(rating=stars, updated_at=timezone.now())
+        else:
+            UserMovieRating.objects.using(ALIAS).bulk_create([UserMovieRating(user_id=user_id, movie_id=movie.pk, rating=stars)])
+        if updates:
+            Movie.objects.using(ALIAS).filter(pk=movie.pk).update(**updates)
+
+
+def _writer(user_id, movie_ids, operations, stats, lock):
+    """
+    Simula peticiones de `user_movie_rate` de un usuario, cerrando la conexión al final de cada una
+    si no es persistente.
+    """
+    rng = random.Random(user_id)
+    done = locked = 0
+    try:
+        for _ in range(operations):
+            try:
+                _rate(user_id, rng.choice(movie_ids), rng.randint(1, 5))
+                done += 1
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                locked += 1
+            # Fin de la "petición": Django cierra aquí la conexión si no es persistente
+            close_old_connections()
+    finally:
+        connections[ALIAS].close()
+        with lock:
+            stats['operations'] += done
+            stats['locked'] += locked
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de estrés con escritores concurrentes sobre una base de datos SQLite temporal; '
+        'compara la configuración por defecto de Django con la de MOVIES_SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16, help='Hilos que escriben a la vez.')
+        parser.add_argument(
+            '--baseline-timeout', type=float, default=0.05,
+            help='Segundos que la configuración por defecto espera por un bloqueo (Django espera 5).',
+        )
+        parser.add_argument('--operations', type=int, default=200, help='Calificaciones por escritor.')
+        parser.add_argument('--movies', type=int, default=50, help='Películas sobre las que se escribe.')
+        parser.add_argument('--skip-baseline', action='store_true', help='Solo mide la configuración ajustada.')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('This stress test only applies to SQLite databases.')
+
+        baseline = dict(BASELINE, OPTIONS={'timeout': options['baseline_timeout']})
+        modes = [] if options['skip_baseline'] else [('baseline', baseline)]
+        modes.append(('tuned', None))
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for name, overrides in modes:
+                results.append((name, self.run_mode(os.path.join(directory, '%s.sqlite3' % name), overrides, options)))
+
+        self.stdout.write('%-9s %-8s %10s %12s %9s' % ('mode', 'journal', 'operations', 'lock errors', 'ops/s'))
+        for name, result in results:
+            self.stdout.write('%-9s %-8s %10d %12d %9.1f' % (
+                name, result['journal_mode'], result['operations'], result['locked'], result['throughput'],
+            ))
+        if len(results) == 2 and results[0][1]['throughput']:
+            self.stdout.write('Speed-up: %.2fx' % (results[1][1]['throughput'] / results[0][1]['throughput']))
+
+    def run_mode(self, path, overrides, options):
+        """
+        Ejecuta la carga sobre una base de datos nueva en `path`, con la configuración indicada.
+
+        La base de datos se registra con un alias propio (ALIAS) mientras dura la carga y sus
+        conexiones se abren siempre en hilos propios, así que la configuración y la conexión
+        'default' del proceso no se tocan.
+        """
+        settings_dict = copy.deepcopy(connections.settings['default'])
+        settings_dict['NAME'] = path
+        pragmas = db.get_pragmas()
+        if overrides:
+            pragmas = overrides['pragmas']
+            settings_dict.update({key: value for key, value in overrides.items() if key != 'pragmas'})
+
+        stats = {'operations': 0, 'locked': 0}
+        connections.settings[ALIAS] = settings_dict
+        try:
+            with override_settings(MOVIES_SQLITE_PRAGMAS=pragmas):
+                user_ids, movie_ids, effective = _in_thread(_prepare, options['writers'], options['movies'])
+                lock = threading.Lock()
+                threads = [
+                    threading.Thread(target=_writer, args=(user_id, movie_ids, options['operations'], stats, lock))
+                    for user_id in user_ids
+                ]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+        finally:
+            del connections.settings[ALIAS]
+
+        stats['journal_mode'] = effective['journal_mode']
+        stats['throughput'] = stats['operations'] / elapsed if elapsed else 0.0
+        return stats
@@ -0,0 +1,127 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import instrumentation, throttling
+
+logger = logging.getLogger('movies.timing')
+
+
+class RequestTimingMiddleware:
+    """
+    Mide cada petición: consultas SQL (número, tiempo y repetidas) y tiempo de renderizado.
+
+    Los resultados se envían en la cabecera `Server-Timing`, que muestran las herramientas de
+    desarrollo del navegador, y en una línea de log JSON en el logger `movies.timing`. Si una
+    consulta se repite más de `MOVIES_DUPLICATE_QUERY_THRESHOLD` veces (un posible N+1), la línea
+    se registra como WARNING.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = instrumentation.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+        self.report(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = instrumentation.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+        self.report(request, response, metrics)
+        return response
+
+    def report(self, request, response, metrics):
+        threshold = getattr(settings, 'MOVIES_DUPLICATE_QUERY_THRESHOLD', 5)
+        duplicates = metrics.duplicates()
+        total_time = metrics.total_time
+
+        if getattr(settings, 'MOVIES_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join([
+                'db;dur=%.1f;desc="%d queries"' % (metrics.query_time * 1000, metrics.query_count),
+                'dup;desc="%d repeated"' % len(duplicates),
+                'render;dur=%.1f' % (metrics.render_time * 1000),
+                'total;dur=%.1f' % (total_time * 1000),
+            ])
+
+        suspicious = [duplicate for duplicate in duplicates if duplicate['count'] > threshold]
+        level = logging.WARNING if suspicious else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_time * 1000, 2),
+                'db_queries': metrics.query_count,
+                'db_ms': round(metrics.query_time * 1000, 2),
+                'render_ms': round(metrics.render_time * 1000, 2),
+                'duplicates': duplicates,
+            }))
+
+
+class LoadSheddingMiddleware:
+    """
+    Aplica los límites de movies/throttling.py: cubos de tokens por IP y por usuario en las rutas caras
+    (429) y un máximo de peticiones simultáneas por proceso (503), ambos con la cabecera `Retry-After`.
+
+    Va después de AuthenticationMiddleware para conocer el usuario de la sesión. El límite de peticiones
+    simultáneas se comprueba primero, para que una petición rechazada con 503 no gaste tokens.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rule = throttling.get_rule(request)
+        try:
+            throttling.enter(throttled=rule is not None)
+        except throttling.Rejection as rejection:
+            return rejection.response()
+        try:
+            if rule is not None:
+                try:
+                    throttling.check_rate(*rule, throttling.identities(request))
+                except throttling.Rejection as rejection:
+                    return rejection.response()
+            return self.get_response(request)
+        finally:
+            throttling.leave()
+
+    async def __acall__(self, request):
+        rule = throttling.get_rule(request)
+        try:
+            throttling.enter(throttled=rule is not None)
+        except throttling.Rejection as rejection:
+            return rejection.response()
+        try:
+            if rule is not None:
+                # Leer la sesión puede consultar la base de datos
+                keys = await sync_to_async(throttling.identities)(request)
+                try:
+                    throttling.check_rate(*rule, keys)
+                except throttling.Rejection as rejection:
+                    return rejection.response()
+            return await self.get_response(request)
+        finally:
+            throttling.leave()
@@ -0,0 +1,67 @@
+# Generated by Django 4.2 on 2026-10-18 19:48
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    UserMovieRating = apps.get_model('movies', 'UserMovieRating')
+
+    star_counts = {'rating_%d' % star: Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    rows = (
+        UserMovieRating.objects.filter(rating__isnull=False)
+        .values('movie_id')
+        .annotate(rating_sum=Sum('rating'), rating_count=Count('id'), **star_counts)
+    )
+    for row in rows:
+        movie_id = row.pop('movie_id')
+        row['rating_sum'] = int(row['rating_sum'])
+        row['rating'] = row['rating_sum'] / row['rating_count']
+        Movie.objects.filter(pk=movie_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
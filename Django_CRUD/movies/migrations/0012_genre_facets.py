@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 20:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_genres(apps, schema_editor):
+    Genre = apps.get_model('movies', 'Genre')
+    Movie = apps.get_model('movies', 'Movie')
+
+    # Agrupamos las variantes del texto libre ("drama", "Drama ") bajo la misma clave
+    variants = {}
+    for text in Movie.objects.values_list('genre', flat=True).distinct():
+        name = ' '.join((text or '').split())
+        if name:
+            variants.setdefault(name.casefold(), (name, []))[1].append(text)
+    for key, (name, texts) in variants.items():
+        genre = Genre.objects.create(key=key, name=name)
+        Movie.objects.filter(genre__in=texts).update(genre_ref=genre)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_movieneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movies', to='movies.genre'),
+        ),
+        migrations.RunPython(backfill_genres, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre_ref', 'title', 'id'], name='movie_genre_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['age_rating'], name='movie_age_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_year'], name='movie_release_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['duration'], name='movie_duration_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 20:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_genre_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRatingUpdate',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='movies.movie')),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+def backfill_excerpts(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+
+    # Mismo cálculo que models.make_excerpt, por lotes para no cargar todas las descripciones a la vez
+    batch = []
+    for movie in Movie.objects.only('id', 'description').iterator(chunk_size=2000):
+        description = movie.description or ''
+        movie.excerpt = description[:100]
+        movie.excerpt_truncated = len(description) > 100
+        batch.append(movie)
+        if len(batch) >= 2000:
+            Movie.objects.bulk_update(batch, ['excerpt', 'excerpt_truncated'])
+            batch = []
+    if batch:
+        Movie.objects.bulk_update(batch, ['excerpt', 'excerpt_truncated'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_pendingratingupdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='excerpt_truncated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 20:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_leaderboards(apps, schema_editor):
+    LeaderboardEntry = apps.get_model('movies', 'LeaderboardEntry')
+    LeaderboardPrior = apps.get_model('movies', 'LeaderboardPrior')
+    Movie = apps.get_model('movies', 'Movie')
+
+    # Mismo cálculo que movies.leaderboards.rebuild, con el número mínimo de votos por defecto
+    totals = Movie.objects.aggregate(rating_sum=models.Sum('rating_sum'), rating_count=models.Sum('rating_count'))
+    mean = totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 3.0
+    LeaderboardPrior.objects.create(mean=mean)
+    entries = []
+    rated = Movie.objects.filter(rating_count__gt=0).values('id', 'genre_ref', 'rating_sum', 'rating_count')
+    for row in rated.iterator(chunk_size=2000):
+        scores = {
+            'top_rated': (row['rating_sum'] + 10 * mean) / (row['rating_count'] + 10),
+            'most_rated': float(row['rating_count']),
+        }
+        for genre_id in {None, row['genre_ref']}:
+            for chart, score in scores.items():
+                entries.append(LeaderboardEntry(chart=chart, genre_id=genre_id, movie_id=row['id'], score=score))
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0014_movie_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardPrior',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mean', models.FloatField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chart', models.CharField(choices=[('top_rated', 'Top rated'), ('most_rated', 'Most rated')], max_length=20)),
+                ('score', models.FloatField()),
+                ('genre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies.genre')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='movies.movie')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['chart', 'genre', '-score', 'movie'], name='leaderboard_rank_idx'),
+        ),
+        migrations.RunPython(build_leaderboards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-18 20:28
+
+from django.db import migrations, models
+import re
+import unicodedata
+
+import django.db.models.deletion
+
+
+def _trigrams(text):
+    # Mismo cálculo que fuzzy.trigrams en el momento de esta migración
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    grams = set()
+    for word in re.findall(r'\w+', stripped):
+        padded = '  %s ' % word
+        grams.update(padded[start:start + 3] for start in range(len(padded) - 2))
+    return grams
+
+
+def backfill_trigrams(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    MovieTrigram = apps.get_model('movies', 'MovieTrigram')
+
+    batch = []
+    for movie in Movie.objects.only('id', 'title', 'director').iterator(chunk_size=2000):
+        for field, text in ((1, movie.title), (2, movie.director)):
+            grams = _trigrams(text)
+            batch.extend(
+                MovieTrigram(trigram=gram, movie_id=movie.id, field=field, total=len(grams)) for gram in grams
+            )
+        if len(batch) >= 2000:
+            MovieTrigram.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        MovieTrigram.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('field', models.PositiveSmallIntegerField(choices=[(1, 'title'), (2, 'director')])),
+                ('total', models.PositiveSmallIntegerField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies.movie')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movietrigram',
+            index=models.Index(fields=['trigram', 'movie', 'field', 'total'], name='movie_trigram_idx'),
+        ),
+        migrations.RunPython(backfill_trigrams, migrations.RunPython.noop),
+    ]
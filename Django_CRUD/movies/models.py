@@ -1,28 +1,270 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
+
+def normalize_genre(name):
+    """
+    Normaliza el texto libre de un género: espacios colapsados para mostrarlo y minúsculas para compararlo.
+
+    Returns:
+    - tuple: (nombre, clave); ambos vacíos si el texto no tiene contenido.
+    """
+    name = ' '.join((name or '').split())
+    return name, name.casefold()
+
+
+# Mayor valor que admite una columna INTEGER (entero con signo de 64 bits); los IDs y números que llegan
+# en la URL se validan contra él antes de usarlos en una consulta
+MAX_INTEGER = 2 ** 63 - 1
+
+
+# Caracteres de la descripción que se muestran en las tarjetas de las listas
+EXCERPT_LENGTH = 100
+
+
+def make_excerpt(description):
+    """
+    Calcula el extracto de una descripción para las tarjetas de las listas.
+
+    Returns:
+    - tuple: (los primeros EXCERPT_LENGTH caracteres, True si la descripción es más larga).
+    """
+    description = description or ''
+    return description[:EXCERPT_LENGTH], len(description) > EXCERPT_LENGTH
+
+
+class Genre(models.Model):
+    """
+    Género normalizado del catálogo; `Movie.genre` sigue siendo texto libre y `Movie.genre_ref` apunta aquí.
+    """
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def for_name(cls, name):
+        """
+        Devuelve (o crea) el género que corresponde a un texto libre, o None si está vacío.
+        """
+        name, key = normalize_genre(name)
+        if not key:
+            return None
+        genre, _ = cls.objects.get_or_create(key=key, defaults={'name': name})
+        return genre
+
+
 class Movie(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
+    # Extracto precalculado de `description` para las listas, que así no leen el texto completo
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
+    excerpt_truncated = models.BooleanField(default=False, editable=False)
     director = models.CharField(max_length=100)
     release_year = models.IntegerField(null=True)
     duration = models.IntegerField(null=True)
     age_rating = models.CharField(max_length=100, blank=True)
     genre = models.CharField(max_length=100)
+    # Género normalizado para filtrar por facetas; se mantiene al guardar a partir de `genre`
+    genre_ref = models.ForeignKey(Genre, null=True, blank=True, on_delete=models.SET_NULL, related_name='movies')
     rating = models.FloatField(null=True)
+    # Agregados incrementales de las calificaciones (ver movies/ratings.py)
+    rating_sum = models.PositiveBigIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
     image_url = models.URLField()
     trailer_url = models.URLField()
     users = models.ManyToManyField(User, through='UserMovieRating')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Índice para la paginación por cursor sobre (title, id)
+            models.Index(fields=['title', 'id'], name='movie_title_id_idx'),
+            # Índices de los filtros por facetas (ver movies/facets.py)
+            models.Index(fields=['genre_ref', 'title', 'id'], name='movie_genre_title_idx'),
+            models.Index(fields=['age_rating'], name='movie_age_rating_idx'),
+            models.Index(fields=['release_year'], name='movie_release_year_idx'),
+            models.Index(fields=['duration'], name='movie_duration_idx'),
+        ]
+
+    # Campos que solo se modifican con actualizaciones atómicas desde movies/ratings.py
+    AGGREGATE_FIELDS = ('rating', 'rating_sum', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+
+    # Columnas que muestran las tarjetas de las listas; el resto se difiere con `.only(*CARD_FIELDS)`
+    CARD_FIELDS = ('id', 'title', 'release_year', 'excerpt', 'excerpt_truncated', 'image_url')
 
     def __str__(self):
         return self.title
 
+    def update_excerpt(self):
+        """
+        Recalcula `excerpt` a partir de `description`; las operaciones masivas lo llaman antes de guardar.
+        """
+        self.excerpt, self.excerpt_truncated = make_excerpt(self.description)
+
+    # Género tal como se leyó de la base de datos, para resolver `genre_ref` solo cuando cambia
+    _loaded_genre = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_genre = instance.__dict__.get('genre')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if 'genre' in self.__dict__ and (self.genre != self._loaded_genre or self.genre_ref_id is None):
+            self.genre_ref = Genre.for_name(self.genre)
+            self._loaded_genre = self.genre
+        if 'description' in self.__dict__:
+            self.update_excerpt()
+        # Al editar una película no sobrescribimos los agregados, que pueden haber cambiado
+        # en otra petición desde que se leyó la instancia
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.AGGREGATE_FIELDS
+            ]
+        elif kwargs.get('update_fields') is not None and 'description' in kwargs['update_fields']:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'excerpt', 'excerpt_truncated'}
+        super().save(*args, **kwargs)
+
+    @property
+    def rating_histogram(self):
+        """
+        Devuelve el número de votos por estrella, de 1 a 5.
+        """
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
 class UserMovieRating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
-    rating = models.FloatField(choices=[(i, i) for i in range(1, 6)], null=True, blank=True) 
+    rating = models.FloatField(choices=[(i, i) for i in range(1, 6)], null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Calificación guardada en la base de datos, para calcular la diferencia al guardar o borrar.
+    # Se vuelve a leer dentro de la escritura (ver `_lock_stored_rating`): la leída al cargar la fila
+    # puede haber cambiado si dos peticiones califican a la vez.
+    _loaded_rating = None
 
     class Meta:
         unique_together = ('user', 'movie')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
 
+    def _lock_stored_rating(self):
+        """
+        Bloquea la fila hasta el final de la transacción y devuelve la calificación guardada.
+
+        Se usa un UPDATE condicional (WHERE rating = <la esperada>) en lugar de `select_for_update`,
+        que SQLite ignora: la primera escritura de la transacción bloquea la fila (la base de datos en
+        SQLite), así que el valor devuelto no cambia hasta confirmar.
+
+        Returns:
+        - float | None: La calificación guardada, o None si no tiene o la fila ya no existe.
+        """
+        rows = UserMovieRating.objects.filter(pk=self.pk)
+        stored = self._loaded_rating
+        while True:
+            expected = rows.filter(rating__isnull=True) if stored is None else rows.filter(rating=stored)
+            if expected.update(rating=models.F('rating')):
+                return stored
+            current = list(rows.values_list('rating', flat=True))
+            if not current:
+                return None
+            stored = current[0]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            if not self._state.adding:
+                self._loaded_rating = self._lock_stored_rating()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            self._loaded_rating = self._lock_stored_rating()
+            return super().delete(*args, **kwargs)
+
+
+class MovieNeighbor(models.Model):
+    """
+    Película parecida a otra según las calificaciones de los usuarios (ver movies/recommendations.py).
+    """
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbor_of')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('movie', 'neighbor')
+
+
+class PendingRatingUpdate(models.Model):
+    """
+    Película con calificaciones cuyos agregados aún no se han recalculado (modo write-behind 'worker',
+    ver movies/writebehind.py). Una fila por película: las calificaciones repetidas se agrupan.
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    marked_at = models.DateTimeField(auto_now=True)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Posición de una película en un ranking precalculado (ver movies/leaderboards.py).
+
+    Hay una fila por película calificada, ranking y ámbito: el catálogo completo (`genre` vacío)
+    y su género. Los rankings se leen en orden de `score` con el índice `leaderboard_rank_idx`.
+    """
+    TOP_RATED = 'top_rated'
+    MOST_RATED = 'most_rated'
+    CHARTS = [(TOP_RATED, 'Top rated'), (MOST_RATED, 'Most rated')]
+
+    chart = models.CharField(max_length=20, choices=CHARTS)
+    genre = models.ForeignKey(Genre, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chart', 'genre', '-score', 'movie'], name='leaderboard_rank_idx'),
+        ]
+
+
+class LeaderboardPrior(models.Model):
+    """
+    Calificación media del catálogo usada como prior de la media bayesiana de los rankings.
+
+    Se fija en cada reconstrucción completa; las actualizaciones incrementales reutilizan el mismo valor.
+    """
+    mean = models.FloatField()
+    built_at = models.DateTimeField(auto_now=True)
+
+
+class MovieTrigram(models.Model):
+    """
+    Entrada del índice invertido de trigramas para la búsqueda tolerante a errores (ver movies/fuzzy.py).
+
+    Una fila por trigrama distinto de cada campo indexado de la película; `total` es el número de
+    trigramas distintos del campo, necesario para calcular la similitud sin leer el resto de filas.
+    """
+    TITLE = 1
+    DIRECTOR = 2
+    FIELDS = [(TITLE, 'title'), (DIRECTOR, 'director')]
+
+    trigram = models.CharField(max_length=3)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    field = models.PositiveSmallIntegerField(choices=FIELDS)
+    total = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'movie', 'field', 'total'], name='movie_trigram_idx'),
+        ]
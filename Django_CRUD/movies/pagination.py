@@ -0,0 +1,246 @@
+import base64
+import binascii
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+
+from .models import MAX_INTEGER
+
+
+# Paginación por cursor (keyset) sobre el par (title, id).
+# A diferencia de OFFSET, cada página se resuelve con una búsqueda en el índice
+# (title, id), por lo que el coste no crece con el tamaño del catálogo.
+
+def _encode(value):
+    raw = json.dumps(value, ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(value):
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        return json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def encode_cursor(movie):
+    """
+    Codifica la posición de una película en un cursor opaco para la URL.
+
+    Parameters:
+    - movie: Movie, la película que marca el borde de la página.
+
+    Returns:
+    - str: El cursor codificado en base64 apto para URLs.
+    """
+    return _encode([movie.title, movie.id])
+
+
+def decode_cursor(value):
+    """
+    Decodifica un cursor generado por `encode_cursor`.
+
+    Parameters:
+    - value: str, el cursor recibido en la URL.
+
+    Returns:
+    - tuple | None: El par (title, id) o None si el cursor no es válido (incluido un id fuera de rango).
+    """
+    data = _decode(value)
+    if not isinstance(data, list) or len(data) != 2:
+        return None
+    title, pk = data
+    if not isinstance(title, str) or not isinstance(pk, int) or not -MAX_INTEGER <= pk <= MAX_INTEGER:
+        return None
+    return title, pk
+
+
+def encode_offset(offset):
+    """
+    Codifica una posición dentro de una lista ordenada por relevancia.
+    """
+    return _encode({'offset': offset})
+
+
+def decode_offset(value):
+    """
+    Decodifica un cursor generado por `encode_offset`; devuelve 0 si no es válido.
+    """
+    data = _decode(value)
+    if not isinstance(data, dict) or not isinstance(data.get('offset'), int) or data['offset'] > MAX_INTEGER:
+        return 0
+    return max(0, data['offset'])
+
+
+def get_page_size(request):
+    """
+    Obtiene el tamaño de página solicitado, acotado por la configuración.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida.
+
+    Returns:
+    - int: El número de películas por página.
+    """
+    default = getattr(settings, 'MOVIES_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'MOVIES_MAX_PAGE_SIZE', 100)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+class KeysetPage:
+    """
+    Una página de resultados junto con los cursores para navegar hacia adelante y hacia atrás.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor, base_url, params, previous_param='before'):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.has_next = next_cursor is not None
+        self.has_previous = previous_cursor is not None
+        self._base_url = base_url
+        self._params = params
+        self._previous_param = previous_param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _url(self, direction, cursor):
+        params = self._params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[direction] = cursor
+        return '%s?%s' % (self._base_url, params.urlencode())
+
+    @property
+    def next_url(self):
+        return self._url('after', self.next_cursor) if self.next_cursor else None
+
+    @property
+    def previous_url(self):
+        return self._url(self._previous_param, self.previous_cursor) if self.previous_cursor else None
+
+
+def _keyset_query(queryset, request):
+    """
+    Prepara la consulta de una página por cursor; `paginate_movies` y `apaginate_movies` la comparten.
+
+    Returns:
+    - tuple: (consulta limitada a size + 1 filas, size, after, before).
+    """
+    size = get_page_size(request)
+    after = decode_cursor(request.GET.get('after'))
+    before = decode_cursor(request.GET.get('before'))
+
+    if before is not None:
+        # Recorremos el índice en sentido inverso y luego restauramos el orden
+        title, pk = before
+        queryset = (
+            queryset.filter(Q(title__lt=title) | Q(title=title, id__lt=pk))
+            .order_by('-title', '-id')
+        )
+    else:
+        if after is not None:
+            title, pk = after
+            queryset = queryset.filter(Q(title__gt=title) | Q(title=title, id__gt=pk))
+        queryset = queryset.order_by('title', 'id')
+    return queryset[:size + 1], size, after, before
+
+
+def _keyset_page(rows, size, after, before, request, base_url):
+    if before is not None:
+        has_previous = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        has_next = True
+    else:
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = after is not None
+
+    if base_url is None:
+        base_url = request.path
+    next_cursor = encode_cursor(rows[-1]) if has_next and rows else None
+    previous_cursor = encode_cursor(rows[0]) if has_previous and rows else None
+    return KeysetPage(rows, next_cursor, previous_cursor, base_url, request.GET.copy())
+
+
+def paginate_movies(queryset, request, base_url=None):
+    """
+    Devuelve una página de películas ordenadas por (title, id) a partir de los cursores de la URL.
+
+    Parameters:
+    - queryset: QuerySet, las películas a paginar (sin ordenar).
+    - request: HttpRequest, la solicitud HTTP con los parámetros `after`, `before` y `page_size`.
+    - base_url: str, la URL a la que apuntan los enlaces de navegación (por defecto la ruta actual).
+
+    Returns:
+    - KeysetPage: La página con las películas y los enlaces anterior/siguiente.
+    """
+    query, size, after, before = _keyset_query(queryset, request)
+    return _keyset_page(list(query), size, after, before, request, base_url)
+
+
+async def apaginate_movies(queryset, request, base_url=None):
+    """
+    Versión asíncrona de `paginate_movies` para las vistas ASGI.
+    """
+    query, size, after, before = _keyset_query(queryset, request)
+    rows = [movie async for movie in query.aiterator()]
+    return _keyset_page(rows, size, after, before, request, base_url)
+
+
+def _ranked_page(ids, movies, size, offset, request, base_url):
+    has_next = len(ids) > size
+    rows = [movies[pk] for pk in ids[:size] if pk in movies]
+
+    if base_url is None:
+        base_url = request.path
+    next_cursor = encode_offset(offset + size) if has_next else None
+    previous_cursor = encode_offset(max(0, offset - size)) if offset > 0 else None
+    return KeysetPage(rows, next_cursor, previous_cursor, base_url, request.GET.copy(), previous_param='after')
+
+
+def paginate_ranked(queryset, fetch_ids, request, base_url=None):
+    """
+    Pagina una lista de películas ordenada por relevancia (por ejemplo, resultados de búsqueda).
+
+    Parameters:
+    - queryset: QuerySet, las películas de las que se obtienen las filas de la página.
+    - fetch_ids: callable, recibe (limit, offset) y devuelve los IDs de las películas en orden de relevancia.
+    - request: HttpRequest, la solicitud HTTP con los parámetros `after` y `page_size`.
+    - base_url: str, la URL a la que apuntan los enlaces de navegación (por defecto la ruta actual).
+
+    Returns:
+    - KeysetPage: La página con las películas en el orden de relevancia.
+    """
+    size = get_page_size(request)
+    offset = decode_offset(request.GET.get('after'))
+    ids = fetch_ids(size + 1, offset)
+
+    # Una sola consulta para todas las películas de la página, respetando el orden del ranking
+    movies = queryset.in_bulk(ids[:size])
+    return _ranked_page(ids, movies, size, offset, request, base_url)
+
+
+async def apaginate_ranked(queryset, fetch_ids, request, base_url=None):
+    """
+    Versión asíncrona de `paginate_ranked`; `fetch_ids` es síncrona y se ejecuta en un hilo.
+    """
+    size = get_page_size(request)
+    offset = decode_offset(request.GET.get('after'))
+    ids = await sync_to_async(fetch_ids)(size + 1, offset)
+    movies = await queryset.ain_bulk(ids[:size])
+    return _ranked_page(ids, movies, size, offset, request, base_url)
@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Movie, UserMovieRating
+
+
+# Agregados incrementales de calificaciones.
+# Cada película guarda la suma, el número de votos y un histograma de 1 a 5 estrellas;
+# un cambio de calificación se aplica como una diferencia con expresiones F(), por lo que
+# su coste no depende del número de calificaciones de la película.
+
+STARS = range(1, 6)
+
+
+def to_star(value):
+    """
+    Convierte una calificación guardada (1 a 5, validada por UserMovieRatingForm) en un número de estrellas.
+
+    No se recorta al rango: los agregados incrementales deben coincidir con los que calcula
+    `aggregate_ratings` a partir de los valores guardados.
+
+    Parameters:
+    - value: la calificación (float, int, str o None).
+
+    Returns:
+    - int | None: El número de estrellas o None si la película no está calificada.
+    """
+    if value in (None, ''):
+        return None
+    return int(round(float(value)))
+
+
+def rating_change_updates(old, new):
+    """
+    Calcula las expresiones de actualización de `Movie` para pasar de la calificación `old` a `new`.
+
+    Parameters:
+    - old: int | None, la calificación anterior en estrellas.
+    - new: int | None, la calificación nueva en estrellas.
+
+    Returns:
+    - dict: Los valores para `QuerySet.update()`, vacío si no hay cambios.
+    """
+    if old == new:
+        return {}
+    sum_delta = (new or 0) - (old or 0)
+    count_delta = (new is not None) - (old is not None)
+    updates = {
+        'rating_sum': F('rating_sum') + sum_delta,
+        'rating_count': F('rating_count') + count_delta,
+        # El promedio se calcula en la misma sentencia UPDATE con los valores anteriores de la fila
+        'rating': Case(
+            When(rating_count=-count_delta, then=Value(None)),
+            default=Cast(F('rating_sum') + sum_delta, FloatField()) / (F('rating_count') + count_delta),
+            output_field=FloatField(),
+        ),
+        'updated_at': timezone.now(),
+    }
+    if old is not None:
+        updates['rating_%d' % old] = F('rating_%d' % old) - 1
+    if new is not None:
+        updates['rating_%d' % new] = F('rating_%d' % new) + 1
+    return updates
+
+
+def apply_rating_change(movie_id, old, new):
+    """
+    Actualiza de forma atómica los agregados de una película tras cambiar una calificación.
+
+    Parameters:
+    - movie_id: int, el ID de la película calificada.
+    - old: la calificación anterior (None si no existía).
+    - new: la calificación nueva (None si se eliminó).
+    """
+    updates = rating_change_updates(to_star(old), to_star(new))
+    if updates:
+        Movie.objects.filter(pk=movie_id).update(**updates)
+
+
+def aggregate_ratings(movie_ids=None):
+    """
+    Calcula desde cero los agregados de calificaciones con una única consulta agrupada.
+
+    Parameters:
+    - movie_ids: iterable de int, las películas a calcular (todas si es None).
+
+    Returns:
+    - dict: Para cada ID de película, un diccionario con `rating_sum`, `rating_count` y `rating_1`..`rating_5`.
+    """
+    ratings = UserMovieRating.objects.filter(rating__isnull=False)
+    if movie_ids is not None:
+        ratings = ratings.filter(movie_id__in=movie_ids)
+    star_counts = {'rating_%d' % star: Count('id', filter=Q(rating=star)) for star in STARS}
+    rows = ratings.values('movie_id').annotate(rating_sum=Sum('rating'), rating_count=Count('id'), **star_counts)
+    return {row.pop('movie_id'): row for row in rows}
+
+
+def recompute_movie_ratings(movie_ids=None, batch_size=500):
+    """
+    Recalcula y guarda los agregados de calificaciones de las películas indicadas.
+
+    Sirve para la carga inicial y para reparar agregados que se hayan desincronizado.
+
+    Parameters:
+    - movie_ids: iterable de int, las películas a reparar (todas si es None).
+    - batch_size: int, el número de películas por lote de `bulk_update`.
+
+    Returns:
+    - int: El número de películas actualizadas.
+    """
+    fields = ['rating', 'rating_sum', 'rating_count', 'updated_at'] + ['rating_%d' % star for star in STARS]
+    movies = Movie.objects.only('id', *fields).order_by('id')
+    if movie_ids is not None:
+        movie_ids = list(movie_ids)
+        movies = movies.filter(pk__in=movie_ids)
+
+    updated = 0
+    with transaction.atomic():
+        batch = []
+        for movie in movies.iterator(chunk_size=batch_size):
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                updated += _store_aggregates(batch, fields)
+                batch = []
+        if batch:
+            updated += _store_aggregates(batch, fields)
+    return updated
+
+
+def _store_aggregates(movies, fields):
+    # Una consulta agrupada por lote de películas y una actualización masiva
+    aggregates = aggregate_ratings([movie.id for movie in movies])
+    now = timezone.now()
+    for movie in movies:
+        movie.updated_at = now
+        values = aggregates.get(movie.id, {})
+        movie.rating_sum = int(values.get('rating_sum') or 0)
+        movie.rating_count = values.get('rating_count', 0)
+        for star in STARS:
+            setattr(movie, 'rating_%d' % star, values.get('rating_%d' % star, 0))
+        movie.rating = movie.rating_sum / movie.rating_count if movie.rating_count else None
+    return Movie.objects.bulk_update(movies, fields)
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Movie, MovieNeighbor, UserMovieRating
+
+
+# Recomendaciones por filtrado colaborativo ítem-ítem.
+# Se construye la matriz usuario x película a partir de UserMovieRating, se calculan los K vecinos
+# más parecidos de cada película (similitud coseno) y se guardan en MovieNeighbor. Las páginas solo
+# leen esa tabla precalculada; NumPy y SciPy solo se necesitan para reconstruirla.
+
+DEFAULT_NEIGHBORS = 20
+
+
+def _load_numeric_libraries():
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError as exc:
+        raise RuntimeError('Building recommendations requires numpy and scipy (pip install numpy scipy).') from exc
+    return numpy, sparse
+
+
+def build_rating_matrix(chunk_size=10000):
+    """
+    Construye la matriz dispersa de calificaciones con una lectura masiva de UserMovieRating.
+
+    Parameters:
+    - chunk_size: int, las filas que se leen de la base de datos en cada bloque.
+
+    Returns:
+    - tuple: (matriz CSR películas x usuarios, array con el ID de película de cada fila).
+    """
+    numpy, sparse = _load_numeric_libraries()
+
+    rows = (
+        UserMovieRating.objects.filter(rating__isnull=False)
+        .values_list('movie_id', 'user_id', 'rating')
+        .iterator(chunk_size=chunk_size)
+    )
+    data = numpy.fromiter(
+        (value for row in rows for value in row), dtype=numpy.float64,
+    ).reshape(-1, 3)
+    if not len(data):
+        return sparse.csr_matrix((0, 0)), numpy.array([], dtype=numpy.int64)
+
+    movie_ids, movie_index = numpy.unique(data[:, 0].astype(numpy.int64), return_inverse=True)
+    _, user_index = numpy.unique(data[:, 1].astype(numpy.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (data[:, 2], (movie_index, user_index)),
+        shape=(len(movie_ids), int(user_index.max()) + 1),
+    )
+    return matrix, movie_ids
+
+
+def top_neighbors(matrix, k=DEFAULT_NEIGHBORS, rows=None, block_size=1024):
+    """
+    Calcula los K vecinos más parecidos de cada película por similitud coseno.
+
+    Parameters:
+    - matrix: matriz CSR películas x usuarios.
+    - k: int, el número de vecinos por película.
+    - rows: iterable de int, las filas a calcular (todas si es None).
+    - block_size: int, las películas que se procesan a la vez; limita la memoria usada.
+
+    Returns:
+    - generator: Tuplas (fila, fila vecina, similitud).
+    """
+    numpy, sparse = _load_numeric_libraries()
+
+    norms = numpy.sqrt(numpy.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = sparse.diags(1.0 / norms) @ matrix
+    transposed = normalized.T.tocsc()
+
+    rows = numpy.arange(matrix.shape[0]) if rows is None else numpy.asarray(list(rows), dtype=numpy.int64)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        similarities = (normalized[block] @ transposed).tocsr()
+        for offset, row in enumerate(block):
+            start_index, end_index = similarities.indptr[offset], similarities.indptr[offset + 1]
+            candidates = similarities.indices[start_index:end_index]
+            scores = similarities.data[start_index:end_index]
+            keep = candidates != row
+            candidates, scores = candidates[keep], scores[keep]
+            if not len(candidates):
+                continue
+            if len(candidates) > k:
+                best = numpy.argpartition(-scores, k - 1)[:k]
+                candidates, scores = candidates[best], scores[best]
+            for neighbor, score in zip(candidates, scores):
+                if score > 0:
+                    yield int(row), int(neighbor), float(score)
+
+
+def rebuild_neighbors(k=DEFAULT_NEIGHBORS, movie_ids=None, batch_size=5000):
+    """
+    Recalcula y guarda los vecinos de las películas.
+
+    Parameters:
+    - k: int, el número de vecinos por película.
+    - movie_ids: iterable de int, las películas a refrescar (todas si es None).
+    - batch_size: int, las filas por lote de `bulk_create`.
+
+    Returns:
+    - int: El número de relaciones de vecindad guardadas.
+    """
+    numpy, _ = _load_numeric_libraries()
+    matrix, row_movie_ids = build_rating_matrix()
+
+    if movie_ids is None:
+        rows = None
+        stale = MovieNeighbor.objects.all()
+    else:
+        movie_ids = list(movie_ids)
+        rows = numpy.flatnonzero(numpy.isin(row_movie_ids, movie_ids))
+        stale = MovieNeighbor.objects.filter(movie_id__in=movie_ids)
+
+    saved = 0
+    with transaction.atomic():
+        stale.delete()
+        if not matrix.shape[0]:
+            return 0
+        batch = []
+        for row, neighbor, score in top_neighbors(matrix, k=k, rows=rows):
+            batch.append(MovieNeighbor(
+                movie_id=int(row_movie_ids[row]), neighbor_id=int(row_movie_ids[neighbor]), score=score,
+            ))
+            if len(batch) >= batch_size:
+                saved += len(MovieNeighbor.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            saved += len(MovieNeighbor.objects.bulk_create(batch))
+    return saved
+
+
+def recommended_for(user, limit=10):
+    """
+    Devuelve las películas recomendadas para el usuario a partir de los vecinos precalculados.
+
+    Se suman las similitudes de los vecinos de todas las películas de su lista y se descartan las que
+    ya tiene; todo se resuelve en una sola consulta.
+
+    Parameters:
+    - user: User, el usuario.
+    - limit: int, el número máximo de recomendaciones.
+
+    Returns:
+    - QuerySet: Las películas recomendadas (solo las columnas de las tarjetas), anotadas con `score`.
+    """
+    return (
+        Movie.objects.only(*Movie.CARD_FIELDS).filter(neighbor_of__movie__usermovierating__user=user)
+        .exclude(usermovierating__user=user)
+        .annotate(score=Sum('neighbor_of__score'))
+        .order_by('-score', 'title')[:limit]
+    )
@@ -0,0 +1,69 @@
+import json
+
+from django.contrib import messages
+from django.http import HttpResponse
+from django.shortcuts import redirect, render
+
+
+# Respuestas de las vistas que modifican datos.
+# Tras una escritura se redirige (Post/Redirect/Get) y la confirmación viaja con el framework de mensajes.
+# Las peticiones parciales (cabecera `HX-Request`, como las que envía HTMX) reciben solo el fragmento
+# que cambió o un 204, sin volver a consultar ni renderizar el listado completo.
+
+def is_partial(request):
+    """
+    Indica si la petición pide una respuesta parcial en lugar de una página completa.
+    """
+    return request.headers.get('HX-Request') == 'true'
+
+
+def _with_trigger(response, level, message):
+    # HTMX dispara este evento en el cliente para mostrar el mensaje
+    response['HX-Trigger'] = json.dumps({'showMessage': {'level': level, 'message': message}})
+    return response
+
+
+def mutation_done(request, message, to, *args, fragment=None, fragment_context=None, status=200):
+    """
+    Responde a una escritura correcta.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida.
+    - message: str, el mensaje de confirmación.
+    - to: str, el nombre de la URL a la que se redirige en modo completo.
+    - *args: argumentos para resolver la URL `to`.
+    - fragment: str, plantilla del fragmento que se devuelve en modo parcial (204 si es None).
+    - fragment_context: dict, el contexto del fragmento.
+    - status: int, el código de estado de la respuesta parcial con fragmento.
+
+    Returns:
+    - HttpResponse: El fragmento o un 204 en modo parcial; una redirección con el mensaje en otro caso.
+    """
+    if is_partial(request):
+        if fragment is None:
+            response = HttpResponse(status=204)
+        else:
+            response = render(request, fragment, fragment_context or {}, status=status)
+        return _with_trigger(response, 'success', message)
+    messages.success(request, message)
+    return redirect(to, *args)
+
+
+def mutation_failed(request, message, to, *args, status=409):
+    """
+    Responde a una escritura rechazada.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida.
+    - message: str, el mensaje de error.
+    - to: str, el nombre de la URL a la que se redirige en modo completo.
+    - *args: argumentos para resolver la URL `to`.
+    - status: int, el código de estado de la respuesta parcial.
+
+    Returns:
+    - HttpResponse: El mensaje con el código de error en modo parcial; una redirección con el mensaje en otro caso.
+    """
+    if is_partial(request):
+        return _with_trigger(HttpResponse(message, status=status, content_type='text/plain'), 'error', message)
+    messages.error(request, message)
+    return redirect(to, *args)
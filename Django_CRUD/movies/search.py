@@ -0,0 +1,150 @@
+import re
+
+from django.db import connection
+
+from .models import Movie
+
+
+# Motor de búsqueda de texto completo basado en una tabla virtual FTS5 de SQLite.
+# La tabla usa el id de la película como rowid, de modo que los resultados se
+# unen directamente con `movies_movie` y `movies_usermovierating`.
+
+FTS_TABLE = 'movies_movie_fts'
+
+FTS_COLUMNS = ('title', 'director', 'genre', 'description')
+
+# Pesos BM25 por columna, en el mismo orden que FTS_COLUMNS
+BM25_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available():
+    """
+    Indica si la base de datos actual soporta la tabla FTS5.
+    """
+    return connection.vendor == 'sqlite'
+
+
+def create_index(cursor):
+    """
+    Crea la tabla virtual FTS5 y la llena con el catálogo actual.
+
+    Parameters:
+    - cursor: el cursor de base de datos con el que se ejecutan las sentencias.
+    """
+    cursor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s, tokenize='unicode61 remove_diacritics 2')"
+        % (FTS_TABLE, ', '.join(FTS_COLUMNS))
+    )
+    cursor.execute('DELETE FROM %s' % FTS_TABLE)
+    cursor.execute(
+        'INSERT INTO %s (rowid, %s) SELECT id, %s FROM movies_movie'
+        % (FTS_TABLE, ', '.join(FTS_COLUMNS), ', '.join(FTS_COLUMNS))
+    )
+
+
+def rebuild_index():
+    """
+    Reconstruye por completo el índice de búsqueda a partir de la tabla de películas.
+
+    Returns:
+    - int: El número de películas indexadas.
+    """
+    with connection.cursor() as cursor:
+        create_index(cursor)
+        cursor.execute('SELECT count(*) FROM %s' % FTS_TABLE)
+        return cursor.fetchone()[0]
+
+
+def index_movies(movies):
+    """
+    Inserta o reemplaza las películas dadas en el índice de búsqueda.
+
+    Parameters:
+    - movies: iterable de Movie, las películas a indexar.
+    """
+    if not is_available():
+        return
+    rows = [(movie.id, *(getattr(movie, column) or '' for column in FTS_COLUMNS)) for movie in movies]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE, [(row[0],) for row in rows])
+        cursor.executemany(
+            'INSERT INTO %s (rowid, %s) VALUES (%s)'
+            % (FTS_TABLE, ', '.join(FTS_COLUMNS), ', '.join(['%s'] * (len(FTS_COLUMNS) + 1))),
+            rows,
+        )
+
+
+def remove_movies(movie_ids):
+    """
+    Elimina las películas dadas del índice de búsqueda.
+
+    Parameters:
+    - movie_ids: iterable de int, los IDs de las películas eliminadas.
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE, [(pk,) for pk in movie_ids])
+
+
+def build_match_expression(query):
+    """
+    Convierte el texto escrito por el usuario en una expresión MATCH segura para FTS5.
+
+    Cada palabra se cita (para neutralizar la sintaxis de FTS5) y se busca como prefijo;
+    todas las palabras deben aparecer en la película.
+
+    Parameters:
+    - query: str, el término de búsqueda.
+
+    Returns:
+    - str: La expresión MATCH, o una cadena vacía si no hay palabras que buscar.
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' '.join('"%s"*' % token for token in tokens)
+
+
+def search_movie_ids(query, limit=None, offset=0, user=None):
+    """
+    Devuelve los IDs de las películas que coinciden con la búsqueda, ordenados por relevancia BM25.
+
+    Parameters:
+    - query: str, el término de búsqueda.
+    - limit: int, el número máximo de resultados (sin límite si es None).
+    - offset: int, el número de resultados a omitir.
+    - user: User, si se indica, solo se buscan películas de la lista de ese usuario.
+
+    Returns:
+    - list: Los IDs de las películas en orden de relevancia.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+
+    if not is_available():
+        # Sin FTS5 recurrimos a la búsqueda por subcadena en el título
+        movies = Movie.objects.filter(title__icontains=query.strip())
+        if user is not None:
+            movies = movies.filter(usermovierating__user=user)
+        ids = movies.order_by('title', 'id').values_list('id', flat=True)
+        return list(ids[offset:offset + limit] if limit is not None else ids[offset:])
+
+    sql = 'SELECT {fts}.rowid FROM {fts}'
+    params = []
+    if user is not None:
+        sql += ' JOIN movies_usermovierating r ON r.movie_id = {fts}.rowid AND r.user_id = %s'
+        params.append(user.pk)
+    sql += ' WHERE {fts} MATCH %s ORDER BY bm25({fts}, {weights}), {fts}.rowid'
+    sql = sql.format(fts=FTS_TABLE, weights=', '.join(str(weight) for weight in BM25_WEIGHTS))
+    params.append(expression)
+    if limit is not None:
+        sql += ' LIMIT %s OFFSET %s'
+        params.extend([limit, offset])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -1,34 +1,76 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
 from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from .models import UserMovieRating
-from django.db.models import Avg
+from django.dispatch import Signal, receiver
+from .models import Movie, UserMovieRating
+from . import auth, cache, db, facets, fuzzy, instrumentation, leaderboards, ratings, search, typeahead, writebehind
+
+# Señal que envían las operaciones masivas sobre el catálogo (bulk_create, bulk_update, update),
+# que no disparan post_save. Argumentos: `movie_ids`, los IDs de las películas creadas o modificadas.
+movies_bulk_changed = Signal()
+
+# Señal que envían los borrados masivos (ver movies/bulk.py) tras confirmar, en lugar de los post_delete
+# de cada fila. Argumentos: `movie_ids`, los IDs de las películas borradas.
+movies_bulk_deleted = Signal()
+
+# Mientras está activo, las señales post_delete de las películas y sus calificaciones no hacen nada:
+# los borrados masivos avisan después con `movies_bulk_deleted`. Es una variable de contexto, así que
+# las demás peticiones (otros hilos o tareas) siguen actualizando los agregados con normalidad.
+_bulk_deleting = contextvars.ContextVar('movies_bulk_deleting', default=False)
 
-# Definimos una función para calcular y actualizar el campo `rating` en el modelo `Movie`
-def update_movie_rating(sender, instance, **kwargs):
+
+@contextmanager
+def bulk_deleting():
+    """
+    Desactiva en este contexto los receptores post_delete por fila de Movie y UserMovieRating.
     """
-    Esta función calcula el promedio de las calificaciones de una película y actualiza su campo `rating`.
+    token = _bulk_deleting.set(True)
+    try:
+        yield
+    finally:
+        _bulk_deleting.reset(token)
+
+# Definimos una función para actualizar los agregados de calificación del modelo `Movie`
+def update_movie_rating(sender, instance, deleted=False, **kwargs):
+    """
+    Esta función aplica a la película la diferencia entre la calificación anterior y la nueva,
+    o la marca como pendiente si está activo el modo write-behind (ver movies/writebehind.py).
     
     Argumentos:
         sender: El modelo que emitió la señal (UserMovieRating en este caso).
         instance: La instancia de UserMovieRating que activó la señal.
+        deleted: Si la calificación se ha eliminado.
         **kwargs: Otros argumentos adicionales pasados a la función.
     """
-    # Obtenemos la película asociada a la instancia de UserMovieRating
-    movie = instance.movie
+    new_rating = None if deleted else instance.rating
+    
+    if writebehind.is_enabled():
+        # Los agregados se recalcularán por lotes; si la calificación no cambia no hay nada que hacer
+        if ratings.to_star(instance._loaded_rating) != ratings.to_star(new_rating):
+            writebehind.mark_dirty(instance.movie_id)
+        instance._loaded_rating = new_rating
+        return
     
-    # Calculamos el promedio de las calificaciones de la película
-    average_rating = UserMovieRating.objects.filter(movie=movie).aggregate(Avg('rating'))['rating__avg']
+    # Actualizamos la suma, el número de votos, el histograma y el promedio con una sola sentencia UPDATE
+    ratings.apply_rating_change(instance.movie_id, instance._loaded_rating, new_rating)
+    if ratings.to_star(instance._loaded_rating) != ratings.to_star(new_rating):
+        # Las posiciones en los rankings se reescriben tras confirmar, fuera de la transacción de la calificación
+        movie_id = instance.movie_id
+        transaction.on_commit(lambda: leaderboards.update_movies([movie_id]))
     
-    # Actualizamos el campo `rating` de la película con el promedio calculado
-    movie.rating = average_rating
-    movie.save()
+    # La instancia refleja ahora lo que hay en la base de datos
+    instance._loaded_rating = new_rating
 
 # Conectamos la función `update_movie_rating` a las señales `post_save` y `post_delete` del modelo `UserMovieRating`
 @receiver(post_save, sender=UserMovieRating)
-@receiver(post_delete, sender=UserMovieRating)
-def update_movie_rating_on_save_or_delete(sender, instance, **kwargs):
+def update_movie_rating_on_save(sender, instance, **kwargs):
     """
-    Esta función conecta la señal post_save y post_delete del modelo UserMovieRating
+    Esta función conecta la señal post_save del modelo UserMovieRating
     a la función update_movie_rating para mantener actualizado el campo `rating` de la película.
     
     Argumentos:
@@ -36,5 +78,197 @@ def update_movie_rating_on_save_or_delete(sender, instance, **kwargs):
         instance: La instancia de UserMovieRating que activó la señal.
         **kwargs: Otros argumentos adicionales pasados a la función.
     """
-    # Llamamos a la función update_movie_rating para actualizar el campo `rating`
-    update_movie_rating(sender, instance, **kwargs)
+    update_movie_rating(sender, instance)
+
+
+@receiver(post_delete, sender=UserMovieRating)
+def update_movie_rating_on_delete(sender, instance, **kwargs):
+    """
+    Esta función conecta la señal post_delete del modelo UserMovieRating
+    a la función update_movie_rating para descontar la calificación eliminada.
+    
+    Argumentos:
+        sender: El modelo que emitió la señal (UserMovieRating en este caso).
+        instance: La instancia de UserMovieRating que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    if not _bulk_deleting.get():
+        update_movie_rating(sender, instance, deleted=True)
+
+
+# Mantenemos sincronizado el índice de búsqueda de texto completo con la tabla `Movie`
+@receiver(post_save, sender=Movie)
+def index_movie_on_save(sender, instance, **kwargs):
+    """
+    Esta función actualiza las entradas de la película en los índices de búsqueda (texto completo y
+    trigramas) cada vez que se guarda. Las filas de trigramas se borran en cascada con la película.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (Movie en este caso).
+        instance: La instancia de Movie que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    search.index_movies([instance])
+    fuzzy.index_movies([instance])
+
+
+@receiver(post_delete, sender=Movie)
+def remove_movie_from_index(sender, instance, **kwargs):
+    """
+    Esta función elimina la película del índice de búsqueda cuando se borra.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (Movie en este caso).
+        instance: La instancia de Movie que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    if not _bulk_deleting.get():
+        search.remove_movies([instance.pk])
+
+
+# Los rankings por género dependen del género de la película
+@receiver(post_save, sender=Movie)
+def update_leaderboards_on_save(sender, instance, created=False, **kwargs):
+    """
+    Esta función reescribe las posiciones de la película en los rankings cuando se edita.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (Movie en este caso).
+        instance: La instancia de Movie que activó la señal.
+        created: Si la película se acaba de crear (aún no tiene calificaciones).
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    if not created:
+        movie_id = instance.pk
+        transaction.on_commit(lambda: leaderboards.update_movies([movie_id]))
+
+
+# Cualquier cambio en el catálogo invalida los fragmentos guardados en la caché
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def bump_catalog_version_on_change(sender, instance, **kwargs):
+    """
+    Esta función incrementa la versión del catálogo para que los listados se vuelvan a generar.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (Movie en este caso).
+        instance: La instancia de Movie que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    if not _bulk_deleting.get():
+        cache.bump_catalog_version()
+
+
+# El índice de autocompletado del proceso se actualiza tras confirmar, después de cambiar la versión del catálogo
+@receiver(post_save, sender=Movie)
+def update_typeahead_on_save(sender, instance, **kwargs):
+    """
+    Esta función añade o actualiza el título de la película en el índice de autocompletado.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (Movie en este caso).
+        instance: La instancia de Movie que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    # La versión que dejó `bump_catalog_version_on_change`, que se ejecuta antes
+    version = cache.catalog_version()
+    transaction.on_commit(lambda: typeahead.update_movies([instance], version))
+
+
+@receiver(post_delete, sender=Movie)
+def remove_from_typeahead(sender, instance, **kwargs):
+    """
+    Esta función quita el título de la película del índice de autocompletado.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (Movie en este caso).
+        instance: La instancia de Movie que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    if not _bulk_deleting.get():
+        movie_id = instance.pk
+        version = cache.catalog_version()
+        transaction.on_commit(lambda: typeahead.remove_movies([movie_id], version))
+
+
+@receiver(movies_bulk_changed)
+def sync_bulk_changed_movies(sender, movie_ids, **kwargs):
+    """
+    Esta función actualiza los géneros normalizados, los rankings, los índices de búsqueda y de
+    autocompletado y la versión del catálogo tras una operación masiva.
+
+    Argumentos:
+        sender: Quien realizó la operación masiva.
+        movie_ids: Los IDs de las películas creadas o modificadas.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    facets.assign_genres(movie_ids)
+    leaderboards.update_movies(movie_ids)
+    search.index_movies(Movie.objects.filter(pk__in=movie_ids).only('id', *search.FTS_COLUMNS))
+    fuzzy.index_movies(Movie.objects.filter(pk__in=movie_ids).only('id', *fuzzy.FIELDS.values()))
+    version = cache.bump_catalog_version()
+    typeahead.update_movies(Movie.objects.filter(pk__in=movie_ids).only('id', 'title', 'release_year'), version)
+
+
+@receiver(movies_bulk_deleted)
+def sync_bulk_deleted_movies(sender, movie_ids, **kwargs):
+    """
+    Esta función quita las películas borradas del índice de búsqueda y del de autocompletado y
+    actualiza la versión del catálogo tras un borrado masivo, ya confirmado. Las filas de los rankings
+    y de los trigramas ya se borraron junto con las películas.
+
+    Argumentos:
+        sender: Quien realizó el borrado masivo.
+        movie_ids: Los IDs de las películas borradas.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    search.remove_movies(movie_ids)
+    version = cache.bump_catalog_version()
+    transaction.on_commit(lambda: typeahead.remove_movies(movie_ids, version))
+
+
+# Cada conexión SQLite nueva se configura con WAL y los PRAGMAs de MOVIES_SQLITE_PRAGMAS,
+# y todas las conexiones registran sus consultas en las métricas de la petición en curso
+@receiver(connection_created)
+def configure_new_connection(sender, connection, **kwargs):
+    """
+    Esta función aplica los PRAGMAs configurados al abrirse una conexión con la base de datos
+    e instala la medición de consultas por petición.
+
+    Argumentos:
+        sender: La clase de la conexión que se abrió.
+        connection: La conexión (DatabaseWrapper) recién abierta.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    db.configure_sqlite(connection)
+    instrumentation.install(connection)
+
+
+# El usuario guardado en la caché de sesiones deja de ser válido si cambia, se borra o cierra sesión
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Esta función elimina de la caché el usuario modificado o eliminado.
+
+    Argumentos:
+        sender: El modelo que emitió la señal (User en este caso).
+        instance: La instancia de User que activó la señal.
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    auth.invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_cached_user_on_logout(sender, request, user, **kwargs):
+    """
+    Esta función elimina de la caché el usuario que cierra sesión.
+
+    Argumentos:
+        sender: La clase del usuario que cerró sesión.
+        request: La solicitud HTTP de cierre de sesión.
+        user: El usuario que cerró sesión (None si no había sesión iniciada).
+        **kwargs: Otros argumentos adicionales pasados a la función.
+    """
+    if user is not None:
+        auth.invalidate_user(user.pk)
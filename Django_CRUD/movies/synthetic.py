@@ -0,0 +1,122 @@
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Movie, UserMovieRating
+from .ratings import recompute_movie_ratings
+from .signals import movies_bulk_changed
+
+
+# Generador de catálogos sintéticos reproducibles para pruebas de rendimiento.
+# La popularidad de las películas sigue una distribución de Zipf: unas pocas reciben la mayoría
+# de las calificaciones, como en un catálogo real. Con la misma semilla se obtienen los mismos datos.
+
+TITLE_PREFIX = 'Synthetic'
+
+USERNAME_PREFIX = 'synthetic_user_'
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy',
+          'Horror', 'Mystery', 'Romance', 'Science Fiction', 'Thriller', 'Western']
+
+AGE_RATINGS = ['G', 'PG', 'PG-13', 'R', 'NC-17']
+
+WORDS = ['Night', 'City', 'Last', 'Storm', 'Shadow', 'River', 'Dream', 'Fire', 'Silent', 'Road', 'Star',
+         'Winter', 'Secret', 'Lost', 'Iron', 'Glass', 'Ocean', 'Ghost', 'Golden', 'Wild']
+
+
+def zipf_weights(count, exponent):
+    """
+    Pesos acumulados de una distribución de Zipf: el elemento de rango r pesa 1 / r^exponent.
+    """
+    return list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def clear():
+    """
+    Elimina los usuarios y películas sintéticos (y, en cascada, sus calificaciones).
+    """
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    Movie.objects.filter(title__startswith=TITLE_PREFIX + ' ').delete()
+
+
+def seed(movies, users, ratings_per_user=20, exponent=1.1, seed=0, batch_size=1000):
+    """
+    Genera un catálogo sintético, reemplazando los datos sintéticos anteriores.
+
+    Parameters:
+    - movies: int, el número de películas.
+    - users: int, el número de usuarios.
+    - ratings_per_user: int, el número medio de películas calificadas por usuario.
+    - exponent: float, el exponente de la distribución de Zipf de la popularidad.
+    - seed: int, la semilla del generador aleatorio.
+    - batch_size: int, las filas por lote de `bulk_create`.
+
+    Returns:
+    - dict: El número de películas, usuarios y calificaciones creados.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        clear()
+        movies_to_create = [
+            Movie(
+                title='%s %06d %s %s' % (TITLE_PREFIX, index, rng.choice(WORDS), rng.choice(WORDS)),
+                description=' '.join(rng.choice(WORDS).lower() for _ in range(30)),
+                director='Director %d' % rng.randint(1, max(1, movies // 5)),
+                release_year=rng.randint(1930, 2024),
+                duration=rng.randint(70, 200),
+                age_rating=rng.choice(AGE_RATINGS),
+                genre=rng.choice(GENRES),
+                image_url='https://example.com/posters/%d.jpg' % index,
+                trailer_url='https://example.com/trailers/%d' % index,
+            )
+            for index in range(movies)
+        ]
+        for movie in movies_to_create:
+            movie.update_excerpt()
+        movie_objects = Movie.objects.bulk_create(movies_to_create, batch_size=batch_size)
+        movie_ids = [movie.id for movie in movie_objects]
+        if movie_ids and movie_ids[0] is None:
+            movie_ids = list(
+                Movie.objects.filter(title__startswith=TITLE_PREFIX + ' ').order_by('id').values_list('id', flat=True)
+            )
+
+        # Todos comparten la misma contraseña inutilizable; se calcula una sola vez
+        password = make_password(None)
+        User.objects.bulk_create([
+            User(username='%s%d' % (USERNAME_PREFIX, index), password=password) for index in range(users)
+        ], batch_size=batch_size)
+        user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id').values_list('id', flat=True)
+        )
+
+        # El rango de popularidad no coincide con el orden por título. Se trabaja con posiciones en
+        # `movie_ids` y no con IDs, que cambian de una ejecución a otra
+        popularity = list(range(len(movie_ids)))
+        rng.shuffle(popularity)
+        weights = zipf_weights(len(popularity), exponent)
+
+        ratings = []
+        created = 0
+        for user_id in user_ids:
+            # Como mucho la mitad del catálogo, para que el muestreo sin repetición termine pronto
+            wanted = min(max(1, len(popularity) // 2), max(1, int(rng.expovariate(1.0 / ratings_per_user))))
+            wanted = wanted if popularity else 0
+            chosen = set()
+            while len(chosen) < wanted:
+                chosen.update(rng.choices(popularity, cum_weights=weights, k=wanted - len(chosen)))
+            for index in sorted(chosen):
+                ratings.append(UserMovieRating(user_id=user_id, movie_id=movie_ids[index], rating=rng.randint(1, 5)))
+            if len(ratings) >= batch_size:
+                created += len(UserMovieRating.objects.bulk_create(ratings, batch_size=batch_size))
+                ratings = []
+        if ratings:
+            created += len(UserMovieRating.objects.bulk_create(ratings, batch_size=batch_size))
+
+        # bulk_create no dispara señales: recalculamos los agregados y sincronizamos índices y cachés
+        recompute_movie_ratings(movie_ids, batch_size=batch_size)
+        transaction.on_commit(lambda: movies_bulk_changed.send(sender=Movie, movie_ids=movie_ids))
+
+    return {'movies': len(movie_ids), 'users': len(user_ids), 'ratings': created}
@@ -0,0 +1,26 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from movies import cache
+
+register = template.Library()
+
+
+@register.simple_tag
+def movie_cards(movies, detail_url_name, selectable=False):
+    """
+    Renderiza las tarjetas de una lista de películas reutilizando los fragmentos guardados en la caché.
+    Con `selectable`, cada tarjeta lleva una casilla para las acciones masivas del formulario `bulk-actions`.
+
+    Uso: {% movie_cards movies 'user_movie_detail' %}
+    """
+    version = cache.catalog_version()
+    kind = 'selectable_card' if selectable else 'card'
+    keys = {cache.make_key(kind, detail_url_name, movie.id, version=version): movie for movie in movies}
+    template = '_selectable_movie_card.html' if selectable else '_movie_card.html'
+
+    def render(movie):
+        return render_to_string(template, {'movie': movie, 'detail_url_name': detail_url_name})
+
+    return mark_safe(''.join(cache.get_or_render_many(keys, render)))
@@ -0,0 +1,15 @@
+from django import template
+
+from movies import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(movie):
+    """
+    Devuelve la URL de la miniatura del cartel de una película (o del cartel original si no hay miniaturas).
+
+    Uso: {% load thumbnails %} <img src="{% thumbnail_url movie %}">
+    """
+    return thumbnails.thumbnail_url(movie)
@@ -0,0 +1,37 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from .instrumentation import fingerprint, normalize_sql
+
+
+class QueryAssertionsMixin:
+    """
+    Aserciones para los tests que detectan consultas N+1 en las vistas.
+
+    Uso:
+        with self.assertMaxRepeatedQueries(1):
+            self.client.get(reverse('user_movies'))
+    """
+
+    @contextmanager
+    def assertMaxRepeatedQueries(self, limit, using=DEFAULT_DB_ALIAS):
+        """
+        Falla si alguna consulta (misma huella con distintos parámetros) se ejecuta más de `limit` veces.
+        """
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        counts = Counter()
+        examples = {}
+        for query in context.captured_queries:
+            key = fingerprint(query['sql'])
+            counts[key] += 1
+            examples.setdefault(key, query['sql'])
+        repeated = [(key, count) for key, count in counts.most_common() if count > limit]
+        if repeated:
+            self.fail('%d quer%s repeated more than %d time%s:\n%s' % (
+                len(repeated), 'y' if len(repeated) == 1 else 'ies', limit, '' if limit == 1 else 's',
+                '\n'.join('  %dx %s' % (count, normalize_sql(examples[key])) for key, count in repeated),
+            ))
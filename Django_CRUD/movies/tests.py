@@ -1,3 +1,1676 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.http import HttpResponse, QueryDict
+from django.test import AsyncClient, Client, LiveServerTestCase, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from .models import (
+    Genre, LeaderboardEntry, Movie, MovieNeighbor, MovieTrigram, PendingRatingUpdate, UserMovieRating,
+)
+from .pagination import decode_cursor, encode_cursor
+from . import cache as movie_cache
+from . import auth, benchmark, bulk, compression, db, facets, fuzzy, leaderboards, synthetic
+from .instrumentation import fingerprint, normalize_sql
+from . import library as library_service
+from . import recommendations
+from . import search, throttling, thumbnails, typeahead, writebehind
+from .middleware import RequestTimingMiddleware
+from .signals import movies_bulk_changed, movies_bulk_deleted
+from .testing import QueryAssertionsMixin
+
+
+def create_movie(title, **kwargs):
+    """
+    Crea una película con valores por defecto para las pruebas.
+    """
+    data = {
+        'description': 'Description of %s' % title,
+        'director': 'Director',
+        'release_year': 2000,
+        'duration': 100,
+        'age_rating': 'PG',
+        'genre': 'Drama',
+        'image_url': 'https://example.com/%s.jpg' % title.replace(' ', '_'),
+        'trailer_url': 'https://example.com/trailer',
+    }
+    data.update(kwargs)
+    return Movie.objects.create(title=title, **data)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        # Títulos repetidos para comprobar el desempate por id
+        for title in ['Alpha', 'Bravo', 'Bravo', 'Charlie', 'Delta', 'Echo', 'Foxtrot']:
+            create_movie(title)
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.client.force_login(self.user)
+
+    def test_cursor_round_trip(self):
+        movie = Movie.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(movie)), (movie.title, movie.id))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        # Un id que no cabe en una columna INTEGER se trata como un cursor no válido
+        huge = encode_cursor(Movie(title='Alpha', id=2 ** 63))
+        self.assertIsNone(decode_cursor(huge))
+        response = self.client.get(reverse('user_available_movies'), {'after': huge})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['movies'])[0].title, 'Alpha')
+
+    def test_walks_catalog_forward_and_back(self):
+        url = reverse('user_available_movies')
+        expected = list(Movie.objects.order_by('title', 'id').values_list('id', flat=True))
+
+        seen = []
+        pages = []
+        response = self.client.get(url, {'page_size': 3})
+        while True:
+            page = response.context['page']
+            pages.append(page)
+            seen.extend(movie.id for movie in page)
+            if not page.next_url:
+                break
+            response = self.client.get(page.next_url)
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        response = self.client.get(pages[-1].previous_url)
+        self.assertEqual([movie.id for movie in response.context['page']], [movie.id for movie in pages[-2]])
+
+
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.heat = create_movie('Heat', director='Michael Mann', genre='Crime',
+                                description='A group of professional bank robbers.')
+        cls.collateral = create_movie('Collateral', director='Michael Mann', genre='Thriller',
+                                      description='A cab driver finds himself the hostage of a hitman.')
+        cls.alien = create_movie('Alien', director='Ridley Scott', genre='Horror',
+                                 description='The crew of a commercial spacecraft meets a deadly lifeform.')
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.client.force_login(self.user)
+
+    def test_matches_beyond_titles(self):
+        self.assertEqual(set(search.search_movie_ids('mann')), {self.heat.id, self.collateral.id})
+        self.assertEqual(search.search_movie_ids('spacecr'), [self.alien.id])
+
+    def test_title_matches_rank_first(self):
+        create_movie('Hitman', description='Nothing to do with anything.')
+        ids = search.search_movie_ids('hitman')
+        self.assertEqual(Movie.objects.get(pk=ids[0]).title, 'Hitman')
+        self.assertIn(self.collateral.id, ids)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.heat.title = 'Heat (Director Cut)'
+        self.heat.save()
+        self.assertEqual(search.search_movie_ids('director cut'), [self.heat.id])
+        self.heat.delete()
+        self.assertEqual(search.search_movie_ids('robbers'), [])
+
+    def test_query_syntax_is_neutralised(self):
+        self.assertEqual(search.search_movie_ids('"alien" -(* ^'), [self.alien.id])
+
+    def test_rebuild_index(self):
+        self.assertEqual(search.rebuild_index(), 3)
+
+    def test_search_views(self):
+        response = self.client.get(reverse('search_results'), {'search_query': 'ridley'})
+        self.assertEqual([movie.id for movie in response.context['movies']], [self.alien.id])
+
+        UserMovieRating.objects.create(user=self.user, movie=self.heat)
+        response = self.client.get(reverse('search_from_my_movies'), {'search_query': 'mann'})
+        self.assertEqual([movie.id for movie in response.context['user_movies']], [self.heat.id])
+
+
+class RatingAggregateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username='user%d' % i, password='secret') for i in range(3)]
+        cls.movie = create_movie('Heat')
+
+    def assertAggregates(self, rating, count, histogram):
+        movie = Movie.objects.get(pk=self.movie.pk)
+        self.assertEqual(movie.rating_count, count)
+        self.assertEqual(movie.rating_histogram, histogram)
+        if rating is None:
+            self.assertIsNone(movie.rating)
+        else:
+            self.assertAlmostEqual(movie.rating, rating)
+
+    def test_incremental_updates(self):
+        first = UserMovieRating.objects.create(user=self.users[0], movie=self.movie, rating=5)
+        UserMovieRating.objects.create(user=self.users[1], movie=self.movie, rating=2)
+        UserMovieRating.objects.create(user=self.users[2], movie=self.movie)
+        self.assertAggregates(3.5, 2, [0, 1, 0, 0, 1])
+
+        # Cambiar una calificación existente, tal como lo hace la vista (con el valor del POST)
+        rating = UserMovieRating.objects.get(pk=first.pk)
+        rating.rating = '4'
+        rating.save()
+        self.assertAggregates(3.0, 2, [0, 1, 0, 1, 0])
+
+        UserMovieRating.objects.get(pk=first.pk).delete()
+        self.assertAggregates(2.0, 1, [0, 1, 0, 0, 0])
+
+        UserMovieRating.objects.filter(movie=self.movie).delete()
+        self.assertAggregates(None, 0, [0, 0, 0, 0, 0])
+
+    def test_rating_update_does_not_read_other_ratings(self):
+        rating = UserMovieRating.objects.create(user=self.users[0], movie=self.movie, rating=1)
+        rating.rating = 3
+        with CaptureQueriesContext(connection) as queries:
+            rating.save()
+        # Bloqueo de la fila, la calificación y los agregados, sin leer otras calificaciones
+        statements = [query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(statements, ['UPDATE', 'UPDATE', 'UPDATE'])
+
+    def test_stale_instances_apply_a_single_delta(self):
+        rating = UserMovieRating.objects.create(user=self.users[0], movie=self.movie, rating=4)
+        # Dos envíos que cargaron la fila antes de que el otro guardara (doble clic)
+        first, second = UserMovieRating.objects.get(pk=rating.pk), UserMovieRating.objects.get(pk=rating.pk)
+        for stale in (first, second):
+            stale.rating = 1
+            stale.save()
+        self.assertAggregates(1.0, 1, [1, 0, 0, 0, 0])
+
+        empty = UserMovieRating.objects.create(user=self.users[1], movie=self.movie)
+        first, second = UserMovieRating.objects.get(pk=empty.pk), UserMovieRating.objects.get(pk=empty.pk)
+        for stale in (first, second):
+            stale.rating = 5
+            stale.save()
+        self.assertAggregates(3.0, 2, [1, 0, 0, 0, 1])
+
+        first.delete()
+        second.delete()
+        self.assertAggregates(1.0, 1, [1, 0, 0, 0, 0])
+
+    def test_editing_movie_keeps_aggregates(self):
+        stale = Movie.objects.get(pk=self.movie.pk)
+        UserMovieRating.objects.create(user=self.users[0], movie=self.movie, rating=4)
+        stale.title = 'Heat (1995)'
+        stale.save()
+        self.assertAggregates(4.0, 1, [0, 0, 0, 1, 0])
+
+    def test_repair_command(self):
+        UserMovieRating.objects.create(user=self.users[0], movie=self.movie, rating=3)
+        UserMovieRating.objects.create(user=self.users[1], movie=self.movie, rating=5)
+        Movie.objects.filter(pk=self.movie.pk).update(rating=None, rating_sum=0, rating_count=0, rating_3=7)
+        call_command('repair_movie_ratings', stdout=StringIO())
+        self.assertAggregates(4.0, 2, [0, 0, 1, 0, 1])
+
+
+class UserLibraryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.other = User.objects.create_user(username='other', password='secret')
+        cls.movies = [create_movie('Movie %02d' % i, director='Director %d' % i) for i in range(12)]
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.client.force_login(self.user)
+
+    def add(self, movie, rating=None, user=None):
+        UserMovieRating.objects.create(user=user or self.user, movie=movie, rating=rating)
+
+    def test_library_is_sorted_and_carries_user_rating(self):
+        self.add(self.movies[3], rating=4)
+        self.add(self.movies[1])
+        self.add(self.movies[3], rating=1, user=self.other)
+        library = list(library_service.user_library(self.user))
+        self.assertEqual([movie.id for movie in library], [self.movies[1].id, self.movies[3].id])
+        self.assertEqual([movie.user_rating for movie in library], [None, 4.0])
+
+    def test_search_is_limited_to_library(self):
+        self.add(self.movies[2], rating=5)
+        self.add(self.movies[5], user=self.other)
+        results = library_service.search_user_library(self.user, 'director')
+        self.assertEqual([(movie.id, movie.user_rating) for movie in results], [(self.movies[2].id, 5.0)])
+
+    def test_user_movies_query_count_is_constant(self):
+        url = reverse('user_movies')
+        self.add(self.movies[0])
+        # La primera petición carga la sesión y el usuario en la caché
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        for movie in self.movies[1:]:
+            self.add(movie, rating=3)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['user_movies']), len(self.movies))
+        self.assertEqual(len(small), len(large))
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.movie = create_movie('Heat', description='x' * 150)
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        movie_cache.reset_stats()
+        self.client.force_login(self.user)
+
+    def test_repeated_list_is_served_from_cache(self):
+        url = reverse('user_available_movies')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Catalog-Cache'], 'miss')
+        self.assertContains(first, 'x' * 100 + '...')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(second['X-Catalog-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([query for query in queries if 'movies_movie' in query['sql']])
+        self.assertEqual(movie_cache.stats(), {'hits': 1, 'misses': 2})
+
+    def test_movie_changes_invalidate_fragments(self):
+        url = reverse('user_available_movies')
+        self.client.get(url)
+        self.movie.title = 'Heat Remastered'
+        self.movie.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Catalog-Cache'], 'miss')
+        self.assertContains(response, 'Heat Remastered')
+
+    def test_cards_are_shared_between_pages(self):
+        self.client.get(reverse('user_available_movies'))
+        movie_cache.reset_stats()
+        self.client.get(reverse('search_results'), {'search_query': 'heat'})
+        self.assertEqual(movie_cache.stats(), {'hits': 1, 'misses': 1})
+
+
+class MutationFlowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='secret')
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.movie = create_movie('Heat')
+
+    def movie_data(self, **overrides):
+        data = {
+            'title': 'Alien', 'description': 'In space no one can hear you scream.', 'director': 'Ridley Scott',
+            'release_year': 1979, 'duration': 117, 'age_rating': 'R', 'genre': 'Horror',
+            'image_url': 'https://example.com/alien.jpg', 'trailer_url': 'https://example.com/alien',
+        }
+        data.update(overrides)
+        return data
+
+    def test_create_redirects_with_message(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('create_movie'), self.movie_data(), follow=True)
+        self.assertRedirects(response, reverse('admin_movies'))
+        self.assertContains(response, 'Successfully created movie.')
+
+    def test_partial_create_returns_only_the_card(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('create_movie'), self.movie_data(), HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(response, 'Alien', status_code=201)
+        self.assertNotContains(response, '<html', status_code=201)
+        self.assertIn('showMessage', response['HX-Trigger'])
+
+    def test_partial_delete_returns_no_content(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('delete_movie', args=[self.movie.id]), HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Movie.objects.filter(pk=self.movie.pk).exists())
+
+    def test_library_mutations_redirect(self):
+        self.client.force_login(self.user)
+        add_url = reverse('user_movie_add', args=[self.movie.id])
+        self.assertRedirects(self.client.post(add_url), reverse('user_available_movies'))
+
+        response = self.client.post(add_url, follow=True)
+        self.assertRedirects(response, reverse('user_movie_detail', args=[self.movie.id]))
+        self.assertContains(response, 'This movie is already in your list.')
+        self.assertEqual(self.client.post(add_url, HTTP_HX_REQUEST='true').status_code, 409)
+
+        rate_url = reverse('user_movie_rate', args=[self.movie.id])
+        self.assertRedirects(self.client.post(rate_url, {'rating': '5'}), reverse('user_movies'))
+        self.assertEqual(Movie.objects.get(pk=self.movie.pk).rating, 5.0)
+        for invalid in ('7', '0', '4.5', 'abc', ''):
+            response = self.client.post(rate_url, {'rating': invalid}, HTTP_HX_REQUEST='true')
+            self.assertEqual(response.status_code, 400)
+        self.assertRedirects(
+            self.client.post(rate_url, {'rating': '7'}), reverse('user_movie_rating', args=[self.movie.id]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(UserMovieRating.objects.get(user=self.user, movie=self.movie).rating, 5.0)
+
+        delete_url = reverse('user_movie_delete', args=[self.movie.id])
+        self.assertEqual(self.client.post(delete_url, HTTP_HX_REQUEST='true').status_code, 204)
+        self.assertIsNone(Movie.objects.get(pk=self.movie.pk).rating)
+
+
+class ImportMoviesCommandTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_movies', path, *args, stdout=StringIO())
+
+    def test_csv_import_with_rejects(self):
+        path = self.write('movies.csv', (
+            'title,description,director,release_year,duration,age_rating,genre,image_url,trailer_url\n'
+            'Heat,Robbers,Michael Mann,1995,170,R,Crime,https://e.com/h.jpg,https://e.com/h\n'
+            'Alien,Space,Ridley Scott,1979,117,R,Horror,https://e.com/a.jpg,https://e.com/a\n'
+            'Broken,,Nobody,not-a-year,1,G,Drama,not-a-url,https://e.com/b\n'
+        ))
+        self.run_import(path, '--batch-size', '1')
+        self.assertEqual(sorted(Movie.objects.values_list('title', flat=True)), ['Alien', 'Heat'])
+        with open(path + '.rejects.jsonl', encoding='utf-8') as handle:
+            rejects = [json.loads(line) for line in handle]
+        self.assertEqual([reject['line'] for reject in rejects], [4])
+        self.assertIn('image_url', rejects[0]['errors'])
+        # Las películas importadas quedan en el índice de búsqueda
+        self.assertEqual(len(search.search_movie_ids('ridley')), 1)
+
+    def test_jsonl_upsert_on_title_and_year(self):
+        create_movie('Heat', release_year=1995, director='Someone Else')
+        rows = [
+            {'title': 'Heat', 'description': 'Robbers', 'director': 'Michael Mann', 'release_year': 1995, 'duration': 170,
+             'genre': 'Crime', 'image_url': 'https://e.com/h.jpg', 'trailer_url': 'https://e.com/h'},
+            {'title': 'Heat', 'description': 'TV movie', 'director': 'Other', 'release_year': 1986, 'duration': 90,
+             'genre': 'Crime', 'image_url': 'https://e.com/h.jpg', 'trailer_url': 'https://e.com/h'},
+        ]
+        path = self.write('movies.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+        self.run_import(path, '--upsert')
+        self.assertEqual(Movie.objects.count(), 2)
+        self.assertEqual(Movie.objects.get(release_year=1995).director, 'Michael Mann')
+        # El extracto de las listas se calcula también en las inserciones y actualizaciones masivas
+        self.assertEqual(
+            set(Movie.objects.values_list('excerpt', 'excerpt_truncated')), {('Robbers', False), ('TV movie', False)}
+        )
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='secret')
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.heat = create_movie('Heat')
+        cls.alien = create_movie('Alien, the "original"')
+        UserMovieRating.objects.create(user=cls.user, movie=cls.heat, rating=4)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_requires_superuser(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('export_data', args=['movies'])).status_code, 403)
+
+    def test_csv_export(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_data', args=['movies']))
+        rows = list(csv.DictReader(io.StringIO(self.read(response).decode('utf-8'))))
+        self.assertEqual([row['title'] for row in rows], ['Heat', 'Alien, the "original"'])
+        self.assertEqual(rows[0]['rating'], '4.0')
+
+    def test_gzip_jsonl_since(self):
+        self.client.force_login(self.admin)
+        Movie.objects.filter(pk=self.heat.pk).update(updated_at=timezone.now() - datetime.timedelta(days=10))
+        since = (timezone.now() - datetime.timedelta(days=1)).date().isoformat()
+        response = self.client.get(reverse('export_data', args=['movies']), {'format': 'jsonl', 'gzip': '1', 'since': since})
+        lines = gzip.decompress(self.read(response)).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.alien.id])
+
+    def test_export_command(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'ratings.jsonl')
+        call_command('export', 'ratings', '--format', 'jsonl', '--output', path)
+        with open(path, encoding='utf-8') as handle:
+            rows = [json.loads(line) for line in handle]
+        self.assertEqual([(row['user_id'], row['movie_id'], row['rating']) for row in rows], [(self.user.id, self.heat.id, 4.0)])
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.movies = [create_movie(title) for title in ['Alien', 'Heat', 'Zodiac']]
+        UserMovieRating.objects.create(user=cls.user, movie=cls.movies[1], rating=5)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_movie_list')).status_code, 401)
+
+    def test_list_with_sparse_fields_and_cursor(self):
+        response = self.client.get(reverse('api_movie_list'), {'fields': 'title,release_year', 'page_size': 2})
+        data = response.json()
+        self.assertEqual(data['results'], [
+            {'id': self.movies[0].id, 'title': 'Alien', 'release_year': 2000},
+            {'id': self.movies[1].id, 'title': 'Heat', 'release_year': 2000},
+        ])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([movie['title'] for movie in data['results']], ['Zodiac'])
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fields_are_deferred(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api_movie_detail', args=[self.movies[0].id]), {'fields': 'title'})
+        movie_query = [query['sql'] for query in queries if 'FROM "movies_movie"' in query['sql']][0]
+        self.assertNotIn('description', movie_query)
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api_movie_list'), {'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_lookup_in_one_query(self):
+        ids = '%d,999,%d' % (self.movies[2].id, self.movies[0].id)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api_movie_batch'), {'ids': ids, 'fields': 'title'}).json()
+        self.assertEqual([movie['title'] for movie in data['results']], ['Zodiac', 'Alien'])
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual(len([query for query in queries if 'FROM "movies_movie"' in query['sql']]), 1)
+
+    def test_batch_rejects_out_of_range_ids(self):
+        for ids in ('99999999999999999999', '%d,-1' % self.movies[0].id, '0'):
+            response = self.client.get(reverse('api_movie_batch'), {'ids': ids})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.client.get('/api/movies/99999999999999999999/').status_code, 404)
+
+    def test_etag_revalidation(self):
+        url = reverse('api_movie_detail', args=[self.movies[1].id])
+        first = self.client.get(url)
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.client.get(reverse('api_movie_detail', args=[12345])).status_code, 404)
+
+    def test_library(self):
+        data = self.client.get(reverse('api_library'), {'fields': 'title'}).json()
+        self.assertEqual(data['results'], [{'id': self.movies[1].id, 'title': 'Heat', 'user_rating': 5.0}])
+
+
+@skipUnless(importlib.util.find_spec('numpy') and importlib.util.find_spec('scipy'), 'numpy and scipy are required')
+class RecommendationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username='user%d' % i, password='secret') for i in range(4)]
+        cls.heat, cls.ronin, cls.thief, cls.frozen = [create_movie(title) for title in ['Heat', 'Ronin', 'Thief', 'Frozen']]
+        # Quienes ven Heat también ven Ronin y Thief; Frozen lo ve otro público
+        for user in cls.users[:3]:
+            UserMovieRating.objects.create(user=user, movie=cls.heat, rating=5)
+            UserMovieRating.objects.create(user=user, movie=cls.ronin, rating=4)
+        UserMovieRating.objects.create(user=cls.users[0], movie=cls.thief, rating=5)
+        UserMovieRating.objects.create(user=cls.users[3], movie=cls.frozen, rating=5)
+
+    def test_neighbors(self):
+        recommendations.rebuild_neighbors(k=5)
+        neighbors = list(MovieNeighbor.objects.filter(movie=self.heat).order_by('-score').values_list('neighbor', flat=True))
+        self.assertEqual(neighbors, [self.ronin.id, self.thief.id])
+        self.assertFalse(MovieNeighbor.objects.filter(neighbor=self.frozen).exists())
+
+    def test_recommendations_on_home_in_one_query(self):
+        recommendations.rebuild_neighbors(k=5)
+        newcomer = User.objects.create_user(username='newcomer', password='secret')
+        UserMovieRating.objects.create(user=newcomer, movie=self.heat, rating=5)
+        self.client.force_login(newcomer)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user_home'))
+        self.assertEqual([movie.id for movie in response.context['recommended']], [self.ronin.id, self.thief.id])
+        self.assertEqual(len([query for query in queries if 'movies_movieneighbor' in query['sql']]), 1)
+
+    def test_partial_refresh(self):
+        recommendations.rebuild_neighbors(k=5)
+        MovieNeighbor.objects.filter(movie=self.ronin).delete()
+        call_command('rebuild_recommendations', str(self.ronin.id), stdout=StringIO())
+        self.assertTrue(MovieNeighbor.objects.filter(movie=self.ronin, neighbor=self.heat).exists())
+
+
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.heat = create_movie('Heat', director='Michael Mann')
+        cls.alien = create_movie('Alien')
+        UserMovieRating.objects.create(user=cls.user, movie=cls.heat, rating=4)
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.async_client = AsyncClient()
+
+    async def test_anonymous_users_are_redirected(self):
+        response = await self.async_client.get(reverse('user_movies'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+    async def test_catalog_and_library_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+        response = await self.async_client.get(reverse('user_available_movies'))
+        self.assertEqual([movie.title for movie in response.context['movies']], ['Alien', 'Heat'])
+        self.assertEqual(response['X-Catalog-Cache'], 'miss')
+        response = await self.async_client.get(reverse('user_available_movies'))
+        self.assertEqual(response['X-Catalog-Cache'], 'hit')
+
+        response = await self.async_client.get(reverse('search_results'), {'search_query': 'mann'})
+        self.assertEqual([movie.title for movie in response.context['movies']], ['Heat'])
+
+        response = await self.async_client.get(reverse('user_movies'))
+        self.assertEqual([movie.user_rating for movie in response.context['user_movies']], [4])
+        response = await self.async_client.get(reverse('search_from_my_movies'), {'search_query': 'alien'})
+        self.assertEqual(response.context['error'], 'No results found.')
+
+        response = await self.async_client.get(reverse('user_movie_detail', args=[self.alien.id]))
+        self.assertEqual(response.context['movie'], self.alien)
+        response = await self.async_client.get(reverse('user_movie_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class BenchmarkConcurrencyTests(LiveServerTestCase):
+
+    def test_compares_targets(self):
+        User.objects.create_user(username='bench', password='secret')
+        create_movie('Heat')
+        out = StringIO()
+        call_command(
+            'benchmark_concurrency', 'first=%s' % self.live_server_url, 'second=%s' % self.live_server_url,
+            '--username', 'bench', '--path', '/user_available_movies/', '--requests', '6',
+            '--concurrency', '2', '--warmup', '0', stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[:3] for line in lines[1:]], [['first', '6', '0'], ['second', '6', '0']])
+        self.assertIn('1.00x', lines[1])
+
+
+class SQLiteConnectionTests(TestCase):
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        pragmas = db.current_pragmas(connection, ['busy_timeout', 'synchronous', 'cache_size'])
+        self.assertEqual(pragmas, {'busy_timeout': 20000, 'synchronous': 1, 'cache_size': -64000})
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+
+    def test_concurrent_writers_do_not_lock(self):
+        out = StringIO()
+        call_command(
+            'stress_sqlite_writes', '--writers', '12', '--operations', '15', '--movies', '3',
+            '--baseline-timeout', '0.01', stdout=out,
+        )
+        rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[1:3]}
+        baseline, tuned = rows['baseline'], rows['tuned']
+        self.assertEqual(baseline[1], 'delete')
+        self.assertGreater(int(baseline[3]), 0)
+        self.assertEqual(tuned[1:4], ['wal', '180', '0'])
+        self.assertGreater(float(tuned[4]), float(baseline[4]))
+        # La base de datos temporal usa su propio alias
+        self.assertNotIn('stress', connections.settings)
+
+
+class FacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.heat = create_movie('Heat', genre='Crime', age_rating='R', release_year=1995, duration=170)
+        cls.ronin = create_movie('Ronin', genre=' crime ', age_rating='R', release_year=1998, duration=122)
+        cls.up = create_movie('Up', genre='Animation', age_rating='PG', release_year=2009, duration=96)
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.client.force_login(self.user)
+
+    def test_genres_are_normalised(self):
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(self.heat.genre_ref, self.ronin.genre_ref)
+        self.heat.genre = 'Thriller'
+        self.heat.save()
+        self.assertEqual(Movie.objects.get(pk=self.heat.pk).genre_ref.name, 'Thriller')
+
+    def test_bulk_changes_assign_genres(self):
+        Movie.objects.filter(pk=self.up.pk).update(genre='Family', genre_ref=None)
+        movies_bulk_changed.send(sender=Movie, movie_ids=[self.up.pk])
+        self.assertEqual(Movie.objects.get(pk=self.up.pk).genre_ref.name, 'Family')
+
+    def test_filtered_catalog_with_counts(self):
+        crime = self.heat.genre_ref_id
+        response = self.client.get(reverse('user_available_movies'), {'genre': crime, 'year_min': 1996})
+        self.assertEqual([movie.title for movie in response.context['movies']], ['Ronin'])
+        panel = response.context['facets']
+        self.assertEqual(panel['total'], 1)
+        self.assertEqual({option['label']: option['count'] for option in panel['genres']}, {'Animation': 0, 'Crime': 1})
+        self.assertEqual([option['value'] for option in panel['genres'] if option['selected']], [crime])
+        self.assertEqual(panel['year'], [1995, 2009])
+
+    def test_out_of_range_filters_are_ignored(self):
+        huge = '9' * 20
+        filters = facets.parse_filters(QueryDict('genre=%s&year_min=%s&duration_max=-%s' % (huge, huge, huge)))
+        self.assertFalse(facets.is_filtered(filters))
+        response = self.client.get(reverse('user_available_movies'), {'genre': huge, 'year_max': huge})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['movies']), 3)
+
+    def test_counts_come_from_one_cached_query(self):
+        filters = facets.parse_filters(QueryDict('age=R&duration_max=150'))
+        with CaptureQueriesContext(connection) as queries:
+            counts = facets.cached_facets(filters)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((counts['total'], counts['age_ratings']), (1, {'R': 1}))
+        with CaptureQueriesContext(connection) as queries:
+            facets.cached_facets(facets.parse_filters(QueryDict('duration_max=150&age=R')))
+        self.assertEqual(len(queries), 0)
+
+
+class RequestInstrumentationTests(QueryAssertionsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.admin = User.objects.create_superuser(username='admin', password='secret')
+        for index in range(8):
+            movie = create_movie('Movie %d' % index, genre='Genre %d' % (index % 3))
+            UserMovieRating.objects.create(user=cls.user, movie=movie, rating=index % 5 + 1)
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+
+    def test_fingerprints_ignore_parameters(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM movies_movie WHERE id = 1 AND title = 'Heat'"),
+            fingerprint("SELECT * FROM movies_movie WHERE id = 22 AND title = 'Ronin'"),
+        )
+        self.assertEqual(
+            normalize_sql('SELECT * FROM movies_movie WHERE id IN (%s, %s, %s)'),
+            normalize_sql('SELECT  *  FROM movies_movie WHERE id IN (4, 5)'),
+        )
+
+    def test_server_timing_header_and_log(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('movies.timing', 'INFO') as logs:
+            response = self.client.get(reverse('user_movies'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", dup;desc="0 repeated", render;dur=[\d.]+, total;dur=[\d.]+$')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['path'], line['status'], line['duplicates']), (reverse('user_movies'), 200, []))
+        self.assertGreater(line['render_ms'], 0)
+
+    def test_n_plus_one_is_logged_as_warning(self):
+        def view(request):
+            return HttpResponse(str([movie.genre_ref.name for movie in Movie.objects.all()]))
+
+        middleware = RequestTimingMiddleware(view)
+        with self.assertLogs('movies.timing', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/'))
+        self.assertIn('dup;desc="1 repeated"', response['Server-Timing'])
+        self.assertEqual(json.loads(logs.records[0].getMessage())['duplicates'][0]['count'], 8)
+
+    def test_assertion_catches_repeated_queries(self):
+        with self.assertRaisesMessage(AssertionError, '1 query repeated more than 2 times'):
+            with self.assertMaxRepeatedQueries(2):
+                [movie.genre_ref.name for movie in Movie.objects.all()]
+
+    def test_views_have_no_n_plus_one(self):
+        self.client.force_login(self.user)
+        for name in ['user_home', 'user_available_movies', 'user_movies', 'search_results', 'search_from_my_movies']:
+            with self.subTest(view=name), self.assertMaxRepeatedQueries(1):
+                self.client.get(reverse(name), {'search_query': 'movie'})
+        self.client.force_login(self.admin)
+        with self.assertMaxRepeatedQueries(1):
+            self.client.get(reverse('admin_movies'))
+
+
+class SyntheticBenchmarkTests(TestCase):
+
+    def test_seed_is_reproducible_and_skewed(self):
+        def snapshot():
+            with self.captureOnCommitCallbacks(execute=True):
+                synthetic.seed(60, 30, ratings_per_user=8, seed=7)
+            return sorted(UserMovieRating.objects.values_list('user__username', 'movie__title', 'rating'))
+
+        first = snapshot()
+        self.assertEqual(snapshot(), first)
+        self.assertEqual(Movie.objects.count(), 60)
+        counts = sorted(Movie.objects.values_list('rating_count', flat=True), reverse=True)
+        self.assertEqual(sum(counts), len(first))
+        # Con popularidad Zipf la película más calificada supera con creces a la mediana
+        self.assertGreater(counts[0], 3 * max(1, counts[len(counts) // 2]))
+        self.assertEqual(Genre.objects.filter(movies__isnull=False).distinct().count(), len(set(Movie.objects.values_list('genre', flat=True))))
+
+    def test_measures_every_route(self):
+        synthetic.seed(20, 5, ratings_per_user=4, seed=1)
+        user = User.objects.filter(usermovierating__isnull=False).first()
+        admin = User.objects.create_superuser('boss', password='secret')
+        movie_ids = list(Movie.objects.filter(usermovierating__user=user).values_list('id', flat=True))
+        sample = {'movie_id': movie_ids[0], 'ids': movie_ids, 'kind': 'movies', 'query': 'night'}
+        results = benchmark.measure_routes(user, admin, sample, repeat=2)
+        self.assertEqual(set(results), {name for name, _ in benchmark.discover_routes()})
+        self.assertNotIn('logout', results)
+        self.assertEqual(results['user_movies']['status'], 200)
+        self.assertEqual(results['export_data']['status'], 200)
+        self.assertGreater(results['user_movies']['queries'], 0)
+        self.assertLessEqual(results['user_movies']['p50_ms'], results['user_movies']['p99_ms'])
+
+    def test_diff_flags_regressions(self):
+        def run(p95, queries):
+            return {'results': {'100': {'user_movies': {'p95_ms': p95, 'queries': queries}}}}
+
+        directory = tempfile.mkdtemp()
+        paths = []
+        for name, data in [('base', run(10.0, 3)), ('slow', run(20.0, 3))]:
+            paths.append(os.path.join(directory, name + '.json'))
+            with open(paths[-1], 'w') as output:
+                json.dump(data, output)
+        out = StringIO()
+        call_command('benchmark_urls', '--diff', *paths, stdout=out)
+        self.assertIn('2.00x', out.getvalue())
+        self.assertIn('REGRESSION', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_urls', '--diff', *paths, '--fail-on-regression', stdout=StringIO())
+        self.assertFalse(benchmark.compare_runs(run(10.0, 3), run(11.0, 3))[0]['regression'])
+        self.assertTrue(benchmark.compare_runs(run(10.0, 3), run(10.0, 4))[0]['regression'])
+
+
+class WriteBehindTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = create_movie('Heat')
+        cls.users = [User.objects.create_user(username='rater%d' % index, password='secret') for index in range(5)]
+
+    def rate_all(self, rating):
+        for user in self.users:
+            user_rating, _ = UserMovieRating.objects.get_or_create(user=user, movie=self.movie)
+            user_rating.rating = rating
+            user_rating.save()
+
+    @override_settings(MOVIES_RATING_WRITE_BEHIND='thread', MOVIES_RATING_FLUSH_INTERVAL=0)
+    def test_in_memory_marks_are_coalesced(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rate_all(4)
+            self.rate_all(5)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating_count, 0)
+        self.assertEqual(writebehind.pending(), {self.movie.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(writebehind.flush(), 1)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "movies_movie"')]), 1)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_count, self.movie.rating, self.movie.rating_histogram), (5, 5.0, [0, 0, 0, 0, 5]))
+        self.assertEqual(writebehind.pending(), set())
+
+    @override_settings(MOVIES_RATING_WRITE_BEHIND='thread', MOVIES_RATING_FLUSH_INTERVAL=0)
+    def test_shutdown_flushes_pending_marks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rate_all(3)
+        writebehind.shutdown()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_count, self.movie.rating), (5, 3.0))
+
+    @override_settings(MOVIES_RATING_WRITE_BEHIND='worker')
+    def test_worker_command_processes_marks(self):
+        self.rate_all(2)
+        UserMovieRating.objects.filter(user=self.users[0]).get().delete()
+        self.assertEqual(PendingRatingUpdate.objects.count(), 1)
+        call_command('process_rating_updates', '--once', stdout=StringIO())
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_count, self.movie.rating), (4, 2.0))
+        self.assertFalse(PendingRatingUpdate.objects.exists())
+
+
+class CachedSessionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        create_movie('Heat')
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.client.force_login(self.user)
+
+    def test_warm_session_needs_no_queries(self):
+        url = reverse('user_available_movies')
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        self.assertGreater(len(cold), 0)
+        # Sesión, usuario y página vienen de la caché
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Catalog-Cache'], 'hit')
+        # En una página sin caché solo quedan las consultas propias de la vista
+        self.client.get(reverse('user_movies'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('user_movies'))
+        self.assertFalse([query for query in queries if 'django_session' in query['sql'] or '"auth_user"' in query['sql']])
+
+    def test_user_changes_are_visible(self):
+        self.client.get(reverse('user_movies'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('user_movies')).status_code, 302)
+
+    def test_logout_invalidates_session_and_user(self):
+        self.client.get(reverse('user_movies'))
+        self.assertIsNotNone(auth.get_cache().get(auth.user_cache_key(self.user.pk)))
+        self.client.get(reverse('logout'))
+        self.assertIsNone(auth.get_cache().get(auth.user_cache_key(self.user.pk)))
+        self.assertEqual(self.client.get(reverse('user_movies')).status_code, 302)
+
+
+def poster_bytes(size=(600, 900), color=(200, 30, 30), fmt='PNG'):
+    """
+    Genera un cartel de prueba con Pillow.
+    """
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, format=fmt)
+    return output.getvalue()
+
+
+class PosterServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que sustituye a los servidores de carteles en las pruebas.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                if self.path not in server.files:
+                    self.send_error(404)
+                    return
+                content_type, body = server.files[self.path]
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+    def url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self.server_address[1], path)
+
+
+@skipUnless(importlib.util.find_spec('PIL'), 'Pillow is not installed')
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = PosterServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MOVIES_THUMBNAIL_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        movie_cache.get_cache().clear()
+        self.server.files = {'/poster.png': ('image/png', poster_bytes())}
+        self.server.requests = []
+        self.movie = create_movie('Heat', image_url=self.server.url('/poster.png'))
+
+    def get_thumbnail(self, movie=None):
+        return self.client.get(thumbnails.thumbnail_url(movie or self.movie))
+
+    def test_thumbnail_is_resized_and_cached(self):
+        from PIL import Image
+
+        response = self.get_thumbnail()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        image = Image.open(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (200, 300))
+
+        # La segunda petición sale del disco sin descargar ni consultar la base de datos
+        with self.assertNumQueries(0):
+            response = self.get_thumbnail()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests, ['/poster.png'])
+
+        response = self.client.get(thumbnails.thumbnail_url(self.movie), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_identical_posters_share_a_file(self):
+        self.server.files['/copy.png'] = self.server.files['/poster.png']
+        other = create_movie('Ronin', image_url=self.server.url('/copy.png'))
+        self.get_thumbnail()
+        self.get_thumbnail(other)
+        files = list((thumbnails.get_directory() / 'thumbs').glob('*/*'))
+        self.assertEqual(len(files), 1)
+
+    def test_changed_poster_gets_a_new_url(self):
+        old_url = thumbnails.thumbnail_url(self.movie)
+        self.server.files['/new.png'] = ('image/png', poster_bytes(color=(0, 0, 200)))
+        self.movie.image_url = self.server.url('/new.png')
+        self.movie.save()
+        response = self.client.get(old_url)
+        self.assertRedirects(response, thumbnails.thumbnail_url(self.movie), fetch_redirect_response=False)
+
+    def test_oversized_or_broken_posters_fall_back_to_the_original(self):
+        with override_settings(MOVIES_THUMBNAIL_MAX_BYTES=100):
+            response = self.get_thumbnail()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], self.movie.image_url)
+
+        broken = create_movie('Ronin', image_url=self.server.url('/missing.png'))
+        response = self.get_thumbnail(broken)
+        self.assertEqual(response['Location'], broken.image_url)
+        # El fallo se recuerda y no se vuelve a descargar en cada petición
+        self.get_thumbnail(broken)
+        self.assertEqual(self.server.requests.count('/missing.png'), 1)
+
+    def test_least_recently_used_thumbnails_are_evicted(self):
+        first = self.movie
+        self.server.files['/second.png'] = ('image/png', poster_bytes(color=(0, 200, 0)))
+        second = create_movie('Ronin', image_url=self.server.url('/second.png'))
+        self.get_thumbnail(first)
+        self.get_thumbnail(second)
+        first_path = thumbnails.lookup(thumbnails.source_key(first.image_url))[0]
+        second_path = thumbnails.lookup(thumbnails.source_key(second.image_url))[0]
+        os.utime(first_path, (1, 1))
+
+        second_pointer = thumbnails._pointer_path(thumbnails.source_key(second.image_url))
+        self.assertEqual(thumbnails.evict(max_bytes=second_path.stat().st_size + second_pointer.stat().st_size), 1)
+        self.assertFalse(first_path.exists())
+        self.assertTrue(second_path.exists())
+        # El puntero de la miniatura eliminada también se borra
+        self.assertEqual(list((thumbnails.get_directory() / 'sources').iterdir()), [second_pointer])
+        # Y los punteros a miniaturas que ya no existen
+        orphan = thumbnails._pointer_path('orphan')
+        orphan.write_text('missing.webp')
+        self.assertEqual(thumbnails.evict(), 0)
+        self.assertFalse(orphan.exists())
+        self.assertTrue(second_pointer.exists())
+        # La miniatura eliminada se vuelve a generar al pedirla
+        self.assertEqual(self.get_thumbnail(first).status_code, 200)
+        self.assertEqual(self.server.requests.count('/poster.png'), 2)
+
+    def test_directory_is_only_scanned_over_the_limit(self):
+        posters = []
+        for index in range(3):
+            self.server.files['/%d.png' % index] = ('image/png', poster_bytes(color=(index * 80, 0, 0)))
+            posters.append(create_movie('Movie %d' % index, image_url=self.server.url('/%d.png' % index)))
+        with mock.patch.object(thumbnails, 'evict', wraps=thumbnails.evict) as evict:
+            # El primer tamaño se mide recorriendo el directorio; los siguientes se suman
+            for movie in posters:
+                self.get_thumbnail(movie)
+            self.assertEqual(evict.call_count, 1)
+            directory = thumbnails.get_directory()
+            total = sum(path.stat().st_size for path in [*directory.glob('thumbs/*/*'), *directory.glob('sources/*')])
+            self.assertEqual(movie_cache.get_cache().get(thumbnails.SIZE_KEY), total)
+
+            with override_settings(MOVIES_THUMBNAIL_CACHE_BYTES=total):
+                self.get_thumbnail()
+            self.assertEqual(evict.call_count, 2)
+        self.assertLessEqual(movie_cache.get_cache().get(thumbnails.SIZE_KEY), total)
+
+    def test_list_templates_use_thumbnails(self):
+        user = User.objects.create_user(username='viewer', password='secret')
+        self.client.force_login(user)
+        response = self.client.get(reverse('user_available_movies'))
+        self.assertContains(response, thumbnails.thumbnail_url(self.movie))
+        self.assertNotContains(response, self.movie.image_url)
+        with override_settings(MOVIES_THUMBNAILS=False):
+            self.assertEqual(thumbnails.thumbnail_url(self.movie), self.movie.image_url)
+
+
+class MovieExcerptTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.long = create_movie('Heat', description='x' * 150)
+        cls.short = create_movie('Alien', description='Space horror')
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        self.client.force_login(self.user)
+
+    def test_excerpt_is_maintained_on_save(self):
+        self.assertEqual((self.long.excerpt, self.long.excerpt_truncated), ('x' * 100, True))
+        self.assertEqual((self.short.excerpt, self.short.excerpt_truncated), ('Space horror', False))
+        self.short.description = 'y' * 101
+        self.short.save(update_fields=['description'])
+        self.short.refresh_from_db()
+        self.assertEqual((self.short.excerpt, self.short.excerpt_truncated), ('y' * 100, True))
+
+    def test_lists_do_not_load_descriptions(self):
+        UserMovieRating.objects.create(user=self.user, movie=self.long)
+        for url in (reverse('user_available_movies'), reverse('user_movies')):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            movie_queries = [query['sql'] for query in queries if 'FROM "movies_movie"' in query['sql']]
+            self.assertTrue(movie_queries)
+            self.assertFalse([sql for sql in movie_queries if '"movies_movie"."description"' in sql])
+            self.assertContains(response, 'x' * 100 + '...')
+            self.assertNotContains(response, 'x' * 101)
+
+
+@override_settings(MOVIES_LEADERBOARD_MIN_VOTES=5)
+class LeaderboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username='user%d' % index, password='secret') for index in range(12)]
+        cls.single_vote = create_movie('Alien', genre='Horror')
+        cls.popular = create_movie('Heat', genre='Crime')
+        cls.unrated = create_movie('Ronin', genre='Crime')
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        leaderboards.rebuild()
+
+    def rate(self, movie, stars):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user, rating in zip(self.users, stars):
+                UserMovieRating.objects.create(user=user, movie=movie, rating=rating)
+
+    def titles(self, chart, genre=None):
+        return [movie.title for movie in leaderboards.top(chart, genre=genre)]
+
+    def test_weighted_rating_favours_movies_with_many_votes(self):
+        self.rate(self.single_vote, [5])
+        self.rate(self.popular, [5, 4, 5, 4, 5, 4, 5, 4, 5, 4])
+        self.rate(self.unrated, [2] * 10)
+        self.assertEqual(self.titles(LeaderboardEntry.TOP_RATED), ['Heat', 'Alien', 'Ronin'])
+        self.assertEqual(self.titles(LeaderboardEntry.MOST_RATED), ['Heat', 'Ronin', 'Alien'])
+        crime = Genre.objects.get(key='crime')
+        self.assertEqual(self.titles(LeaderboardEntry.TOP_RATED, genre=crime), ['Heat', 'Ronin'])
+
+        # Los cambios incrementales coinciden con una reconstrucción completa con la misma media
+        incremental = {chart: [(movie.id, movie.chart_score) for movie in movies] for chart, movies in leaderboards.charts().items()}
+        leaderboards.rebuild()
+        rebuilt = leaderboards.charts()
+        self.assertEqual(incremental[LeaderboardEntry.MOST_RATED], [(movie.id, movie.chart_score) for movie in rebuilt[LeaderboardEntry.MOST_RATED]])
+        self.assertEqual([movie.title for movie in rebuilt[LeaderboardEntry.TOP_RATED]], ['Heat', 'Alien', 'Ronin'])
+
+    def test_rating_and_genre_changes_are_applied(self):
+        self.rate(self.single_vote, [2])
+        with self.captureOnCommitCallbacks(execute=True):
+            UserMovieRating.objects.filter(movie=self.single_vote).get().delete()
+        self.assertEqual(self.titles(LeaderboardEntry.TOP_RATED), [])
+
+        self.rate(self.popular, [4])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.popular.genre = 'Drama'
+            self.popular.save()
+        self.assertEqual(self.titles(LeaderboardEntry.TOP_RATED, genre=Genre.objects.get(key='drama')), ['Heat'])
+        self.assertEqual(self.titles(LeaderboardEntry.TOP_RATED, genre=Genre.objects.get(key='crime')), [])
+
+    def test_rebuild_command(self):
+        self.rate(self.popular, [3, 5])
+        LeaderboardEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_leaderboards', stdout=out)
+        self.assertIn('Ranked 1 movies (catalog mean 4.00)', out.getvalue())
+        self.assertEqual(self.titles(LeaderboardEntry.MOST_RATED), ['Heat'])
+
+    def test_charts_are_served_from_home_and_charts_page(self):
+        self.rate(self.popular, [5, 4])
+        self.rate(self.single_vote, [3])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user_home'))
+        self.assertContains(response, 'Top rated')
+        self.assertContains(response, '2 votes')
+        self.assertEqual(len([query for query in queries if 'movies_leaderboardentry' in query['sql']]), 1)
+
+        self.client.force_login(self.users[0])
+        crime = Genre.objects.get(key='crime')
+        response = self.client.get(reverse('movie_charts'), {'genre': crime.pk})
+        self.assertEqual([movie.title for movie in response.context['top_rated']], ['Heat'])
+        self.assertEqual(self.client.get(reverse('movie_charts'), {'genre': 'x'}).status_code, 404)
+        for genre_id in ('9' * 20, '²'):
+            self.assertEqual(self.client.get(reverse('movie_charts'), {'genre': genre_id}).status_code, 404)
+
+
+class TypeaheadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.amelie = create_movie('Amélie')
+        cls.knight = create_movie('The Dark Knight', release_year=2008)
+        cls.dark = create_movie('Dark City')
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        typeahead.reset()
+        self.addCleanup(typeahead.reset)
+
+    def titles(self, prefix, limit=None):
+        return [title for _, title, _ in typeahead.suggest(prefix, limit=limit)]
+
+    def test_prefixes_are_accent_and_case_insensitive(self):
+        self.assertEqual(self.titles('AME'), ['Amélie'])
+        self.assertEqual(self.titles('  amelie '), ['Amélie'])
+        # Primero los títulos que empiezan por el prefijo y después las coincidencias por palabra
+        self.assertEqual(self.titles('dark'), ['Dark City', 'The Dark Knight'])
+        self.assertEqual(self.titles('dark kn'), ['The Dark Knight'])
+        self.assertEqual(self.titles('dark', limit=1), ['Dark City'])
+        self.assertEqual(self.titles(''), [])
+
+    def test_index_is_built_lazily_and_kept_up_to_date(self):
+        self.assertIsNone(typeahead._index)
+        self.titles('a')
+        index = typeahead._index
+        self.assertEqual(len(index), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_movie('Darkman')
+            self.knight.title = 'Batman Begins'
+            self.knight.save()
+            self.amelie.delete()
+        self.assertEqual(self.titles('dark'), ['Dark City', 'Darkman'])
+        self.assertEqual(self.titles('batman'), ['Batman Begins'])
+        self.assertEqual(self.titles('ame'), [])
+        # Los cambios se aplicaron sobre el mismo índice, sin reconstruirlo
+        self.assertIs(typeahead._index, index)
+
+        # Un cambio de versión hecho en otro proceso obliga a reconstruirlo
+        movie_cache.bump_catalog_version()
+        self.assertEqual(self.titles('darkm'), ['Darkman'])
+        self.assertIsNot(typeahead._index, index)
+
+    def test_changes_from_other_processes_are_not_marked_as_seen(self):
+        self.titles('a')
+        with self.captureOnCommitCallbacks(execute=True):
+            # Otro proceso con la caché compartida cambia el catálogo mientras este guarda una película
+            Movie.objects.filter(pk=self.dark.pk).update(title='Metropolis')
+            movie_cache.bump_catalog_version()
+            create_movie('Darkman')
+        self.assertIsNone(typeahead._index)
+        self.assertEqual(self.titles('dark'), ['Darkman', 'The Dark Knight'])
+        self.assertEqual(self.titles('metro'), ['Metropolis'])
+
+        # Si el otro cambio llega después, el índice solo avanza hasta la versión de este proceso
+        with self.captureOnCommitCallbacks(execute=True):
+            self.amelie.delete()
+            Movie.objects.filter(pk=self.knight.pk).update(title='Batman Begins')
+            movie_cache.bump_catalog_version()
+        self.assertEqual(self.titles('batman'), ['Batman Begins'])
+        self.assertEqual(self.titles('ame'), [])
+
+    @override_settings(MOVIES_TYPEAHEAD_MAX_MOVIES=2)
+    def test_index_size_is_bounded(self):
+        UserMovieRating.objects.create(user=self.user, movie=self.amelie, rating=5)
+        self.titles('a')
+        self.assertEqual(len(typeahead._index), 2)
+        self.assertEqual(self.titles('ame'), ['Amélie'])
+
+    def test_endpoint(self):
+        url = reverse('api_movie_typeahead')
+        self.assertEqual(self.client.get(url, {'q': 'dark'}).status_code, 401)
+        self.client.force_login(self.user)
+        self.client.get(url, {'q': 'dark'})
+        # Con la sesión en caché y el índice construido, una sugerencia no consulta la base de datos
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'the d', 'limit': 50})
+        self.assertEqual(response.json()['results'], [{
+            'id': self.knight.pk, 'title': 'The Dark Knight', 'release_year': 2008,
+            'url': reverse('user_movie_detail', args=[self.knight.pk]),
+        }])
+        self.assertEqual(self.client.get(url, {'q': 'dark', 'limit': 'x'}).status_code, 400)
+
+    def test_lookups_are_fast(self):
+        index = typeahead.TitleIndex(max_movies=50000)
+        words = synthetic.WORDS
+        index.build(
+            (pk, '%s %s %s %d' % (words[pk % 20], words[pk // 20 % 20], words[pk // 400 % 20], pk), 2000)
+            for pk in range(50000)
+        )
+        started = time.perf_counter()
+        for prefix in ('n', 'night c', 'storm', 'gold', 'wild fire'):
+            self.assertTrue(index.search(prefix, 8))
+        self.assertLess((time.perf_counter() - started) / 5, 0.005)
+
+
+class FuzzySearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.godfather = create_movie('The Godfather', director='Francis Ford Coppola')
+        cls.amelie = create_movie('Amélie', director='Jean-Pierre Jeunet')
+        cls.heat = create_movie('Heat', director='Michael Mann')
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+
+    def test_similarity(self):
+        self.assertEqual(fuzzy.similarity('Heat', 'heat'), 1.0)
+        self.assertEqual(fuzzy.similarity('Amelie', 'Amélie'), 1.0)
+        self.assertGreater(fuzzy.similarity('Godfahter', 'The Godfather'), 0.3)
+        self.assertLess(fuzzy.similarity('Godfahter', 'Heat'), 0.1)
+        self.assertEqual(fuzzy.similarity('', 'Heat'), 0.0)
+
+    def test_misspellings_match_titles_and_directors(self):
+        self.assertEqual(fuzzy.search_movie_ids('Godfahter'), [self.godfather.pk])
+        self.assertEqual(fuzzy.search_movie_ids('francis ford copola'), [self.godfather.pk])
+        self.assertEqual(fuzzy.search_movie_ids('amelei'), [self.amelie.pk])
+        self.assertEqual(fuzzy.search_movie_ids('zzzz'), [])
+        self.assertEqual(fuzzy.search_movie_ids('Godfahter', threshold=0.9), [])
+
+    def test_threshold_applies_to_weighted_scores(self):
+        # Un director idéntico puntúa 0.9 (su peso), por debajo del umbral aunque su similitud sea 1
+        self.assertEqual(fuzzy.search_movie_ids('Michael Mann', threshold=0.95), [])
+        self.assertEqual(fuzzy.search_movie_ids('Michael Mann', threshold=0.9), [self.heat.pk])
+        self.assertEqual(fuzzy.search_movie_ids('Heat', threshold=0.95), [self.heat.pk])
+
+    def test_index_follows_the_catalog(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.heat.title = 'Collateral'
+            self.heat.save()
+        self.assertEqual(fuzzy.search_movie_ids('colateral'), [self.heat.pk])
+        self.assertEqual(fuzzy.search_movie_ids('haet'), [])
+
+        self.heat.delete()
+        self.assertFalse(MovieTrigram.objects.filter(movie_id=self.heat.pk).exists())
+
+        Movie.objects.filter(pk=self.amelie.pk).update(title='Delicatessen')
+        movies_bulk_changed.send(sender=None, movie_ids=[self.amelie.pk])
+        self.assertEqual(fuzzy.search_movie_ids('delicatesen'), [self.amelie.pk])
+
+        MovieTrigram.objects.all().delete()
+        self.assertEqual(fuzzy.rebuild_index(), 2)
+        self.assertEqual(fuzzy.search_movie_ids('Godfahter'), [self.godfather.pk])
+
+    def test_search_falls_back_to_similar_titles(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_results'), {'search_query': 'Godfahter'})
+        self.assertEqual([movie.pk for movie in response.context['movies']], [self.godfather.pk])
+        self.assertIn('Showing similar titles', response.context['confirmation'])
+
+        # Si la búsqueda exacta encuentra algo no se buscan títulos parecidos
+        response = self.client.get(reverse('search_results'), {'search_query': 'godfather'})
+        self.assertEqual([movie.pk for movie in response.context['movies']], [self.godfather.pk])
+        self.assertIsNone(response.context['confirmation'])
+
+
+@override_settings(MOVIES_THROTTLE_RATES={
+    'signin': {'rate': '2/min', 'methods': ['POST']},
+    'search_results': {'rate': '3/min', 'methods': ['GET']},
+})
+class ThrottlingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.other = User.objects.create_user(username='other', password='secret')
+        create_movie('Heat')
+
+    def setUp(self):
+        throttling.get_cache().clear()
+        self.addCleanup(throttling.get_cache().clear)
+
+    def test_token_bucket_refills(self):
+        self.assertEqual(throttling.parse_rate('10/min'), (10, 10 / 60))
+        for _ in range(2):
+            self.assertEqual(throttling.take('bucket', 2, 0.5, now=100.0), 0)
+        self.assertEqual(throttling.take('bucket', 2, 0.5, now=100.0), 2.0)
+        # Tras un segundo se ha recuperado medio token
+        self.assertEqual(throttling.take('bucket', 2, 0.5, now=101.0), 1.0)
+        self.assertEqual(throttling.take('bucket', 2, 0.5, now=102.0), 0)
+
+    def test_signin_is_limited_per_ip_and_per_username(self):
+        url = reverse('signin')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'username': 'viewer', 'password': 'x'}).status_code, 200)
+        response = self.client.post(url, {'username': 'other', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        # Mostrar el formulario no está limitado
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Desde otra IP, la cuenta atacada sigue limitada pero las demás no
+        response = self.client.post(url, {'username': 'VIEWER', 'password': 'x'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(url, {'username': 'other', 'password': 'x'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_is_limited_per_user(self):
+        url = reverse('search_results')
+        self.client.force_login(self.user)
+        # Cada petición desde una IP distinta: el límite que se agota es el del usuario
+        for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.client.get(url, {'search_query': 'heat'}, REMOTE_ADDR=address).status_code, 200)
+        self.assertEqual(self.client.get(url, {'search_query': 'heat'}, REMOTE_ADDR='10.0.0.9').status_code, 429)
+        # El catálogo se sigue navegando con normalidad
+        self.assertEqual(self.client.get(reverse('user_available_movies')).status_code, 200)
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url, {'search_query': 'heat'}, REMOTE_ADDR='10.0.0.10').status_code, 200)
+
+    @override_settings(MOVIES_MAX_CONCURRENT_REQUESTS=2, MOVIES_MAX_CONCURRENT_THROTTLED=1, MOVIES_SHED_RETRY_AFTER=3)
+    def test_load_shedding(self):
+        self.client.force_login(self.user)
+        throttling.enter(throttled=False)
+        self.addCleanup(throttling.leave)
+        # Con una petición en curso se rechazan las rutas caras, pero no el resto
+        response = self.client.get(reverse('search_results'), {'search_query': 'heat'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        # La petición rechazada no ha gastado tokens
+        self.assertIsNone(throttling.get_cache().get('throttle:search_results:user:%s' % self.user.pk))
+        self.assertEqual(self.client.get(reverse('user_available_movies')).status_code, 200)
+
+        throttling.enter(throttled=False)
+        self.addCleanup(throttling.leave)
+        self.assertEqual(self.client.get(reverse('user_available_movies')).status_code, 503)
+        self.assertEqual(throttling.in_flight(), 2)
+
+    async def test_async_views_are_limited(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        async_client = AsyncClient()
+        async_client.cookies = self.client.cookies
+        statuses = [
+            (await async_client.get(reverse('search_results'), {'search_query': 'heat'})).status_code
+            for _ in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(throttling.in_flight(), 0)
+
+    @override_settings(MOVIES_MAX_CONCURRENT_THROTTLED=1)
+    async def test_async_shed_requests_keep_their_tokens(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        async_client = AsyncClient()
+        async_client.cookies = self.client.cookies
+        throttling.enter(throttled=False)
+        try:
+            response = await async_client.get(reverse('search_results'), {'search_query': 'heat'})
+        finally:
+            throttling.leave()
+        self.assertEqual(response.status_code, 503)
+        statuses = [
+            (await async_client.get(reverse('search_results'), {'search_query': 'heat'})).status_code
+            for _ in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.admin = User.objects.create_superuser(username='admin', password='secret')
+        cls.movie = create_movie('Heat', description='A long description. ' * 20)
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+
+    def test_detail_pages_answer_304_with_a_single_lookup(self):
+        for user, name in ((self.user, 'user_movie_detail'), (self.admin, 'admin_movie_detail')):
+            self.client.force_login(user)
+            url = reverse(name, args=[self.movie.pk])
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertTrue(first['ETag'].startswith('W/"'))
+            self.assertIn('private', first['Cache-Control'])
+
+            # Con la sesión y el usuario en caché, validar la página solo lee la fecha de modificación
+            with self.assertNumQueries(1):
+                second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(second.status_code, 304)
+            self.assertEqual(second.content, b'')
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+        # Otro usuario no reutiliza la página del anterior
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_changes_invalidate_the_detail_page(self):
+        self.client.force_login(self.user)
+        url = reverse('user_movie_detail', args=[self.movie.pk])
+        etag = self.client.get(url)['ETag']
+
+        UserMovieRating.objects.create(user=self.user, movie=self.movie, rating=4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.movie.title = 'Heat (1995)'
+        self.movie.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(reverse('user_movie_detail', args=[0])).status_code, 404)
+
+    def test_list_pages_follow_the_catalog_version(self):
+        self.client.force_login(self.user)
+        url = reverse('user_available_movies')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'page_size': 5}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.movie.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cached_pages_are_compressed_once(self):
+        self.client.force_login(self.user)
+        url = reverse('user_available_movies')
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        compressions = []
+        original = compression.compress
+
+        def counting_compress(content, encoding):
+            compressions.append(encoding)
+            return original(content, encoding)
+
+        compression.compress = counting_compress
+        self.addCleanup(setattr, compression, 'compress', original)
+        for _ in range(3):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='br;q=1.0, gzip, deflate')
+            self.assertEqual(response['Content-Encoding'], compression.available_encodings()[0])
+            self.assertEqual(response['X-Catalog-Cache'], 'hit')
+        self.assertEqual(len(compressions), 1)
+        if response['Content-Encoding'] == 'gzip':
+            self.assertEqual(gzip.decompress(response.content), plain.content)
+
+        refused = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertNotIn('Content-Encoding', refused)
+        self.assertEqual(refused.content, plain.content)
+
+    def test_accept_encoding_weights(self):
+        def choose(header):
+            return compression.choose_encoding(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header))
+
+        self.assertEqual(compression.parse_accept_encoding('gzip;q=0.5, br ;Q=0, *;q=x'), {'gzip': 0.5, 'br': 0.0, '*': 0.0})
+        self.assertEqual(choose('gzip'), 'gzip')
+        self.assertIsNone(choose('gzip;q=0'))
+        self.assertIsNone(choose('deflate, identity'))
+        self.assertEqual(choose('*'), compression.available_encodings()[0])
+        self.assertIsNone(choose('*;q=0'))
+        self.assertEqual(choose('*, gzip;q=0'), 'br' if 'br' in compression.available_encodings() else None)
+
+
+class BulkActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='secret')
+        cls.user = User.objects.create_user(username='viewer', password='secret')
+        cls.heat = create_movie('Heat', genre='Crime')
+        cls.ronin = create_movie('Ronin', genre='Crime')
+        cls.amelie = create_movie('Amélie', genre='Comedy')
+        for movie in (cls.heat, cls.ronin, cls.amelie):
+            UserMovieRating.objects.create(user=cls.user, movie=movie, rating=4)
+        MovieNeighbor.objects.create(movie=cls.amelie, neighbor=cls.heat, score=0.5)
+        leaderboards.rebuild()
+
+    def setUp(self):
+        movie_cache.get_cache().clear()
+        typeahead.reset()
+        self.addCleanup(typeahead.reset)
+        self.client.force_login(self.admin)
+
+    def post(self, action, movies, value='', **extra):
+        return self.client.post(reverse('bulk_movie_action'), {
+            'action': action, 'value': value, 'ids': [movie.pk for movie in movies],
+        }, **extra)
+
+    def test_delete_removes_movies_and_their_rows(self):
+        typeahead.suggest('heat')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(bulk.DELETE, [self.heat, self.ronin])
+        self.assertRedirects(response, reverse('admin_movies'), fetch_redirect_response=False)
+        self.assertEqual(list(Movie.objects.values_list('title', flat=True)), ['Amélie'])
+        self.assertEqual(UserMovieRating.objects.count(), 1)
+        self.assertFalse(MovieNeighbor.objects.exists())
+        self.assertFalse(LeaderboardEntry.objects.exclude(movie=self.amelie).exists())
+        self.assertFalse(MovieTrigram.objects.exclude(movie=self.amelie).exists())
+        # Los índices de búsqueda y de autocompletado ya no las encuentran
+        if search.is_available():
+            self.assertEqual(search.search_movie_ids('heat'), [])
+        self.assertEqual(typeahead.suggest('heat'), [])
+        self.assertIn('Removed 2 movies.', self.client.get(reverse('admin_movies')).content.decode())
+
+    def test_delete_runs_a_constant_number_of_queries(self):
+        def delete_queries(movies):
+            with CaptureQueriesContext(connection) as queries:
+                bulk.delete_movies([movie.pk for movie in movies])
+            return len(queries)
+
+        small = delete_queries([self.heat])
+        many = [create_movie('Movie %d' % number) for number in range(40)]
+        for movie in many:
+            UserMovieRating.objects.create(user=self.user, movie=movie, rating=3)
+        self.assertEqual(delete_queries(many), small)
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_genre_and_age_rating_updates(self):
+        before = Movie.objects.get(pk=self.heat.pk).updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(bulk.SET_GENRE, [self.heat, self.amelie], value='  Thriller ')
+        self.assertEqual(response.status_code, 302)
+        heat = Movie.objects.get(pk=self.heat.pk)
+        self.assertEqual((heat.genre, heat.genre_ref.name), ('Thriller', 'Thriller'))
+        self.assertGreater(heat.updated_at, before)
+        self.assertEqual(Movie.objects.get(pk=self.amelie.pk).genre_ref, heat.genre_ref)
+        self.assertEqual(Movie.objects.get(pk=self.ronin.pk).genre, 'Crime')
+        # Los rankings por género reflejan el cambio
+        thriller = [movie.pk for movie in leaderboards.top(LeaderboardEntry.MOST_RATED, genre=heat.genre_ref)]
+        self.assertEqual(sorted(thriller), sorted([self.heat.pk, self.amelie.pk]))
+        if search.is_available():
+            self.assertCountEqual(search.search_movie_ids('thriller'), [self.heat.pk, self.amelie.pk])
+
+        self.post(bulk.SET_AGE_RATING, [self.ronin], value='R')
+        self.assertEqual(Movie.objects.get(pk=self.ronin.pk).age_rating, 'R')
+
+    def test_signals_are_sent_after_commit(self):
+        received = []
+
+        def handler(signal, movie_ids, **kwargs):
+            received.append((signal, sorted(movie_ids)))
+
+        for signal in (movies_bulk_changed, movies_bulk_deleted):
+            signal.connect(handler)
+            self.addCleanup(signal.disconnect, handler)
+        with self.captureOnCommitCallbacks() as callbacks:
+            bulk.delete_movies([self.heat.pk])
+            bulk.set_age_rating([self.ronin.pk], 'R')
+        self.assertEqual(received, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(received, [(movies_bulk_deleted, [self.heat.pk]), (movies_bulk_changed, [self.ronin.pk])])
+
+        # Los receptores por fila vuelven a funcionar fuera del borrado masivo
+        UserMovieRating.objects.filter(movie=self.ronin).delete()
+        self.assertEqual(Movie.objects.get(pk=self.ronin.pk).rating_count, 0)
+
+    def test_invalid_requests(self):
+        response = self.post(bulk.SET_GENRE, [self.heat], HTTP_HX_REQUEST='true')
+        self.assertEqual((response.status_code, response.content), (400, b'Please provide a value.'))
+        response = self.post(bulk.DELETE, [], HTTP_HX_REQUEST='true')
+        self.assertEqual((response.status_code, response.content), (400, b'Select at least one movie.'))
+        self.assertEqual(self.post('rename', [self.heat], HTTP_HX_REQUEST='true').status_code, 400)
+        for action, value in ((bulk.DELETE, ''), (bulk.SET_GENRE, 'Drama')):
+            for pk in (2 ** 70, 0, -1):
+                response = self.client.post(reverse('bulk_movie_action'), {
+                    'action': action, 'value': value, 'ids': [self.heat.pk, pk],
+                }, HTTP_HX_REQUEST='true')
+                self.assertEqual((response.status_code, response.content), (400, b'Invalid selection.'))
+        self.assertRedirects(self.client.get(reverse('bulk_movie_action')), reverse('admin_movies'))
+        self.assertEqual(Movie.objects.count(), 3)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.post(bulk.DELETE, [self.heat]).status_code, 403)
+        self.assertEqual(Movie.objects.count(), 3)
+
+    def test_cached_list_form_posts_with_the_csrf_cookie(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.admin)
+        response = client.get(reverse('admin_movies'))
+        self.assertContains(response, 'id="bulk-actions"')
+        self.assertContains(response, 'value="%d"' % self.heat.pk)
+        # La plantilla envía el valor de la cookie como token, ya que la página puede venir de la caché
+        response = client.post(reverse('bulk_movie_action'), {
+            'action': bulk.SET_AGE_RATING, 'value': 'PG-13', 'ids': [self.heat.pk],
+            'csrfmiddlewaretoken': client.cookies[settings.CSRF_COOKIE_NAME].value,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Movie.objects.get(pk=self.heat.pk).age_rating, 'PG-13')
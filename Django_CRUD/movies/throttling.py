@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+
+# Protección frente a ráfagas de peticiones caras (inicio de sesión y registro, que calculan hashes de
+# contraseñas, y la búsqueda).
+# - Cubos de tokens por IP y por usuario para las rutas de MOVIES_THROTTLE_RATES: cada cubo admite una
+#   ráfaga de `n` peticiones y se rellena a `n` por periodo; sin tokens se responde 429 con Retry-After.
+#   Los cubos se guardan en la caché 'throttle', compartida por los procesos si su backend es 'file'.
+# - Límite de peticiones simultáneas por proceso: por encima de MOVIES_MAX_CONCURRENT_REQUESTS se
+#   responde 503 al instante en lugar de encolar; las rutas limitadas se rechazan antes, a partir de
+#   MOVIES_MAX_CONCURRENT_THROTTLED, para que la navegación normal del catálogo conserve su latencia.
+#   La petición se registra antes de tomar tokens, así que una petición rechazada con 503 no gasta cuota.
+
+PERIODS = {'s': 1, 'sec': 1, 'min': 60, 'hour': 3600, 'day': 86400}
+
+# Cerrojos separados: las lecturas y escrituras de los cubos en la caché (que puede estar en disco) no
+# deben retrasar el recuento de peticiones en curso, que se consulta en cada petición
+_bucket_lock = threading.Lock()
+_in_flight_lock = threading.Lock()
+_in_flight = 0
+
+
+class Rejection(Exception):
+    """
+    Petición rechazada por un límite, con el código de estado y los segundos tras los que puede reintentarse.
+    """
+
+    def __init__(self, status, retry_after, reason):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+    def response(self):
+        response = HttpResponse(self.reason, status=self.status, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(self.retry_after)
+        return response
+
+
+def get_cache():
+    return caches[getattr(settings, 'MOVIES_THROTTLE_CACHE_ALIAS', 'throttle')]
+
+
+def get_rates():
+    return getattr(settings, 'MOVIES_THROTTLE_RATES', {})
+
+
+def get_max_concurrent():
+    return getattr(settings, 'MOVIES_MAX_CONCURRENT_REQUESTS', 64)
+
+
+def get_max_concurrent_throttled():
+    return getattr(settings, 'MOVIES_MAX_CONCURRENT_THROTTLED', 16)
+
+
+def get_retry_after():
+    return getattr(settings, 'MOVIES_SHED_RETRY_AFTER', 1)
+
+
+def parse_rate(rate):
+    """
+    Convierte un límite como '10/min' en (capacidad del cubo, tokens por segundo).
+    """
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def get_rule(request):
+    """
+    Devuelve (nombre de la ruta, capacidad, tokens por segundo) si la petición está limitada, o None.
+    """
+    try:
+        name = resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+    rule = get_rates().get(name)
+    if rule is None or request.method not in rule.get('methods', ('GET', 'POST')):
+        return None
+    return (name,) + parse_rate(rule['rate'])
+
+
+def identities(request):
+    """
+    Devuelve las claves de los cubos de una petición: su IP y, si se conoce, su usuario.
+
+    El usuario es el de la sesión o, en un inicio de sesión, el nombre de usuario enviado, para frenar
+    los intentos contra una misma cuenta desde muchas IPs.
+    """
+    keys = ['ip:%s' % request.META.get('REMOTE_ADDR', '')]
+    user_id = request.session.get(SESSION_KEY) if hasattr(request, 'session') else None
+    if user_id is not None:
+        keys.append('user:%s' % user_id)
+    elif request.method == 'POST' and request.POST.get('username'):
+        keys.append('username:%s' % request.POST['username'].casefold())
+    return keys
+
+
+def take(key, capacity, refill_rate, now=None):
+    """
+    Toma un token del cubo indicado.
+
+    Parameters:
+    - key: str, la clave del cubo en la caché.
+    - capacity: int, el máximo de tokens (la ráfaga admitida).
+    - refill_rate: float, los tokens que se recuperan por segundo.
+    - now: float, el instante actual (por defecto `time.time()`).
+
+    Returns:
+    - float: 0 si había token, o los segundos que faltan para el siguiente.
+    """
+    now = time.time() if now is None else now
+    cache = get_cache()
+    # El cerrojo hace atómica la lectura y escritura en este proceso; entre procesos el límite es aproximado
+    with _bucket_lock:
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        if tokens >= 1:
+            cache.set(key, (tokens - 1, now), math.ceil(capacity / refill_rate))
+            return 0
+        cache.set(key, (tokens, now), math.ceil(capacity / refill_rate))
+        return (1 - tokens) / refill_rate
+
+
+def check_rate(name, capacity, refill_rate, keys):
+    """
+    Toma un token de cada cubo de la petición; lanza Rejection (429) si alguno está vacío.
+    """
+    wait = max(take('throttle:%s:%s' % (name, key), capacity, refill_rate) for key in keys)
+    if wait:
+        raise Rejection(429, math.ceil(wait), 'Too many requests. Try again later.')
+
+
+def enter(throttled):
+    """
+    Registra una petición en curso; lanza Rejection (503) si el proceso ya atiende demasiadas.
+
+    Parameters:
+    - throttled: bool, si la ruta es cara (se rechaza con un umbral más bajo).
+    """
+    global _in_flight
+    limit = get_max_concurrent_throttled() if throttled else get_max_concurrent()
+    with _in_flight_lock:
+        if _in_flight >= limit:
+            raise Rejection(503, get_retry_after(), 'Server busy. Try again later.')
+        _in_flight += 1
+
+
+def leave():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def in_flight():
+    return _in_flight
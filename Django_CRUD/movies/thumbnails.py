@@ -0,0 +1,341 @@
+import hashlib
+import io
+import os
+import tempfile
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+
+from .cache import get_cache
+
+
+# Miniaturas locales de los carteles.
+# Cada `image_url` se descarga una sola vez (con tiempo límite y tamaño máximo), se reduce a un
+# tamaño fijo y se guarda en disco direccionada por el hash de su contenido. Un puntero por URL de
+# origen (`sources/<clave>`) indica qué miniatura corresponde a cada cartel, así que las peticiones
+# siguientes se sirven desde disco sin consultar la base de datos. Cuando el directorio supera
+# MOVIES_THUMBNAIL_CACHE_BYTES se eliminan las miniaturas usadas hace más tiempo (LRU por mtime) junto
+# con sus punteros, que también cuentan en el tamaño.
+# El tamaño del directorio se lleva en la caché y se suma con cada miniatura nueva, así que el
+# directorio solo se recorre al superar el límite o cuando ese tamaño caduca (SIZE_TIMEOUT).
+# Pillow solo se necesita para generar miniaturas; sin él las plantillas enlazan el cartel original.
+
+FORMATS = {
+    'WEBP': ('webp', 'image/webp'),
+    'JPEG': ('jpg', 'image/jpeg'),
+}
+
+# Píxeles máximos del cartel de origen; las imágenes mayores se rechazan antes de decodificarlas
+MAX_SOURCE_PIXELS = 40 * 1000 * 1000
+
+# Segundos que se recuerda un cartel que no se pudo descargar, para no reintentarlo en cada petición
+FAILURE_TIMEOUT = 300
+
+# Clave de la caché con el tamaño aproximado del directorio de miniaturas
+SIZE_KEY = 'thumbnail:bytes'
+
+# Segundos tras los que el tamaño se vuelve a medir (corrige las miniaturas de otros procesos o borradas a mano)
+SIZE_TIMEOUT = 3600
+
+
+class ThumbnailError(Exception):
+    """
+    No se pudo descargar o procesar el cartel de origen.
+    """
+
+
+def _load_pillow():
+    try:
+        from PIL import Image, ImageOps, features
+    except ImportError as exc:
+        raise ThumbnailError('Generating thumbnails requires Pillow (pip install Pillow).') from exc
+    return Image, ImageOps, features
+
+
+def is_available():
+    """
+    Indica si las miniaturas están activadas y Pillow está instalado.
+    """
+    if not getattr(settings, 'MOVIES_THUMBNAILS', True):
+        return False
+    try:
+        _load_pillow()
+    except ThumbnailError:
+        return False
+    return True
+
+
+def get_directory():
+    return Path(getattr(settings, 'MOVIES_THUMBNAIL_DIR', Path(settings.BASE_DIR) / 'cache' / 'thumbnails'))
+
+
+def get_size():
+    return tuple(getattr(settings, 'MOVIES_THUMBNAIL_SIZE', (200, 300)))
+
+
+def get_max_bytes():
+    return getattr(settings, 'MOVIES_THUMBNAIL_CACHE_BYTES', 200 * 1024 * 1024)
+
+
+def get_format():
+    """
+    Devuelve el formato de las miniaturas: el configurado, o JPEG si Pillow no puede escribir WebP.
+    """
+    name = str(getattr(settings, 'MOVIES_THUMBNAIL_FORMAT', 'WEBP')).upper()
+    if name not in FORMATS:
+        name = 'JPEG'
+    if name == 'WEBP':
+        _, _, features = _load_pillow()
+        if not features.check('webp'):
+            name = 'JPEG'
+    return name
+
+
+def source_key(image_url):
+    """
+    Devuelve la clave de una URL de origen; forma parte de la URL de la miniatura, que cambia con el cartel.
+    """
+    return hashlib.sha256(image_url.encode('utf-8')).hexdigest()[:32]
+
+
+def thumbnail_url(movie):
+    """
+    Devuelve la URL con la que las plantillas muestran el cartel de una película.
+
+    Returns:
+    - str: La URL del proxy de miniaturas, o `image_url` si las miniaturas no están disponibles.
+    """
+    if not movie.image_url or not is_available():
+        return movie.image_url
+    return reverse('movie_thumbnail', args=[movie.id, source_key(movie.image_url)])
+
+
+def _pointer_path(key):
+    return get_directory() / 'sources' / key
+
+
+def _thumbnail_path(digest, extension):
+    return get_directory() / 'thumbs' / digest[:2] / ('%s.%s' % (digest, extension))
+
+
+def _write_atomic(path, data):
+    # Se escribe en un temporal y se renombra: otro proceso nunca ve un archivo a medias
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(descriptor, 'wb') as handle:
+            handle.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+
+def lookup(key):
+    """
+    Busca en disco la miniatura de una URL de origen y marca su uso para el LRU.
+
+    Returns:
+    - tuple: (ruta, tipo MIME, hash del contenido), o None si no existe.
+    """
+    try:
+        name = _pointer_path(key).read_text().strip()
+    except OSError:
+        return None
+    digest, _, extension = name.partition('.')
+    for known_extension, content_type in FORMATS.values():
+        if extension == known_extension:
+            path = _thumbnail_path(digest, extension)
+            try:
+                os.utime(path)
+            except OSError:
+                # La miniatura se eliminó al liberar espacio: se vuelve a generar
+                return None
+            return path, content_type, digest
+    return None
+
+
+def download(image_url):
+    """
+    Descarga el cartel de origen.
+
+    Returns:
+    - bytes: El contenido descargado.
+
+    Raises:
+    - ThumbnailError: Si la URL no es HTTP(S), la descarga falla o supera MOVIES_THUMBNAIL_MAX_BYTES.
+    """
+    if not image_url.lower().startswith(('http://', 'https://')):
+        raise ThumbnailError('Unsupported image URL: %s' % image_url)
+    limit = getattr(settings, 'MOVIES_THUMBNAIL_MAX_BYTES', 5 * 1024 * 1024)
+    timeout = getattr(settings, 'MOVIES_THUMBNAIL_TIMEOUT', 5)
+    request = urllib.request.Request(image_url, headers={'User-Agent': 'movies-thumbnailer'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit() and int(length) > limit:
+                raise ThumbnailError('Image is larger than %d bytes: %s' % (limit, image_url))
+            # Se lee un byte más del límite para detectar respuestas sin Content-Length demasiado grandes
+            data = response.read(limit + 1)
+    except (urllib.error.URLError, OSError, ValueError) as exc:
+        raise ThumbnailError('Could not download %s: %s' % (image_url, exc)) from exc
+    if len(data) > limit:
+        raise ThumbnailError('Image is larger than %d bytes: %s' % (limit, image_url))
+    return data
+
+
+def render(data):
+    """
+    Reduce una imagen para que quepa en MOVIES_THUMBNAIL_SIZE y la codifica en el formato configurado.
+
+    Returns:
+    - tuple: (bytes de la miniatura, nombre del formato).
+    """
+    Image, ImageOps, _ = _load_pillow()
+    format_name = get_format()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            width_limit, height_limit = get_size()
+            if width * height > MAX_SOURCE_PIXELS:
+                raise ThumbnailError('Image is too large to resize (%dx%d).' % (width, height))
+            image.draft('RGB', (width_limit, height_limit))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if format_name == 'WEBP' and 'A' in image.getbands() else 'RGB')
+            image.thumbnail((width_limit, height_limit))
+            output = io.BytesIO()
+            image.save(output, format=format_name, quality=80, **({'method': 4} if format_name == 'WEBP' else {'optimize': True}))
+    except ThumbnailError:
+        raise
+    except Exception as exc:
+        raise ThumbnailError('Could not read the image: %s' % exc) from exc
+    return output.getvalue(), format_name
+
+
+def create(image_url):
+    """
+    Descarga un cartel, genera su miniatura y la guarda en disco.
+
+    Returns:
+    - tuple: (ruta, tipo MIME, hash del contenido), como `lookup`.
+
+    Raises:
+    - ThumbnailError: Si la descarga o el procesado fallan (el fallo se recuerda FAILURE_TIMEOUT segundos).
+    """
+    cache = get_cache()
+    key = source_key(image_url)
+    failure_key = 'thumbnail:failed:%s' % key
+    if cache.get(failure_key):
+        raise ThumbnailError('Recent download of %s failed.' % image_url)
+    try:
+        data, format_name = render(download(image_url))
+    except ThumbnailError:
+        cache.set(failure_key, True, FAILURE_TIMEOUT)
+        raise
+
+    extension, content_type = FORMATS[format_name]
+    digest = hashlib.sha256(data).hexdigest()
+    path = _thumbnail_path(digest, extension)
+    pointer = _pointer_path(key)
+    name = ('%s.%s' % (digest, extension)).encode('ascii')
+    added = 0
+    # Carteles idénticos de distintas URL comparten el mismo archivo
+    if not path.exists():
+        _write_atomic(path, data)
+        added += len(data)
+    if not pointer.exists():
+        added += len(name)
+    _write_atomic(pointer, name)
+    if added:
+        total = _track(added)
+        if total is None or total > get_max_bytes():
+            evict()
+    return path, content_type, digest
+
+
+def get_or_create(image_url):
+    """
+    Devuelve la miniatura de un cartel, generándola si aún no está en disco.
+    """
+    return lookup(source_key(image_url)) or create(image_url)
+
+
+def _track(size):
+    """
+    Suma `size` bytes al tamaño registrado del directorio.
+
+    Returns:
+    - int | None: El nuevo tamaño, o None si no se conoce y hay que medirlo con `evict`.
+    """
+    try:
+        return get_cache().incr(SIZE_KEY, size)
+    except ValueError:
+        return None
+
+
+def evict(max_bytes=None):
+    """
+    Elimina las miniaturas menos usadas recientemente, con los punteros que llevan a ellas, hasta que
+    el directorio quepa en `max_bytes`. También elimina los punteros a miniaturas que ya no existen.
+
+    Parameters:
+    - max_bytes: int, el tamaño máximo; por defecto MOVIES_THUMBNAIL_CACHE_BYTES.
+
+    Returns:
+    - int: El número de miniaturas eliminadas.
+    """
+    if max_bytes is None:
+        max_bytes = get_max_bytes()
+    files = []
+    total = 0
+    for path in (get_directory() / 'thumbs').glob('*/*'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    # Punteros agrupados por la miniatura a la que llevan
+    pointers = {}
+    for path in (get_directory() / 'sources').glob('*'):
+        if path.name.startswith('.tmp-'):
+            continue
+        try:
+            size = path.stat().st_size
+            name = path.read_text().strip()
+        except OSError:
+            continue
+        pointers.setdefault(name, []).append((size, path))
+        total += size
+
+    def remove_pointers(name):
+        removed_bytes = 0
+        for size, path in pointers.pop(name, []):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            removed_bytes += size
+        return removed_bytes
+
+    removed = 0
+    kept = set()
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            kept.add(path.name)
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            kept.add(path.name)
+            continue
+        total -= size + remove_pointers(path.name)
+        removed += 1
+    for name in set(pointers) - kept:
+        total -= remove_pointers(name)
+    get_cache().set(SIZE_KEY, total, SIZE_TIMEOUT)
+    return removed
@@ -0,0 +1,222 @@
+import bisect
+import threading
+import unicodedata
+
+from django.conf import settings
+
+from . import cache
+from .models import Movie
+
+
+# Índice en memoria para autocompletar títulos mientras se escribe.
+# Guarda dos arrays ordenados de pares (clave normalizada, ID): uno con el título completo y otro
+# con el título a partir de cada palabra, así "dark kn" encuentra "The Dark Knight". Un prefijo se
+# resuelve con una búsqueda binaria y la lectura de los siguientes elementos, sin tocar la base de datos.
+# Se construye en el primer uso y las señales de `Movie` lo mantienen al día en este proceso. Cada cambio
+# trae la versión del catálogo que produjo; si no es la siguiente a la del índice (otro proceso cambió
+# el catálogo entretanto, con una caché compartida) el índice se descarta y se reconstruye en la
+# siguiente consulta, igual que si la versión cambia sin pasar por este proceso.
+
+_index = None
+_lock = threading.Lock()
+
+
+def normalize(text):
+    """
+    Normaliza un texto para compararlo: sin acentos, en minúsculas y con los espacios colapsados.
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def get_limit():
+    return getattr(settings, 'MOVIES_TYPEAHEAD_LIMIT', 8)
+
+
+def get_max_movies():
+    return getattr(settings, 'MOVIES_TYPEAHEAD_MAX_MOVIES', 100000)
+
+
+def _keys(title):
+    # El título completo y el resto del título desde cada palabra siguiente
+    key = normalize(title)
+    words = key.split(' ')
+    return key, [' '.join(words[start:]) for start in range(1, len(words))]
+
+
+class TitleIndex:
+    """
+    Índice de prefijos de los títulos del catálogo.
+
+    Como mucho guarda `max_movies` películas (las más calificadas); las demás no se sugieren. Con el
+    índice lleno, las películas nuevas no se añaden hasta la próxima reconstrucción, que las incluirá
+    si están entre las más calificadas.
+    """
+
+    def __init__(self, max_movies):
+        self.max_movies = max_movies
+        self.titles = []
+        self.words = []
+        self.movies = {}
+        self.version = None
+
+    def build(self, rows):
+        """
+        Carga el índice desde cero.
+
+        Parameters:
+        - rows: iterable de tuplas (id, título, año), ordenado por relevancia.
+        """
+        self.titles, self.words, self.movies = [], [], {}
+        for pk, title, year in rows:
+            if len(self.movies) >= self.max_movies:
+                break
+            key, word_keys = _keys(title)
+            self.movies[pk] = (title, year, key, word_keys)
+            self.titles.append((key, pk))
+            self.words.extend((word_key, pk) for word_key in word_keys)
+        self.titles.sort()
+        self.words.sort()
+
+    def add(self, pk, title, year):
+        self.remove(pk)
+        if len(self.movies) >= self.max_movies:
+            return
+        key, word_keys = _keys(title)
+        self.movies[pk] = (title, year, key, word_keys)
+        bisect.insort(self.titles, (key, pk))
+        for word_key in word_keys:
+            bisect.insort(self.words, (word_key, pk))
+
+    def remove(self, pk):
+        entry = self.movies.pop(pk, None)
+        if entry is None:
+            return
+        _, _, key, word_keys = entry
+        self._discard(self.titles, (key, pk))
+        for word_key in word_keys:
+            self._discard(self.words, (word_key, pk))
+
+    @staticmethod
+    def _discard(entries, item):
+        position = bisect.bisect_left(entries, item)
+        if position < len(entries) and entries[position] == item:
+            del entries[position]
+
+    def search(self, prefix, limit):
+        """
+        Devuelve hasta `limit` películas cuyo título (o una de sus palabras) empieza por `prefix`.
+
+        Primero las que coinciden desde el principio del título, luego el resto; cada grupo en orden alfabético.
+
+        Returns:
+        - list: Tuplas (id, título, año).
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = []
+        for entries in (self.titles, self.words):
+            position = bisect.bisect_left(entries, (prefix,))
+            while len(found) < limit and position < len(entries) and entries[position][0].startswith(prefix):
+                pk = entries[position][1]
+                if pk not in found:
+                    found.append(pk)
+                position += 1
+        return [(pk,) + self.movies[pk][:2] for pk in found]
+
+    def __len__(self):
+        return len(self.movies)
+
+
+def _rows():
+    return (
+        Movie.objects.order_by('-rating_count', 'title', 'id')
+        .values_list('id', 'title', 'release_year')[:get_max_movies()]
+        .iterator(chunk_size=5000)
+    )
+
+
+def get_index():
+    """
+    Devuelve el índice del proceso, construyéndolo si aún no existe o si el catálogo cambió en otro proceso.
+    """
+    global _index
+    version = cache.catalog_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            index = TitleIndex(get_max_movies())
+            index.build(_rows())
+            index.version = version
+            _index = index
+        return _index
+
+
+def suggest(prefix, limit=None):
+    """
+    Sugiere títulos que empiezan por el prefijo escrito.
+
+    Parameters:
+    - prefix: str, el texto escrito hasta ahora.
+    - limit: int, el número máximo de sugerencias (por defecto MOVIES_TYPEAHEAD_LIMIT).
+
+    Returns:
+    - list: Tuplas (id, título, año).
+    """
+    limit = min(limit or get_limit(), get_limit())
+    return get_index().search(prefix, limit)
+
+
+def _apply(change, version):
+    # Aplica un cambio que llevó el catálogo a `version`; si el índice no estaba en la versión anterior
+    # le faltan cambios de otros procesos y se descarta
+    global _index
+    with _lock:
+        if _index is None:
+            return
+        if _index.version != version - 1:
+            _index = None
+            return
+        change(_index)
+        _index.version = version
+
+
+def update_movies(movies, version):
+    """
+    Aplica al índice del proceso (si ya existe) las películas creadas o modificadas.
+
+    Parameters:
+    - movies: iterable de Movie, con `id`, `title` y `release_year`.
+    - version: int, la versión del catálogo tras el cambio (la que devolvió `bump_catalog_version`).
+    """
+    def change(index):
+        for movie in movies:
+            index.add(movie.pk, movie.title, movie.release_year)
+    _apply(change, version)
+
+
+def remove_movies(movie_ids, version):
+    """
+    Quita del índice del proceso (si ya existe) las películas eliminadas.
+
+    Parameters:
+    - movie_ids: iterable de int, los IDs de las películas eliminadas.
+    - version: int, la versión del catálogo tras el cambio.
+    """
+    def change(index):
+        for pk in movie_ids:
+            index.remove(pk)
+    _apply(change, version)
+
+
+def reset():
+    """
+    Descarta el índice del proceso; se reconstruirá en la siguiente consulta.
+    """
+    global _index
+    with _lock:
+        _index = None
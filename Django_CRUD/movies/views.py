@@ -1,15 +1,32 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render,  redirect, get_object_or_404
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
 from django.db import IntegrityError
-from .models import Movie, UserMovieRating
-from .forms import MovieForm, UserMovieRatingForm
-from .signals import update_movie_rating
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.http import FileResponse, Http404, HttpResponseBadRequest, HttpResponseNotModified, StreamingHttpResponse
+from .models import MAX_INTEGER, Genre, Movie, UserMovieRating
+from .forms import BulkMovieActionForm, MovieForm, UserMovieRatingForm
+from .responses import mutation_done, mutation_failed
+from .pagination import apaginate_movies, apaginate_ranked, paginate_movies
+from .cache import cache_catalog_page
+from .conditional import catalog_validators, conditional_page, movie_validators
+from .decorators import async_login_required
+from . import bulk, exports, facets, leaderboards, thumbnails
+from .recommendations import recommended_for
+from .library import asearch_user_library, library_cards
+from . import fuzzy, search
 
 # Create your views here.
 
+# Las vistas de lectura del catálogo y de la lista del usuario son asíncronas (`async def`) para
+# atender muchas conexiones concurrentes bajo ASGI. Las plantillas se renderizan en un hilo porque
+# el contexto de mensajes puede leer la sesión de la base de datos.
+arender = sync_to_async(render)
+
 def admin_home(request):
     """
     Renderiza la página de inicio del panel de administrador.
@@ -32,9 +49,16 @@ def user_home(request):
     - request: HttpRequest, la solicitud HTTP recibida.
 
     Returns:
-    - HttpResponse: Una respuesta HTTP que renderiza la plantilla 'user_home.html' para el usuario.
+    - HttpResponse: Una respuesta HTTP que renderiza la plantilla 'user_home.html' para el usuario,
+      con los rankings del catálogo y recomendaciones personalizadas si ha iniciado sesión.
     """
-    return render(request, 'user_home.html')
+    recommended = []
+    if request.user.is_authenticated:
+        # Recomendaciones leídas de los vecinos precalculados, en una sola consulta
+        recommended = list(recommended_for(request.user))
+    # Rankings precalculados: una lectura por índice para cada uno
+    charts = leaderboards.charts()
+    return render(request, 'user_home.html', {'recommended': recommended, **charts})
 
 
 def signup(request):
@@ -109,6 +133,9 @@ def signout(request):
 
 
 @login_required
+@ensure_csrf_cookie
+@conditional_page(catalog_validators)
+@cache_catalog_page
 def admin_movies(request):
     """
     Renderiza la página de administración de películas con todas las películas disponibles ordenadas por título.
@@ -117,11 +144,15 @@ def admin_movies(request):
     - request: HttpRequest, la solicitud HTTP recibida.
 
     Returns:
-    - HttpResponse: Una respuesta que renderiza la plantilla 'admin_movies.html' con las películas disponibles
-      ordenadas por título.
+    - HttpResponse: Una respuesta que renderiza la plantilla 'admin_movies.html' con una página de películas
+      ordenadas por título, filtradas por las facetas de la URL, y el formulario de acciones masivas.
     """
-    movies = Movie.objects.all().order_by('title')  # Obtener todas las películas disponibles ordenadas por título
-    return render(request, 'admin_movies.html', {'movies': movies})
+    filters = facets.parse_filters(request.GET)
+    # Obtener una página de películas filtradas y ordenadas por título
+    page = paginate_movies(facets.apply_filters(Movie.objects.only(*Movie.CARD_FIELDS), filters), request)
+    return render(request, 'admin_movies.html', {
+        'movies': page, 'page': page, 'facets': facets.build_facets(filters), 'bulk_form': BulkMovieActionForm(),
+    })
 
 
 @login_required
@@ -135,10 +166,10 @@ def create_movie(request):
     Returns:
     - HttpResponse: Una respuesta que renderiza el formulario 'admin_create_movie.html' para crear una nueva película
       o redirige a la página de administración de películas si la película se crea con éxito.
+      En modo parcial devuelve solo la tarjeta de la nueva película.
     """
     
     error = None
-    confirmation = None
     
     if request.method == 'GET':
         # Si la solicitud es GET, renderiza el formulario vacío para crear una nueva película
@@ -151,16 +182,19 @@ def create_movie(request):
             # Si el formulario es válido, guarda la película y redirige a la página de administración de películas
             movie = form.save(commit=False)
             movie.save()
-            confirmation = 'Successfully created movie.'
-            error = 'Please provide valid data.'
-            movies = Movie.objects.all().order_by('title')
-            return render(request, 'admin_movies.html', {'movies':movies ,'confirmation': confirmation})
+            return mutation_done(
+                request, 'Successfully created movie.', 'admin_movies',
+                fragment='_movie_card.html', fragment_context={'movie': movie, 'detail_url_name': 'admin_movie_detail'},
+                status=201,
+            )
         else:
             # Si el formulario no es válido, vuelve a renderizar el formulario con un mensaje de error
+            error = 'Please provide valid data.'
             return render(request, 'admin_create_movie.html', {'form': form, 'error': error})
 
               
 @login_required
+@conditional_page(movie_validators)
 def admin_movie_detail(request, movie_id):
     """
     Muestra los detalles de una película para editarla o procesa los datos del formulario para actualizarla.
@@ -172,25 +206,26 @@ def admin_movie_detail(request, movie_id):
     Returns:
     - HttpResponse: Una respuesta que renderiza el formulario 'admin_movie_detail.html' para editar los detalles de la película
       o redirige a la página de administración de películas si la película se actualiza con éxito.
+      En modo parcial devuelve solo la tarjeta actualizada de la película.
     """
     # Obtener la película con el ID especificado o mostrar un error 404 si no existe
     movie = get_object_or_404(Movie, pk=movie_id)
-    confirmation = None
     error = None
     
     if request.method == 'GET':
         # Si la solicitud es GET, renderiza el formulario para editar los detalles de la película
         form = MovieForm(instance=movie)
-        return render(request, 'admin_movie_detail.html', {'movie': movie, 'form': form,'confirmation': confirmation})
+        return render(request, 'admin_movie_detail.html', {'movie': movie, 'form': form})
     else:
         # Si la solicitud es POST, procesa los datos del formulario para actualizar la película
         form = MovieForm(request.POST, instance=movie)
         if form.is_valid():
             # Si el formulario es válido, guarda los cambios y redirige a la página de administración de películas
             form.save()
-            movies = Movie.objects.all().order_by('title')  # Obtener todas las películas disponibles ordenadas por título
-            confirmation = 'Successfully modified movie.'
-            return render(request, 'admin_movies.html', {'movies': movies, 'confirmation': confirmation})
+            return mutation_done(
+                request, 'Successfully modified movie.', 'admin_movies',
+                fragment='_movie_card.html', fragment_context={'movie': movie, 'detail_url_name': 'admin_movie_detail'},
+            )
         else:
             error = 'An unexpected error has occurred.'
             # Si el formulario no es válido, vuelve a renderizar el formulario con un mensaje de error
@@ -207,24 +242,61 @@ def delete_movie(request, movie_id):
     - movie_id: int, el ID de la película a eliminar.
 
     Returns:
-    - HttpResponse: Redirige a la página de administración de películas si la película se elimina con éxito.
-      Renderiza el detalle de la película con un mensaje de error si el usuario no es un superusuario o la solicitud no es POST.
+    - HttpResponse: Redirige a la página de administración de películas si la película se elimina con éxito
+      (204 en modo parcial). Si la solicitud no es POST, redirige al detalle de la película.
     """
     # Obtener la película con el ID especificado o mostrar un error 404 si no existe
     movie = get_object_or_404(Movie, pk=movie_id)
-    confirmation = None
     
-        # Eliminar la película si la solicitud es POST
+    # Eliminar la película si la solicitud es POST
     if request.method == 'POST':
         movie.delete()
-        confirmation = 'Movie successfully removed.'
-        movies = Movie.objects.all().order_by('title')
-        return render(request, 'admin_movies.html', {'movies':movies ,'confirmation': confirmation})
-   
+        return mutation_done(request, 'Movie successfully removed.', 'admin_movies')
+
+    return redirect('admin_movie_detail', movie_id)
+
+
+# Mensajes de confirmación de cada acción masiva
+BULK_ACTION_MESSAGES = {
+    bulk.DELETE: 'Removed %d movies.',
+    bulk.SET_GENRE: 'Changed the genre of %d movies.',
+    bulk.SET_AGE_RATING: 'Changed the age rating of %d movies.',
+}
+
+
+@login_required
+def bulk_movie_action(request):
+    """
+    Borra o edita (género o clasificación por edades) de una vez las películas seleccionadas. Solo para superusuarios.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida, con `action`, `value` y los `ids` seleccionados.
+
+    Returns:
+    - HttpResponse: Redirige a la página de administración de películas con el resultado (204 en modo
+      parcial). Si la solicitud no es POST, redirige al listado.
+    """
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    if request.method != 'POST':
+        return redirect('admin_movies')
+
+    form = BulkMovieActionForm(request.POST)
+    if not form.is_valid():
+        error = next(iter(form.errors.values()))[0]
+        return mutation_failed(request, error, 'admin_movies', status=400)
+
+    # Toda la acción se aplica en una sola transacción con sentencias por conjuntos
+    action = form.cleaned_data['action']
+    count = bulk.apply(action, form.cleaned_data['ids'], form.cleaned_data['value'])
+    return mutation_done(request, BULK_ACTION_MESSAGES[action] % count, 'admin_movies')
+
     
     
-@login_required
-def user_available_movies(request):
+@async_login_required
+@conditional_page(catalog_validators)
+@cache_catalog_page
+async def user_available_movies(request):
     """
     Muestra todas las películas disponibles ordenadas por título.
 
@@ -232,18 +304,22 @@ def user_available_movies(request):
     - request: HttpRequest, la solicitud HTTP recibida.
 
     Returns:
-    - HttpResponse: Renderiza la página 'user_available_movies.html' con todas las películas disponibles
-      ordenadas por título.
+    - HttpResponse: Renderiza la página 'user_available_movies.html' con una página de películas disponibles
+      ordenadas por título, filtradas por las facetas de la URL.
     """
-    # Obtener todas las películas disponibles ordenadas por título
-    movies = Movie.objects.all().order_by('title')
+    # Obtener la página solicitada de películas filtradas y ordenadas por título
+    filters = facets.parse_filters(request.GET)
+    page = await apaginate_movies(facets.apply_filters(Movie.objects.only(*Movie.CARD_FIELDS), filters), request)
+    # Recuentos de las facetas (desde la caché si ya se calcularon para estos filtros)
+    facet_panel = await sync_to_async(facets.build_facets)(filters)
 
     # Renderizar la plantilla con las películas disponibles
-    return render(request, 'user_available_movies.html', {'movies': movies})
+    return await arender(request, 'user_available_movies.html', {'movies': page, 'page': page, 'facets': facet_panel})
     
 
-@login_required
-def user_movie_detail(request, movie_id):
+@async_login_required
+@conditional_page(movie_validators)
+async def user_movie_detail(request, movie_id):
     """
     Muestra los detalles de una película y permite al usuario actualizar la información.
 
@@ -256,12 +332,45 @@ def user_movie_detail(request, movie_id):
     - Redirect: Redirige a la página 'user_movies' si se actualiza con éxito la información de la película.
     """
     # Obtener la película por su ID o devolver un error 404 si no existe
-    movie = get_object_or_404(Movie, pk=movie_id)
+    try:
+        movie = await Movie.objects.aget(pk=movie_id)
+    except Movie.DoesNotExist:
+        raise Http404('No Movie matches the given query.')
     if request.method == 'GET':
         # Mostrar los detalles de la película
-        return render(request, 'user_movie_detail.html', {'movie': movie})
+        return await arender(request, 'user_movie_detail.html', {'movie': movie})
         
         
+@async_login_required
+async def movie_charts(request):
+    """
+    Muestra los rankings de películas mejor valoradas y más valoradas, del catálogo completo o de un género.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `genre` (ID del género).
+
+    Returns:
+    - HttpResponse: Renderiza la página 'movie_charts.html' con los rankings y los géneros disponibles.
+    """
+    genre = None
+    genre_id = request.GET.get('genre', '')
+    if genre_id:
+        # IDs no numéricos o fuera del rango de SQLite se tratan como un género desconocido
+        valid = genre_id.isascii() and genre_id.isdigit() and int(genre_id) <= MAX_INTEGER
+        genre = await Genre.objects.filter(pk=genre_id).afirst() if valid else None
+        if genre is None:
+            raise Http404('No Genre matches the given query.')
+
+    charts = await sync_to_async(leaderboards.charts)(genre)
+    # Los géneros del catálogo salen de los recuentos de facetas guardados en la caché
+    catalog = await sync_to_async(facets.cached_facets)(facets.empty_filters())
+    genres = sorted(
+        ({'value': pk, 'label': name} for pk, (name, _) in catalog['genres'].items()),
+        key=lambda option: option['label'].casefold(),
+    )
+    return await arender(request, 'movie_charts.html', {'genre': genre, 'genres': genres, **charts})
+
+
 @login_required
 def add_to_my_list(request, movie_id):
     """
@@ -272,11 +381,10 @@ def add_to_my_list(request, movie_id):
     - movie_id: int, el ID de la película a agregar a la lista del usuario.
 
     Returns:
-    - HttpResponse: Renderiza la página 'user_movie_detail.html' con un mensaje de error si la película ya está en la lista del usuario.
+    - Redirect: Redirige a la página 'user_movie_detail' con un mensaje de error si la película ya está en la lista del usuario.
     - Redirect: Redirige a la página 'user_available_movies' después de agregar la película a la lista del usuario.
+    - HttpResponse: En modo parcial, un 204 si se agrega la película o un 409 si ya estaba en la lista.
     """
-    error = None
-    
     # Obtener la película seleccionada por su ID o devolver un error 404 si no existe
     movie = get_object_or_404(Movie, pk=movie_id)
 
@@ -285,17 +393,14 @@ def add_to_my_list(request, movie_id):
 
     # Si la relación ya existe, mostrar un mensaje de error
     if not created:
-        error = 'This movie is already in your list.'
-        return render(request, 'user_movie_detail.html', {'movie': movie, 'error': error})
+        return mutation_failed(request, 'This movie is already in your list.', 'user_movie_detail', movie.id)
 
-    movies = Movie.objects.all().order_by('title')
-    confirmation = 'Movie successfully added.'
-    # Si la relación se crea correctamente, redirigir al usuario a su lista de películas
-    return render(request, 'user_available_movies.html', {'movies': movies, 'confirmation': confirmation})
+    # Si la relación se crea correctamente, redirigir al usuario al catálogo
+    return mutation_done(request, 'Movie successfully added.', 'user_available_movies')
 
 
-@login_required
-def user_movies(request):
+@async_login_required
+async def user_movies(request):
     """
     Retorna las películas disponibles para el usuario actual.
 
@@ -306,14 +411,10 @@ def user_movies(request):
     - HttpResponse: Renderiza la página 'user_movies.html' con la lista de películas disponibles para el usuario.
     """
     
-    # Filtrar las relaciones UserMovieRating para el usuario dado
-    movies = UserMovieRating.objects.filter(user=request.user)
+    # Obtener las películas de la lista del usuario, ordenadas por título, en una sola consulta
+    user_movies = [movie async for movie in library_cards(request.user).aiterator()]
     
-    # Obtener las películas asociadas a las relaciones filtradas y ordenarlas por título
-    user_movies = [user_movie.movie for user_movie in movies]
-    user_movies_sorted = sorted(user_movies, key=lambda movie: movie.title)
-    
-    return render(request, 'user_movies.html', {'user_movies': user_movies_sorted})
+    return await arender(request, 'user_movies.html', {'user_movies': user_movies})
 
 
 @login_required
@@ -326,7 +427,7 @@ def user_movie_delete(request, movie_id):
     - movie_id: int, el ID de la película que se va a eliminar de la lista del usuario.
 
     Returns:
-    - HttpResponse: Redirige al usuario a la página 'user_movies' después de eliminar la película.
+    - HttpResponse: Redirige al usuario a la página 'user_movies' después de eliminar la película (204 en modo parcial).
     """
     if request.method == 'POST':
         # Obtener la relación UserMovieRating correspondiente al usuario y la película dada
@@ -335,19 +436,10 @@ def user_movie_delete(request, movie_id):
         # Eliminar la relación
         user_movie_rating.delete()
         
-        movies = Movie.objects.all().order_by('title')
-        confirmation = 'Movie successfully removed from your list.'
-        
-    
-        # Filtrar las relaciones UserMovieRating para el usuario dado
-        movies = UserMovieRating.objects.filter(user=request.user)
-        
-        # Obtener las películas asociadas a las relaciones filtradas y ordenarlas por título
-        user_movies = [user_movie.movie for user_movie in movies]
-        user_movies_sorted = sorted(user_movies, key=lambda movie: movie.title)
-        
-        return render(request, 'user_movies.html', {'user_movies': user_movies_sorted, 'confirmation':confirmation})
- 
+        return mutation_done(request, 'Movie successfully removed from your list.', 'user_movies')
+
+    return redirect('user_movies')
+
    
 @login_required
 def user_movie_rating(request, movie_id):
@@ -391,37 +483,30 @@ def user_movie_rate(request, movie_id):
     if request.method == 'POST':
         # Si la solicitud es un POST, procesar la calificación de la película
         movie = get_object_or_404(Movie, pk=movie_id)
-        rating = request.POST.get('rating')
+        form = UserMovieRatingForm(request.POST)
+        if not form.is_valid():
+            return mutation_failed(request, 'Please choose a rating from 1 to 5.', 'user_movie_rating', movie.id, status=400)
         
         # Obtener o crear la entrada de calificación del usuario para esta película
         user_rating, created = UserMovieRating.objects.get_or_create(user=request.user, movie=movie)
         
         # Actualizar la calificación del usuario para la película
-        user_rating.rating = rating
+        user_rating.rating = form.cleaned_data['rating']
+        # Al guardar, la señal post_save actualiza los agregados de calificación de la película
         user_rating.save()
         
-        # Actualizar la calificación de la película en el modelo Movie
-        update_movie_rating(None, user_rating)
-        
-        confirmation = 'Movie rated with success.'
-    
-        # Filtrar las relaciones UserMovieRating para el usuario dado
-        movies = UserMovieRating.objects.filter(user=request.user)
-        
-        # Obtener las películas asociadas a las relaciones filtradas y ordenarlas por título
-        user_movies = [user_movie.movie for user_movie in movies]
-        user_movies_sorted = sorted(user_movies, key=lambda movie: movie.title)
-        
-        # Redirigir al usuario a su lista de películas después de calificar
-        return render(request, 'user_movies.html', {'user_movies': user_movies_sorted, 'confirmation':confirmation})
+        # Redirigir al usuario a su lista de películas después de calificar (204 en modo parcial)
+        return mutation_done(request, 'Movie rated with success.', 'user_movies')
     
     
     # Si la solicitud no es un POST, simplemente redirigir al usuario a su lista de películas
     return redirect('user_movies')
 
 
-@login_required
-def search_results(request):
+@async_login_required
+@conditional_page(catalog_validators)
+@cache_catalog_page
+async def search_results(request):
     """
     Retorna los resultados de búsqueda según el título de la película.
 
@@ -433,25 +518,41 @@ def search_results(request):
     """
     
     error = None
+    confirmation = None
     
     # Obtener el término de búsqueda de la URL
-    query = request.GET.get('search_query')
+    query = request.GET.get('search_query', '')
 
-    # Filtrar las películas por título que contenga el término de búsqueda
-    movies = Movie.objects.filter(title__icontains=query).order_by('title')
+    if search.build_match_expression(query):
+        # Buscar en el índice de texto completo (título, director, género y descripción) ordenando por relevancia;
+        # si no hay ninguna coincidencia, se buscan títulos y directores parecidos (errores de escritura)
+        approximate = []
 
-    if not movies:
+        def fetch_ids(limit, offset):
+            ids, fuzzy_match = fuzzy.search_with_fallback(query, limit=limit, offset=offset)
+            approximate.append(fuzzy_match)
+            return ids
+
+        page = await apaginate_ranked(Movie.objects.only(*Movie.CARD_FIELDS), fetch_ids, request)
+        if page.object_list and any(approximate):
+            confirmation = 'No exact matches for "%s". Showing similar titles.' % query
+    else:
+        # Sin términos de búsqueda se muestra el catálogo completo ordenado por título
+        page = await apaginate_movies(Movie.objects.only(*Movie.CARD_FIELDS), request)
+
+    if not page.object_list:
         error = 'No results found.'
         
     # Determinar el tipo de usuario y renderizar la página correspondiente
+    context = {'movies': page, 'page': page, 'error': error, 'confirmation': confirmation}
     if request.user.is_superuser:
-        return render(request, 'admin_movies.html', {'movies': movies,'error': error})
+        return await arender(request, 'admin_movies.html', dict(context, bulk_form=BulkMovieActionForm()))
     else:
-        return render(request, 'user_available_movies.html', {'movies': movies,'error': error})
+        return await arender(request, 'user_available_movies.html', context)
  
    
-@login_required
-def search_from_my_movies(request):
+@async_login_required
+async def search_from_my_movies(request):
     """
     Realiza una búsqueda de películas dentro de las películas disponibles para el usuario actual.
 
@@ -464,18 +565,89 @@ def search_from_my_movies(request):
     error = None
     
     # Obtener el término de búsqueda de la URL
-    query = request.GET.get('search_query')
-    
-    # Buscar películas en base a la consulta
-    movies = Movie.objects.filter(title__icontains=query).values_list('id', flat=True).order_by('title')
-    
-    # Filtrar las películas encontradas por el usuario actual en UserMovieRating
-    user_movies = UserMovieRating.objects.filter(user=request.user, movie_id__in=movies)
+    query = request.GET.get('search_query', '')
     
-    # Obtener las películas que coinciden con las IDs encontradas
-    movies = Movie.objects.filter(id__in=user_movies.values_list('movie_id', flat=True))
+    # Buscar en el índice de texto completo solo entre las películas de la lista del usuario
+    movies = await asearch_user_library(request.user, query)
     
     if not movies:
         error = 'No results found.'
     
-    return render(request, 'user_movies.html', {'user_movies': movies, 'error': error})
\ No newline at end of file
+    return await arender(request, 'user_movies.html', {'user_movies': movies, 'error': error})
+
+
+@login_required
+def export_data(request, kind):
+    """
+    Exporta en streaming el catálogo ('movies') o las calificaciones ('ratings'). Solo para superusuarios.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida. Admite `format` (csv o jsonl), `gzip=1` y `since`
+      (fecha ISO 8601 de modificación mínima).
+    - kind: str, el conjunto de datos a exportar.
+
+    Returns:
+    - StreamingHttpResponse: El archivo exportado, generado a medida que se envía.
+    """
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    if kind not in exports.EXPORTS:
+        raise Http404('Unknown export.')
+    
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest('Unsupported format.')
+    try:
+        since = exports.parse_since(request.GET.get('since'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid since date.')
+    compress = request.GET.get('gzip') == '1'
+    
+    # Las filas se leen por bloques mientras se envía la respuesta
+    response = StreamingHttpResponse(
+        exports.export_stream(kind, fmt, since=since, compress=compress),
+        content_type='application/gzip' if compress else exports.FORMATS[fmt],
+    )
+    filename = '%s.%s%s' % (kind, fmt, '.gz' if compress else '')
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+def movie_thumbnail(request, movie_id, key):
+    """
+    Sirve la miniatura del cartel de una película, generándola la primera vez que se pide.
+
+    Parameters:
+    - request: HttpRequest, la solicitud HTTP recibida.
+    - movie_id: int, el ID de la película.
+    - key: str, la clave de la URL del cartel (`thumbnails.source_key`).
+
+    Returns:
+    - FileResponse: La miniatura, con cabeceras de caché de larga duración (la URL cambia con el cartel).
+    - HttpResponseNotModified: Si el navegador ya tiene la misma miniatura.
+    - Redirect: A la URL actual de la miniatura si el cartel cambió, o al cartel original si no se pudo generar.
+    """
+    # Las miniaturas ya generadas se sirven desde disco sin consultar la base de datos
+    found = thumbnails.lookup(key)
+    if found is None:
+        image_url = Movie.objects.filter(pk=movie_id).values_list('image_url', flat=True).first()
+        if not image_url:
+            raise Http404('No Movie matches the given query.')
+        if thumbnails.source_key(image_url) != key:
+            return redirect('movie_thumbnail', movie_id, thumbnails.source_key(image_url))
+        try:
+            found = thumbnails.get_or_create(image_url)
+        except thumbnails.ThumbnailError:
+            response = redirect(image_url)
+            response['Cache-Control'] = 'no-store'
+            return response
+
+    path, content_type, digest = found
+    etag = '"%s"' % digest
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
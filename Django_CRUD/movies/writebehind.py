@@ -0,0 +1,163 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import leaderboards
+from .models import PendingRatingUpdate
+from .ratings import recompute_movie_ratings
+
+logger = logging.getLogger(__name__)
+
+
+# Modo write-behind de los agregados de calificaciones (opcional, MOVIES_RATING_WRITE_BEHIND).
+# En lugar de actualizar la fila de la película en cada calificación, la película se marca como
+# pendiente y sus agregados se recalculan por lotes cada MOVIES_RATING_FLUSH_INTERVAL segundos:
+# - 'thread': las marcas viven en memoria y las procesa un hilo en segundo plano del propio proceso.
+# - 'worker': las marcas se guardan en PendingRatingUpdate y las procesa `manage.py process_rating_updates`.
+# Las marcas repetidas de una misma película se agrupan en una sola actualización por intervalo.
+
+MODES = ('thread', 'worker')
+
+_dirty = set()
+_lock = threading.Lock()
+_flusher = None
+
+
+def get_mode():
+    mode = getattr(settings, 'MOVIES_RATING_WRITE_BEHIND', None)
+    return mode if mode in MODES else None
+
+
+def is_enabled():
+    return get_mode() is not None
+
+
+def get_interval():
+    return float(getattr(settings, 'MOVIES_RATING_FLUSH_INTERVAL', 2.0))
+
+
+def mark_dirty(movie_id):
+    """
+    Marca una película para recalcular sus agregados en el próximo vaciado.
+
+    Parameters:
+    - movie_id: int, el ID de la película calificada.
+    """
+    if get_mode() == 'worker':
+        # La marca forma parte de la misma transacción que la calificación
+        PendingRatingUpdate.objects.bulk_create([PendingRatingUpdate(movie_id=movie_id)], ignore_conflicts=True)
+    else:
+        # Solo se marca cuando la calificación ya es visible para el hilo que recalcula
+        transaction.on_commit(lambda: _mark_in_memory(movie_id))
+
+
+def _mark_in_memory(movie_id):
+    with _lock:
+        _dirty.add(movie_id)
+    ensure_flusher()
+
+
+def pending():
+    """
+    Devuelve los IDs de las películas pendientes (en memoria y en la base de datos).
+    """
+    with _lock:
+        ids = set(_dirty)
+    return ids | set(PendingRatingUpdate.objects.values_list('movie_id', flat=True))
+
+
+def flush(batch_size=500):
+    """
+    Recalcula los agregados de todas las películas pendientes.
+
+    Parameters:
+    - batch_size: int, las películas por lote.
+
+    Returns:
+    - int: El número de películas actualizadas.
+    """
+    updated = 0
+
+    with _lock:
+        ids = list(_dirty)
+        _dirty.clear()
+    try:
+        for start in range(0, len(ids), batch_size):
+            updated += recompute_movie_ratings(ids[start:start + batch_size], batch_size=batch_size)
+            leaderboards.update_movies(ids[start:start + batch_size])
+    except Exception:
+        # Las películas no procesadas vuelven a quedar pendientes
+        with _lock:
+            _dirty.update(ids)
+        raise
+
+    while True:
+        # Reclamar y recalcular en la misma transacción: si falla, las marcas se conservan.
+        # Una calificación confirmada después vuelve a crear la marca para el siguiente lote.
+        with transaction.atomic():
+            ids = list(PendingRatingUpdate.objects.order_by('marked_at').values_list('movie_id', flat=True)[:batch_size])
+            if not ids:
+                break
+            PendingRatingUpdate.objects.filter(movie_id__in=ids).delete()
+            updated += recompute_movie_ratings(ids, batch_size=batch_size)
+            leaderboards.update_movies(ids)
+    return updated
+
+
+class FlushThread(threading.Thread):
+    """
+    Hilo en segundo plano que vacía las marcas pendientes cada `interval` segundos.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='rating-write-behind', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    flush()
+                except Exception:
+                    logger.exception('Rating write-behind flush failed; will retry.')
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def ensure_flusher():
+    """
+    Arranca el hilo de vaciado del proceso si el modo es 'thread' y el intervalo es positivo.
+
+    Con intervalo 0 no hay hilo y las marcas se vacían llamando a `flush()`.
+    """
+    global _flusher
+    if get_mode() != 'thread' or _flusher is not None or get_interval() <= 0:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = FlushThread(get_interval())
+            _flusher.start()
+            atexit.register(shutdown)
+
+
+def shutdown():
+    """
+    Detiene el hilo de vaciado y procesa las marcas pendientes antes de que termine el proceso.
+    """
+    global _flusher
+    flusher, _flusher = _flusher, None
+    if flusher is not None:
+        atexit.unregister(shutdown)
+        flusher.stop()
+    try:
+        flush()
+    except Exception:
+        logger.exception('Could not flush pending rating aggregates on shutdown.')